@@ -15,18 +15,68 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
 
-    
+    from services.json_provider import init_json_provider
+    init_json_provider(app)
+
+    from services.cache import cache
+    cache.init_app(app)
+
+    from services.passwords import password_hasher
+    password_hasher.init_app(app)
+
+    from services.events import event_publisher
+    event_publisher.init_app(app)
+
+    from services.versions import change_versions
+    change_versions.init_app(app)
+
+    from services.idempotency import idempotency
+    idempotency.init_app(app)
+
+    from services.notifications import notification_outbox
+    notification_outbox.init_app(app)
+
+    from services.search import init_search
+    init_search(app)
+
+    from services.forecast import forecast_store
+    forecast_store.init_app(app)
+
+    if app.config["METRICS_ENABLED"]:
+        from services.instrumentation import request_metrics
+        with app.app_context():
+            request_metrics.init_app(app, db.engine)
+
+    # After the metrics hooks, so 429s are counted per endpoint too
+    from services.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
 
     # Import and register routes
     from routes.user_routes import user_bp
     from routes.food_routes import food_bp
     from routes.transaction_routes import transaction_bp
     from routes.request_routes import request_bp
+    from routes.metrics_routes import metrics_bp
+    from routes.stats_routes import stats_bp
+    from routes.event_routes import event_bp
+    from routes.search_routes import search_bp
+    from routes.forecast_routes import forecast_bp
 
     app.register_blueprint(user_bp)
     app.register_blueprint(food_bp)
     app.register_blueprint(transaction_bp)
     app.register_blueprint(request_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(stats_bp)
+    app.register_blueprint(event_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(forecast_bp)
+
+    from commands import register_commands
+    register_commands(app)
+
+    from services.expiry import init_expiry_sweeper
+    init_expiry_sweeper(app)
 
     return app
 
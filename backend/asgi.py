@@ -0,0 +1,330 @@
+# Async entry point: uvicorn asgi:app --workers N
+#
+# The read-heavy GET endpoints below are served natively on the event loop
+# with async SQLAlchemy sessions (asyncpg on PostgreSQL, aiosqlite on
+# SQLite), so one process can hold thousands of concurrent connections
+# while queries are in flight. Every other route, method and OPTIONS
+# preflight is handed to the regular Flask app through asgiref's WSGI
+# adapter, which runs it on a thread pool exactly as under a WSGI server.
+#
+# Responses match the Flask handlers: same JSON, status codes, pagination
+# headers and CORS headers.
+import asyncio
+import re
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from werkzeug.datastructures import Headers, MultiDict
+
+from app import create_app
+from models import FoodItem, User
+from routes.event_routes import SSE_HEADERS, _stream_args
+from routes.food_routes import NEARBY_LOCATION_REQUIRED, _caller_id, _nearby_args
+from routes.request_routes import _apply_available_filters, _available_scopes, _request_rows, _request_scopes
+from services.async_db import create_async_db_engine, create_async_session_factory
+from services.events import SubscriberLimit, event_hub, sse_frame
+from services.geo import format_nearby, is_complete, pending_requests_in_box_statement, search_radii, within_radius
+from services.pagination import STREAM_BATCH_SIZE, STREAM_MIMETYPES, apply_keyset, next_page_headers, parse_page_args
+from services.rate_limit import rate_limiter
+from services.serializers import AVAILABLE_FOOD, REQUEST
+from services.user_lookups import get_user_profile_async
+from services.versions import change_versions
+
+flask_app = create_app()
+
+
+class AsyncRequest:
+    # The parts of a Flask request the async handlers use
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = MultiDict(parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        self.headers = Headers([(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]])
+        self.remote_addr = scope["client"][0] if scope.get("client") else None
+        host = self.headers.get("Host")
+        if not host and scope.get("server"):
+            host = "%s:%s" % scope["server"]
+        self.base_url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}{self.path}"
+
+
+class JSONResponse:
+    def __init__(self, body, status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+
+    async def send(self, send, extra_headers):
+        # Same encoding as flask.jsonify: sorted keys, compact unless debug,
+        # trailing newline
+        separators = (", ", ": ") if flask_app.debug else (",", ":")
+        indent = 2 if flask_app.debug else None
+        payload = (flask_app.json.dumps(self.body, indent=indent, separators=separators) + "\n").encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        headers += [(k.lower().encode(), str(v).encode()) for k, v in self.headers.items()]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers + extra_headers})
+        await send({"type": "http.response.body", "body": payload})
+
+
+class StreamingResponse:
+    def __init__(self, chunks, mimetype):
+        self.chunks = chunks
+        self.mimetype = mimetype
+        self.status = 200
+        self.headers = {}
+
+    async def send(self, send, extra_headers):
+        headers = [(b"content-type", self.mimetype.encode())]
+        headers += [(k.lower().encode(), str(v).encode()) for k, v in self.headers.items()]
+        headers += extra_headers
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        async for chunk in self.chunks:
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+class NotModifiedResponse:
+    status = 304
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    async def send(self, send, extra_headers):
+        headers = [(k.lower().encode(), str(v).encode()) for k, v in self.headers.items()]
+        await send({"type": "http.response.start", "status": 304, "headers": headers + extra_headers})
+        await send({"type": "http.response.body", "body": b""})
+
+
+# -- pagination ----------------------------------------------------------
+
+async def _stream_rows(session, stmt, serialize, fmt):
+    # Async counterpart of services.pagination._stream_rows; one chunk per
+    # yield_per batch instead of one per row
+    dumps = flask_app.json.dumps
+    result = await session.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+
+    first = True
+    if fmt == "json":
+        yield "["
+    async for batch in result.partitions():
+        if fmt == "ndjson":
+            yield "".join(dumps(serialize(row)) + "\n" for row in batch)
+        else:
+            yield ("" if first else ",") + ",".join(dumps(serialize(row)) for row in batch)
+            first = False
+    if fmt == "json":
+        yield "]"
+
+
+async def paginate(session, req, stmt, key_column, serialize):
+    cursor, limit, stream, error = parse_page_args(req.args)
+    if error:
+        return JSONResponse({"error": error}, 400)
+
+    stmt = apply_keyset(stmt, key_column, cursor)
+
+    if stream:
+        return StreamingResponse(_stream_rows(session, stmt, serialize, stream), STREAM_MIMETYPES[stream])
+
+    result = await session.execute(stmt.limit(limit + 1))
+    rows, headers = next_page_headers(req.base_url, req.args.to_dict(), result.all(), key_column, limit)
+    return JSONResponse([serialize(row) for row in rows], headers=headers)
+
+
+# -- handlers ------------------------------------------------------------
+
+async def get_all_requests(session, req):
+    stmt, columns, error = _request_rows(select, req.args)
+    if error:
+        return JSONResponse({"error": error}, 400)
+    return await paginate(session, req, stmt, columns.request_id, REQUEST.dump)
+
+
+async def available_foods(session, req):
+    stmt = _apply_available_filters(AVAILABLE_FOOD.select(), req.args)
+    return await paginate(session, req, stmt, FoodItem.food_id, AVAILABLE_FOOD.dump)
+
+
+async def get_nearby_requests(session, req):
+    lat, lon, radius_km, limit, error = _nearby_args(req.args)
+    if error:
+        return JSONResponse({"error": error}, 400)
+
+    # Fall back to the caller's saved location
+    if lat is None or lon is None:
+        user_id = _caller_id(req.args, req.headers)
+        user = await session.get(User, user_id) if user_id else None
+        if not user or user.location_lat is None or user.location_long is None:
+            return JSONResponse({"error": NEARBY_LOCATION_REQUIRED}, 400)
+        lat, lon = user.location_lat, user.location_long
+
+    for radius, max_radius, limit in search_radii(radius_km, limit):
+        rows = await session.execute(pending_requests_in_box_statement(lat, lon, radius))
+        matches = within_radius(rows, lat, lon, radius)
+        if is_complete(matches, radius, max_radius, limit):
+            break
+    return JSONResponse(format_nearby(matches, limit))
+
+
+async def get_profile(session, req, user_id):
+    profile = await get_user_profile_async(session, int(user_id))
+
+    if not profile:
+        return JSONResponse({"error": "User not found"}, 404)
+
+    return JSONResponse(profile)
+
+
+# path regex -> (handler, Flask endpoint name used for metrics, change-version
+# scopes for conditional GET or None)
+ROUTES = [
+    (re.compile(r"^/requests/all$"), get_all_requests, ("request_bp", "request_bp.get_all_requests"),
+     _request_scopes),
+    (re.compile(r"^/requests/available$"), available_foods, ("request_bp", "request_bp.available_foods"),
+     _available_scopes),
+    (re.compile(r"^/food/requests/nearby$"), get_nearby_requests, ("food_bp", "food_bp.get_nearby_requests"),
+     None),
+    (re.compile(r"^/profile/(\d+)$"), get_profile, ("user_bp", "user_bp.get_profile"), None),
+]
+
+
+def _rate_limited(req, endpoint):
+    # Same buckets as the Flask before_request hook
+    if not rate_limiter.enabled:
+        return None
+    user_id = req.headers.get("X-User-Id") or req.args.get("user_id")
+    retry_after = rate_limiter.check(endpoint, user_id, req.remote_addr)
+    if retry_after is None:
+        return None
+    return JSONResponse({"error": "Rate limit exceeded"}, 429, {"Retry-After": str(retry_after)})
+
+
+def _cors_headers(req):
+    # Mirrors flask-cors with origins="*" and supports_credentials=True
+    origin = req.headers.get("Origin")
+    if not origin:
+        return []
+    return [
+        (b"access-control-allow-origin", origin.encode("latin-1")),
+        (b"access-control-allow-credentials", b"true"),
+        (b"vary", b"Origin"),
+    ]
+
+
+class AsyncApp:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.fallback = WsgiToAsgi(wsgi_app)
+        self.engine = None
+        self.sessions = None
+        self.metrics = wsgi_app.extensions.get("request_metrics")
+
+    def _start(self):
+        if self.engine is None:
+            self.engine = create_async_db_engine(self.wsgi_app.config["ASYNC_DATABASE_URL"])
+            self.sessions = create_async_session_factory(self.engine)
+            if self.metrics:
+                self.metrics.listen(self.engine.sync_engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            if scope["path"] == "/events/stream":
+                return await self._serve_events(scope, receive, send)
+            for pattern, handler, endpoint, scopes in ROUTES:
+                found = pattern.match(scope["path"])
+                if found:
+                    return await self._serve(scope, send, handler, endpoint, scopes, found.groups())
+
+        return await self.fallback(scope, receive, send)
+
+    async def _serve(self, scope, send, handler, endpoint, scopes, params):
+        self._start()
+        req = AsyncRequest(scope)
+
+        if self.metrics is None:
+            return await self._respond(req, send, handler, endpoint[1], scopes, params)
+
+        with self.metrics.track(endpoint + (req.method,)) as outcome:
+            outcome["status"] = await self._respond(req, send, handler, endpoint[1], scopes, params)
+
+    async def _respond(self, req, send, handler, endpoint, scopes, params):
+        limited = _rate_limited(req, endpoint)
+        if limited is not None:
+            await limited.send(send, _cors_headers(req))
+            return limited.status
+
+        validators = {}
+        if scopes is not None:
+            # Same check as services.versions.conditional_get, before any
+            # session is opened
+            not_modified, validators = change_versions.check(scopes(req.args), req.args, req.headers)
+            if not_modified:
+                response = NotModifiedResponse(validators)
+                await response.send(send, _cors_headers(req))
+                return response.status
+
+        async with self.sessions() as session:
+            response = await handler(session, req, *params)
+            if response.status == 200:
+                response.headers.update(validators)
+            await response.send(send, _cors_headers(req))
+        return response.status
+
+    async def _serve_events(self, scope, receive, send):
+        # Each subscriber is a coroutine parked on an asyncio.Event rather
+        # than a thread, so a worker holds thousands of open streams. Not
+        # timed by the request metrics: a stream lasts as long as the client.
+        req = AsyncRequest(scope)
+        cors = _cors_headers(req)
+        limited = _rate_limited(req, "event_bp.stream")
+        if limited is not None:
+            return await limited.send(send, cors)
+        event_filter, last_event_id, error = _stream_args(req.args, req.headers)
+        if error:
+            return await JSONResponse({"error": error}, 400).send(send, cors)
+        try:
+            sub = event_hub.subscribe(event_filter, last_event_id)
+        except SubscriberLimit:
+            response = JSONResponse({"error": "Too many event stream subscribers"}, 503, {"Retry-After": "5"})
+            return await response.send(send, cors)
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            sub.close()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        heartbeat = self.wsgi_app.config["EVENTS_HEARTBEAT_SECONDS"]
+        headers = [(b"content-type", b"text/event-stream")]
+        headers += [(k.lower().encode(), v.encode()) for k, v in SSE_HEADERS.items()]
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": headers + cors})
+            await send({"type": "http.response.body", "body": b": connected\n\n", "more_body": True})
+            while not sub.closed:
+                events = await sub.get_async(heartbeat)
+                body = "".join(sse_frame(e) for e in events) if events else ": heartbeat\n\n"
+                await send({"type": "http.response.body", "body": body.encode(), "more_body": True})
+        except OSError:
+            pass  # client went away mid-write
+        finally:
+            watcher.cancel()
+            sub.close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = AsyncApp(flask_app)
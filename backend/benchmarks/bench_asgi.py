@@ -0,0 +1,199 @@
+"""Load test: async ASGI entry point (uvicorn asgi:app) vs the sync WSGI path
+(Werkzeug's threaded server, i.e. app.run()) on the read-heavy endpoints.
+
+    python -m benchmarks.bench_asgi [concurrency...]     (default: 50 500 2000)
+
+Each server is started in a subprocess against the same seeded database and
+hit by an asyncio client holding `concurrency` open connections. Use
+BENCH_DATABASE_URL=postgresql://... for numbers that mean anything;
+SQLite (the default) serialises writers and aiosqlite runs on a thread.
+Requires uvicorn and the async driver from requirements-async.txt.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date
+
+from benchmarks.common import BACKEND_DIR, insert_in_chunks, make_app, percentile
+
+USERS = 20000
+DURATION_SECONDS = 10
+LAT_RANGE = (12.8, 13.2)
+LONG_RANGE = (77.4, 77.8)
+
+SERVERS = {
+    "asgi": [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", "{port}",
+             "--log-level", "warning", "--backlog", "4096"],
+    "wsgi": [sys.executable, "-c",
+             "from werkzeug.serving import run_simple; from app import create_app; "
+             "run_simple('127.0.0.1', {port}, create_app(), threaded=True)"],
+}
+
+
+def seed(rng):
+    from models import FoodItem, Request, User
+
+    insert_in_chunks(User.__table__, [
+        {
+            "user_id": i,
+            "name": f"user{i}",
+            "email": f"user{i}@bench.local",
+            "password": "x",
+            "location_lat": rng.uniform(*LAT_RANGE),
+            "location_long": rng.uniform(*LONG_RANGE),
+        }
+        for i in range(1, USERS + 1)
+    ])
+    insert_in_chunks(Request.__table__, [
+        {"receiver_id": i, "food_type": "rice", "quantity": 10, "urgency_level": "medium", "status": "pending"}
+        for i in range(1, USERS + 1)
+    ])
+    insert_in_chunks(FoodItem.__table__, [
+        {"donor_id": i, "name": "rice", "quantity": 5, "expiry_date": date(2030, 1, 1), "status": "available"}
+        for i in range(1, USERS + 1)
+    ])
+
+
+def request_paths(rng, n):
+    paths = []
+    for _ in range(n):
+        kind = rng.randrange(4)
+        if kind == 0:
+            paths.append(f"/requests/all?limit=50&cursor={rng.randrange(USERS - 50)}")
+        elif kind == 1:
+            paths.append(f"/requests/available?limit=50&cursor={rng.randrange(USERS - 50)}")
+        elif kind == 2:
+            lat, lon = rng.uniform(*LAT_RANGE), rng.uniform(*LONG_RANGE)
+            paths.append(f"/food/requests/nearby?lat={lat:.5f}&long={lon:.5f}&limit=20")
+        else:
+            paths.append(f"/profile/{rng.randrange(1, USERS + 1)}")
+    return paths
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def _read_response(reader):
+    # Returns (status, keep_alive); the body is read and discarded
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("closed")
+    status = int(status_line.split()[1])
+    keep_alive = status_line.startswith(b"HTTP/1.1")
+    length = None
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            keep_alive = value.strip().lower() != "close"
+    if length is None:
+        await reader.read()
+        keep_alive = False
+    else:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _worker(port, paths, stop_at, samples, errors):
+    reader = writer = None
+    i = 0
+    while time.monotonic() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode())
+            status, keep_alive = await _read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors["connection"] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        samples.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            errors["status"] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, concurrency, paths, duration):
+    samples = []
+    errors = {"connection": 0, "status": 0}
+    stop_at = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(port, paths[c::concurrency] or paths, stop_at, samples, errors) for c in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50), 2) if samples else None,
+        "p95_ms": round(percentile(samples, 95), 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99), 2) if samples else None,
+        "errors": errors,
+    }
+
+
+def run(concurrency_levels):
+    rng = random.Random(12)
+    app = make_app()
+    with app.app_context():
+        seed(rng)
+    paths = request_paths(rng, 20000)
+
+    env = dict(os.environ, DATABASE_URL=app.config["SQLALCHEMY_DATABASE_URI"], EXPIRY_SWEEP_INTERVAL_SECONDS="0")
+    results = []
+    for name, command in SERVERS.items():
+        port = free_port()
+        proc = subprocess.Popen(
+            [part.replace("{port}", str(port)) for part in command],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(port)
+            asyncio.run(load(port, 10, paths, 2))  # warm-up
+            for concurrency in concurrency_levels:
+                result = asyncio.run(load(port, concurrency, paths, DURATION_SECONDS))
+                results.append({"server": name, "concurrency": concurrency, **result})
+                print(json.dumps(results[-1]), flush=True)
+        finally:
+            proc.terminate()
+            proc.wait()
+    return results
+
+
+if __name__ == "__main__":
+    levels = [int(arg) for arg in sys.argv[1:]] or [50, 500, 2000]
+    run(levels)
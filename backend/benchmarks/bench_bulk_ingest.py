@@ -0,0 +1,61 @@
+"""Rows/sec for /food/add (one insert + commit per item) vs /food/bulk.
+
+    python -m benchmarks.bench_bulk_ingest [rows]     (default: 5000)
+"""
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import make_app
+
+
+def items(n):
+    expiry = (date.today() + timedelta(days=3)).strftime("%Y-%m-%d")
+    return [{"user_id": 1, "food_name": f"bread {i}", "quantity": 10, "expiry_date": expiry} for i in range(n)]
+
+
+def rate(n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return round(n / elapsed)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = make_app()
+    from models import User, db
+
+    client = app.test_client()
+    rows = items(n)
+    csv_body = "food_name,quantity,expiry_date\n" + "".join(
+        f"{r['food_name']},{r['quantity']},{r['expiry_date']}\n" for r in rows
+    )
+
+    with app.app_context():
+        db.session.add(User(user_id=1, name="donor", email="donor@bench.local", password="x"))
+        db.session.commit()
+
+        def single():
+            for row in rows:
+                assert client.post("/food/add", json=row).status_code == 201
+
+        def bulk_json():
+            assert client.post("/food/bulk", json=rows).get_json()["inserted"] == n
+
+        def bulk_csv():
+            resp = client.post("/food/bulk?user_id=1", data=csv_body, content_type="text/csv")
+            assert resp.get_json()["inserted"] == n
+
+        results = {
+            "rows": n,
+            "single_rows_per_sec": rate(n, single),
+            "bulk_json_rows_per_sec": rate(n, bulk_json),
+            "bulk_csv_rows_per_sec": rate(n, bulk_csv),
+        }
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Concurrent claim load test: many threads hammer a few hot food items
+through /transactions/create and /requests/accept/<food_id>, then the
+ledger is checked for double-claims.
+
+    python -m benchmarks.bench_claims [threads] [attempts_per_thread]
+
+Exit code 1 if any item was claimed more than its quantity, or claimed
+whole more than once.
+"""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.common import make_app
+
+HOT_ITEMS = 5
+HOT_QUANTITY = 200
+WHOLE_ITEMS = 50
+
+
+def seed():
+    from models import FoodItem, User, db
+
+    db.session.add(User(user_id=1, name="donor", email="donor@bench.local", password="x"))
+    db.session.add(User(user_id=2, name="receiver", email="receiver@bench.local", password="x"))
+    expiry = date.today() + timedelta(days=3)
+    for food_id in range(1, HOT_ITEMS + WHOLE_ITEMS + 1):
+        db.session.add(FoodItem(food_id=food_id, donor_id=1, name="rice", expiry_date=expiry,
+                                quantity=HOT_QUANTITY if food_id <= HOT_ITEMS else 10))
+    db.session.commit()
+
+
+def hammer(app, n_threads, attempts):
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def worker(seed_offset):
+        client = app.test_client()
+        local = Counter()
+        for i in range(attempts):
+            n = seed_offset + i
+            if n % 2:
+                # Partial claims of one unit against the hot items
+                food_id = 1 + n % HOT_ITEMS
+                resp = client.post("/transactions/create", json={
+                    "donor_id": 1, "receiver_id": 2, "food_id": food_id, "quantity": 1})
+            else:
+                # Whole-item claims racing for the same few items
+                food_id = HOT_ITEMS + 1 + n % WHOLE_ITEMS
+                resp = client.post(f"/requests/accept/{food_id}", json={"receiver_id": 2})
+            local[resp.status_code] += 1
+        with lock:
+            outcomes.update(local)
+
+    threads = [threading.Thread(target=worker, args=(t * 7919,)) for t in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes, time.perf_counter() - start
+
+
+def check_ledger():
+    from models import FoodItem, Transaction, db
+
+    problems = []
+    claimed = dict(db.session.query(Transaction.food_id, db.func.sum(Transaction.quantity))
+                   .group_by(Transaction.food_id).all())
+    txn_counts = dict(db.session.query(Transaction.food_id, db.func.count())
+                      .group_by(Transaction.food_id).all())
+    for food in FoodItem.query.all():
+        original = HOT_QUANTITY if food.food_id <= HOT_ITEMS else 10
+        total = claimed.get(food.food_id, 0)
+        if total + food.quantity != original or total > original:
+            problems.append({"food_id": food.food_id, "claimed": total, "left": food.quantity})
+        if food.food_id > HOT_ITEMS and txn_counts.get(food.food_id, 0) > 1:
+            problems.append({"food_id": food.food_id, "whole_claims": txn_counts[food.food_id]})
+    return problems
+
+
+def main():
+    n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    app = make_app()
+    with app.app_context():
+        seed()
+
+    outcomes, elapsed = hammer(app, n_threads, attempts)
+
+    with app.app_context():
+        problems = check_ledger()
+        print(json.dumps({
+            "threads": n_threads,
+            "attempts": n_threads * attempts,
+            "elapsed_s": round(elapsed, 3),
+            "attempts_per_sec": round(n_threads * attempts / elapsed),
+            "status_codes": {str(k): v for k, v in sorted(outcomes.items())},
+            "double_claims": problems,
+        }))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Full list responses vs If-None-Match revalidation of an unchanged list.
+
+    python -m benchmarks.bench_conditional_get [rows]     (default: 20000)
+
+Reports latency, SQL statements and bytes on the wire per call for the
+list endpoints with ETag support.
+"""
+import json
+import sys
+from datetime import date
+
+from benchmarks.common import count_queries, insert_in_chunks, make_app, time_calls
+
+ITERATIONS = 200
+URLS = ["/requests/all?limit=1000", "/requests/available?limit=1000", "/food/my/1?limit=1000"]
+
+
+def seed(n):
+    from models import FoodItem, Request, User
+
+    insert_in_chunks(User.__table__, [{"user_id": 1, "name": "donor", "email": "donor@bench.local", "password": "x"}])
+    insert_in_chunks(FoodItem.__table__, [
+        {"donor_id": 1, "name": f"food{i}", "quantity": 5, "expiry_date": date(2030, 1, 1), "status": "available"}
+        for i in range(n)
+    ])
+    insert_in_chunks(Request.__table__, [
+        {"receiver_id": 1, "food_type": "rice", "quantity": 5, "urgency_level": "medium", "status": "pending"}
+        for _ in range(n)
+    ])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        seed(rows)
+        for url in URLS:
+            full = client.get(url)
+            headers = {"If-None-Match": full.headers["ETag"]}
+            with count_queries() as full_queries:
+                client.get(url)
+            with count_queries() as cond_queries:
+                revalidated = client.get(url, headers=headers)
+            print(json.dumps({
+                "url": url,
+                "full": {**time_calls(lambda i: client.get(url), ITERATIONS),
+                         "queries": full_queries["queries"], "bytes": len(full.data)},
+                "not_modified": {**time_calls(lambda i: client.get(url, headers=headers), ITERATIONS),
+                                 "status": revalidated.status_code, "queries": cond_queries["queries"],
+                                 "bytes": len(revalidated.data)},
+            }))
+
+
+if __name__ == "__main__":
+    main()
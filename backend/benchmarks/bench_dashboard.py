@@ -0,0 +1,54 @@
+"""Dashboard cost as one user's transaction history grows: deriving totals
+from /transactions/user/<id> (old) vs reading /stats/dashboard (new).
+
+    python -m benchmarks.bench_dashboard [sizes...]     (default: 1k 10k 100k)
+"""
+import json
+import sys
+from datetime import date
+
+from benchmarks.common import count_queries, insert_in_chunks, make_app, time_calls
+
+ITERATIONS = 30
+
+
+def seed(size):
+    from models import FoodItem, Transaction, User
+    from services.stats import rebuild_stats
+
+    insert_in_chunks(User.__table__, [
+        {"user_id": i, "name": f"user{i}", "email": f"user{i}@bench.local", "password": "x"} for i in (1, 2)
+    ])
+    insert_in_chunks(FoodItem.__table__, [
+        {"food_id": i, "donor_id": 1, "name": "rice", "quantity": 0, "expiry_date": date(2030, 1, 1), "status": "pending"}
+        for i in range(1, size + 1)
+    ])
+    insert_in_chunks(Transaction.__table__, [
+        {"txn_id": i, "donor_id": 1, "receiver_id": 2, "food_id": i, "quantity": 3,
+         "status": "completed" if i % 4 else "initiated"}
+        for i in range(1, size + 1)
+    ])
+    rebuild_stats()
+
+
+def run(size):
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        seed(size)
+
+        endpoints = {"derived_from_transactions": "/transactions/user/1", "stats_dashboard": "/stats/dashboard?user_id=1"}
+        result = {"transactions": size}
+        for name, url in endpoints.items():
+            with count_queries() as counter:
+                resp = client.get(url)
+            assert resp.status_code == 200, (url, resp.status_code)
+            timing = time_calls(lambda i: client.get(url), ITERATIONS)
+            result[name] = {"queries": counter["queries"], "response_bytes": len(resp.data), **timing}
+    return result
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for size in sizes:
+        print(json.dumps(run(size)))
@@ -0,0 +1,83 @@
+"""Demand forecast job (streamed aggregation, seasonal fit, result file) and the /forecast/shortfalls read.
+
+    python -m benchmarks.bench_forecast [requests] [foods]   (default: 300k x 300k over 8 weeks)
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import insert_in_chunks, make_app, percentile
+
+FOOD_TYPES = ["rice", "bread", "milk", "vegetables", "fruit", "lentils", "cooked meals", "eggs"]
+LAT_RANGE = (12.80, 13.20)   # ~45 km x 45 km city
+LONG_RANGE = (77.40, 77.80)
+WEEKLY = [1.0, 0.9, 0.9, 1.0, 1.2, 1.6, 1.4]  # demand peaks at the weekend
+
+
+def seed(n_requests, n_foods, rng, days=56):
+    from models import FoodItem, Request, User
+
+    n_users = 5000
+    insert_in_chunks(User.__table__, [
+        {"user_id": i, "name": f"user{i}", "email": f"user{i}@bench.local", "password": "x",
+         "location_lat": rng.uniform(*LAT_RANGE), "location_long": rng.uniform(*LONG_RANGE)}
+        for i in range(1, n_users + 1)
+    ])
+
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+
+    def created_at(weights):
+        while True:
+            moment = start + timedelta(seconds=rng.uniform(0, days * 86400))
+            if rng.random() * max(weights) < weights[moment.weekday()]:
+                return moment
+
+    insert_in_chunks(Request.__table__, [
+        {"receiver_id": rng.randint(1, n_users), "food_type": rng.choice(FOOD_TYPES), "quantity": rng.randint(1, 20),
+         "status": "pending", "created_at": created_at(WEEKLY)}
+        for _ in range(n_requests)
+    ])
+    insert_in_chunks(FoodItem.__table__, [
+        {"donor_id": rng.randint(1, n_users), "name": rng.choice(FOOD_TYPES), "quantity": rng.randint(1, 20),
+         "expiry_date": date.today() + timedelta(days=3), "status": "available", "created_at": created_at([1] * 7)}
+        for _ in range(n_foods)
+    ])
+
+
+def main():
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    n_foods = int(sys.argv[2]) if len(sys.argv) > 2 else n_requests
+
+    app = make_app()
+    from services.forecast import forecast_store, run_forecast
+
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        seed(n_requests, n_foods, random.Random(42))
+        job = run_forecast(directory)
+
+        forecast_store.directory = directory
+        client = app.test_client()
+        queries = [
+            "/forecast/shortfalls",
+            "/forecast/shortfalls?food_type=rice&days=3",
+            "/forecast/shortfalls?lat=13.0&long=77.6&radius_km=5",
+        ]
+        timings = {}
+        for url in queries:
+            samples = []
+            for _ in range(200):
+                started = time.perf_counter()
+                assert client.get(url).status_code == 200
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[url] = {"p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3)}
+
+        job["file_bytes"] = os.path.getsize(job.pop("file"))
+        print(json.dumps({"job": job, "endpoint": timings}))
+
+
+if __name__ == "__main__":
+    main()
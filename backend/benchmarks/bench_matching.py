@@ -0,0 +1,73 @@
+"""End-to-end batch matching round (load, score, allocate, bulk write).
+
+    python -m benchmarks.bench_matching [foods] [requests]   (default: 50k x 50k)
+"""
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import insert_in_chunks, make_app
+
+FOOD_TYPES = ["rice", "bread", "milk", "vegetables", "fruit", "lentils", "cooked meals", "eggs"]
+URGENCY = ["high", "medium", "low"]
+LAT_RANGE = (12.80, 13.20)   # ~45 km x 45 km city
+LONG_RANGE = (77.40, 77.80)
+
+
+def seed(n_foods, n_requests, rng):
+    from models import FoodItem, Request, User
+
+    n_users = n_foods + n_requests
+    insert_in_chunks(User.__table__, [
+        {
+            "user_id": i,
+            "name": f"user{i}",
+            "email": f"user{i}@bench.local",
+            "password": "x",
+            "location_lat": rng.uniform(*LAT_RANGE),
+            "location_long": rng.uniform(*LONG_RANGE),
+        }
+        for i in range(1, n_users + 1)
+    ])
+
+    today = date.today()
+    insert_in_chunks(FoodItem.__table__, [
+        {
+            "donor_id": i,
+            "name": rng.choice(FOOD_TYPES),
+            "quantity": rng.randint(1, 40),
+            "expiry_date": today + timedelta(days=rng.randint(0, 10)),
+            "status": "available",
+        }
+        for i in range(1, n_foods + 1)
+    ])
+
+    now = datetime.now()
+    insert_in_chunks(Request.__table__, [
+        {
+            "receiver_id": n_foods + i,
+            "food_type": rng.choice(FOOD_TYPES),
+            "quantity": rng.randint(1, 40),
+            "urgency_level": rng.choice(URGENCY),
+            "status": "pending",
+            "deadline": now + timedelta(hours=rng.randint(1, 96)) if rng.random() < 0.7 else None,
+        }
+        for i in range(1, n_requests + 1)
+    ])
+
+
+def main():
+    n_foods = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else n_foods
+
+    app = make_app()
+    from services.matching import run_batch_match
+
+    with app.app_context():
+        seed(n_foods, n_requests, random.Random(42))
+        print(json.dumps(run_batch_match()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Latency of /food/requests/nearby as the pending request table grows.
+
+    python -m benchmarks.bench_nearby [sizes...]     (default: 10k 100k 1M)
+"""
+import json
+import random
+import sys
+
+from benchmarks.common import insert_in_chunks, make_app, time_calls
+
+# Pending requests are spread over a ~1000 km x 1000 km region
+LAT_RANGE = (8.0, 17.0)
+LONG_RANGE = (73.0, 82.0)
+QUERIES = 200
+K = 50
+
+
+def seed(size, rng):
+    from models import Request, User
+
+    users = [
+        {
+            "user_id": i,
+            "name": f"receiver{i}",
+            "email": f"receiver{i}@bench.local",
+            "password": "x",
+            "location_lat": rng.uniform(*LAT_RANGE),
+            "location_long": rng.uniform(*LONG_RANGE),
+        }
+        for i in range(1, size + 1)
+    ]
+    insert_in_chunks(User.__table__, users)
+    del users
+
+    requests = [
+        {
+            "receiver_id": i,
+            "food_type": "rice",
+            "quantity": 10,
+            "urgency_level": "medium",
+            "status": "pending",
+        }
+        for i in range(1, size + 1)
+    ]
+    insert_in_chunks(Request.__table__, requests)
+
+
+def run(size):
+    rng = random.Random(size)
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        seed(size, rng)
+
+        points = [(rng.uniform(9.0, 16.0), rng.uniform(74.0, 81.0)) for _ in range(QUERIES)]
+
+        def query(i):
+            lat, lon = points[i]
+            resp = client.get(f"/food/requests/nearby?lat={lat}&long={lon}&limit={K}")
+            assert resp.status_code == 200 and len(resp.get_json()) == K
+
+        stats = time_calls(query, QUERIES)
+
+    return {"pending_requests": size, "k": K, **stats}
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        print(json.dumps(run(size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Notification outbox: write cost on POST /transactions/create and worker drain throughput.
+
+    python -m benchmarks.bench_outbox [transactions] [batch_size]   (default: 2000, 500)
+
+Run with OUTBOX_ENABLED=0 for the create latency without the outbox insert.
+"""
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import count_queries, insert_in_chunks, make_app, percentile
+
+
+def seed(n_users):
+    from models import FoodItem, User
+
+    insert_in_chunks(User.__table__, [
+        {"user_id": i, "name": f"user{i}", "email": f"user{i}@bench.local", "password": "x"}
+        for i in range(1, n_users + 1)
+    ])
+    insert_in_chunks(FoodItem.__table__, [
+        {"food_id": i, "donor_id": i, "name": "rice", "quantity": 10 ** 6,
+         "expiry_date": date.today() + timedelta(days=5), "status": "available"}
+        for i in range(1, n_users + 1)
+    ])
+
+
+def create_transactions(client, n, n_users):
+    timings = []
+    for i in range(n):
+        donor = i % n_users + 1
+        body = {"donor_id": donor, "receiver_id": (i + 7) % n_users + 1, "food_id": donor, "quantity": 1}
+        started = time.perf_counter()
+        response = client.post("/transactions/create", json=body)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 201, response.get_json()
+    return timings
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    n_users = 200
+
+    app = make_app()
+    from app import db
+    from services.notifications import MemorySink, OutboxWorker
+
+    with app.app_context():
+        seed(n_users)
+        client = app.test_client()
+
+        with count_queries() as counter:
+            timings = create_transactions(client, n, n_users)
+
+        sink = MemorySink()
+        worker = OutboxWorker(sink, batch_size=batch_size)
+        started = time.perf_counter()
+        worker.run()
+        drain_s = time.perf_counter() - started
+        db.session.remove()
+
+        print(json.dumps({
+            "transactions": n,
+            "create_p50_ms": round(percentile(timings, 50), 3),
+            "create_p95_ms": round(percentile(timings, 95), 3),
+            "queries_per_create": round(counter["queries"] / n, 2),
+            "drained": worker.delivered,
+            "recipient_batches": len(sink.deliveries),
+            "drain_seconds": round(drain_s, 3),
+            "drain_per_second": round(worker.delivered / drain_s, 1),
+            "worker": worker.stats(),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Logins/sec per core with hashing inline vs in the process pool, and how
+much a login storm slows a cheap endpoint (/profile) served alongside it.
+
+    python -m benchmarks.bench_password_hashing [workers...]   (default: 0 and 1..cpu_count)
+
+workers=0 is the old behaviour (hashing on the request thread). Uses the
+configured PASSWORD_HASH_METHOD, so expect a few logins/sec per core with
+production work factors.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import insert_in_chunks, make_app, percentile
+
+USERS = 200
+LOGIN_THREADS = 16
+DURATION_SECONDS = 10
+BACKOFF_SECONDS = 1.0
+
+
+def seed():
+    from models import User
+    from services.passwords import password_hasher
+
+    # One hash shared by every user; only verification cost matters here
+    password = password_hasher.hash("secret")
+    insert_in_chunks(User.__table__, [
+        {"user_id": i, "name": f"user{i}", "email": f"user{i}@bench.local", "password": password}
+        for i in range(1, USERS + 1)
+    ])
+
+
+def run(app, workers):
+    from services.passwords import password_hasher
+
+    password_hasher.shutdown()  # fresh pool sized for this run
+    app.config["PASSWORD_HASH_WORKERS"] = workers
+    password_hasher.init_app(app)
+
+    stop_at = time.monotonic() + DURATION_SECONDS
+    statuses = {}
+    profile_samples = []
+    lock = threading.Lock()
+
+    def login_loop(n):
+        client = app.test_client()
+        i = n
+        while time.monotonic() < stop_at:
+            resp = client.post("/login", json={"email": f"user{i % USERS + 1}@bench.local", "password": "secret"})
+            with lock:
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+            if resp.status_code == 503:
+                time.sleep(BACKOFF_SECONDS)  # a well-behaved client honouring Retry-After
+            i += LOGIN_THREADS
+
+    def profile_loop():
+        client = app.test_client()
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            client.get("/profile/1")
+            profile_samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    if workers:
+        password_hasher.verify(password_hasher.hash("warm"), "warm")  # start the pool
+    cpu_before = os.times()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(LOGIN_THREADS + 1) as pool:
+        pool.submit(profile_loop)
+        for n in range(LOGIN_THREADS):
+            pool.submit(login_loop, n)
+    elapsed = time.perf_counter() - started
+    password_hasher.shutdown()  # children's CPU time is counted once reaped
+    cpu_after = os.times()
+
+    # Busy cores across this process and its pool children
+    cpu_seconds = sum(after - before for after, before in zip(cpu_after[:4], cpu_before[:4]))
+    logins = statuses.get(200, 0)
+    return {
+        "workers": workers,
+        "logins": logins,
+        "logins_per_sec": round(logins / elapsed, 2),
+        "logins_per_cpu_second": round(logins / cpu_seconds, 2) if cpu_seconds else None,
+        "rejected_503": statuses.get(503, 0),
+        "profile_p50_ms": round(percentile(profile_samples, 50), 2),
+        "profile_p95_ms": round(percentile(profile_samples, 95), 2),
+    }
+
+
+def main():
+    worker_counts = [int(arg) for arg in sys.argv[1:]] or [0] + list(range(1, (os.cpu_count() or 1) + 1))
+    os.environ.setdefault("EXPIRY_SWEEP_INTERVAL_SECONDS", "0")
+    app = make_app()
+    with app.app_context():
+        app.config["PASSWORD_HASH_WORKERS"] = 0
+        from services.passwords import password_hasher
+        password_hasher.init_app(app)
+        seed()
+        for workers in worker_counts:
+            print(json.dumps(run(app, workers)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
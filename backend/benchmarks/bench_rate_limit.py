@@ -0,0 +1,119 @@
+"""Rate limiter overhead: token-bucket checks alone and per request through the app.
+
+    python -m benchmarks.bench_rate_limit [checks] [threads]   (default: 200000, 8)
+
+Prints the cost of one check (user + IP + endpoint bucket) single-threaded
+and from several threads over distinct callers, the request latency of
+GET /profile/<id> with the limiter off and on, and how a client looping on
+/requests/all is cut off, with one X-User-Id and with a new one per call.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from benchmarks.common import insert_in_chunks, make_app, percentile
+
+
+def check_cost(limiter, n, threads):
+    # Microseconds per check(); every caller stays well under its limits
+    def run(worker, count, out):
+        started = time.perf_counter()
+        for i in range(count):
+            limiter.check("bench.endpoint", str(worker * 1000 + i % 1000), f"10.0.{worker}.{i % 250}")
+        out[worker] = time.perf_counter() - started
+
+    single = {}
+    run(0, n, single)
+    limiter.store.clear()
+
+    per_thread = n // threads
+    out = {}
+    workers = [threading.Thread(target=run, args=(w, per_thread, out)) for w in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall = time.perf_counter() - started
+    return {
+        "check_us": round(single[0] / n * 1e6, 3),
+        "threaded_checks_per_second": round(per_thread * threads / wall),
+    }
+
+
+def request_latency(client, n):
+    timings = []
+    for i in range(n):
+        started = time.perf_counter()
+        response = client.get(f"/profile/{i % 100 + 1}", headers={"X-User-Id": str(i % 100 + 1)},
+                              environ_base={"REMOTE_ADDR": f"10.1.0.{i % 100}"})
+        timings.append((time.perf_counter() - started) * 1e6)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    requests = 5_000
+
+    os.environ["RATE_LIMIT_ENABLED"] = "1"
+    os.environ["RATE_LIMIT_USER"] = "1000000/1000000"
+    os.environ["RATE_LIMIT_IP"] = "1000000/1000000"
+    os.environ["RATE_LIMIT_ENDPOINTS"] = ("bench.endpoint=1000000/1000000,"
+                                          "request_bp.get_all_requests=2/10")
+    app = make_app()
+    from models import User
+    from services.rate_limit import LocalBucketStore, rate_limiter
+
+    with app.app_context():
+        insert_in_chunks(User.__table__, [
+            {"user_id": i, "name": f"user{i}", "email": f"user{i}@bench.local", "password": "x"}
+            for i in range(1, 101)
+        ])
+        client = app.test_client()
+        checks = check_cost(rate_limiter, n, threads)
+
+        rate_limiter.store.clear()
+        request_latency(client, 500)  # warm up
+        # Alternating rounds so drift hits both sides; the hook stays
+        # registered, a limiter without buckets is the baseline
+        user_limit, ip_limit = rate_limiter.user_limit, rate_limiter.ip_limit
+        on, off = [], []
+        for _ in range(5):
+            rate_limiter.user_limit, rate_limiter.ip_limit = user_limit, ip_limit
+            on += request_latency(client, requests // 5)
+            rate_limiter.user_limit = rate_limiter.ip_limit = None
+            off += request_latency(client, requests // 5)
+        rate_limiter.user_limit, rate_limiter.ip_limit = user_limit, ip_limit
+
+        # One client looping on an expensive list: the endpoint bucket
+        # (default 2/s, burst 10) lets the burst through, then answers 429,
+        # whatever X-User-Id it sends
+        loops = {}
+        retry_after = None
+        for name, user_id in (("loop", lambda i: "7"), ("loop_rotating_user", lambda i: str(1000 + i))):
+            rate_limiter.store = LocalBucketStore()
+            statuses = []
+            for i in range(50):
+                response = client.get("/requests/all", headers={"X-User-Id": user_id(i)})
+                statuses.append(response.status_code)
+                retry_after = response.headers.get("Retry-After", retry_after)
+            loops[f"{name}_allowed"] = statuses.count(200)
+            loops[f"{name}_limited"] = statuses.count(429)
+
+        print(json.dumps({
+            **checks,
+            "request_p50_us_without_buckets": round(percentile(off, 50), 1),
+            "request_p50_us_with_buckets": round(percentile(on, 50), 1),
+            "request_p50_overhead_us": round(percentile(on, 50) - percentile(off, 50), 1),
+            **loops,
+            "retry_after": retry_after,
+            "limiter": rate_limiter.stats(),
+        }))
+
+
+if __name__ == "__main__":
+    main()
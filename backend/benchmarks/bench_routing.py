@@ -0,0 +1,98 @@
+"""Route planning over initiated transactions (load, savings, 2-opt, bulk update).
+
+    python -m benchmarks.bench_routing [transactions] [drivers]   (default: 2500 -> 5000 stops, unlimited)
+"""
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import insert_in_chunks, make_app
+
+LAT_RANGE = (12.80, 13.20)   # ~45 km x 45 km city
+LONG_RANGE = (77.40, 77.80)
+
+
+def seed(n_transactions, rng):
+    from models import FoodItem, Transaction, User
+
+    # One donor and one receiver per transaction, clustered around a few
+    # dozen neighbourhoods like the load test city
+    centres = [(rng.uniform(*LAT_RANGE), rng.uniform(*LONG_RANGE)) for _ in range(24)]
+    users = []
+    for i in range(1, 2 * n_transactions + 1):
+        lat, lon = rng.choice(centres)
+        users.append({
+            "user_id": i,
+            "name": f"user{i}",
+            "email": f"user{i}@bench.local",
+            "password": "x",
+            "location_lat": lat + rng.gauss(0, 0.02),
+            "location_long": lon + rng.gauss(0, 0.02),
+        })
+    insert_in_chunks(User.__table__, users)
+
+    today = date.today()
+    insert_in_chunks(FoodItem.__table__, [
+        {
+            "food_id": i,
+            "donor_id": i,
+            "name": "cooked meals",
+            "quantity": rng.randint(1, 30),
+            "expiry_date": today + timedelta(days=rng.randint(0, 3)),
+            "status": "pending",
+        }
+        for i in range(1, n_transactions + 1)
+    ])
+
+    now = datetime.now()
+    insert_in_chunks(Transaction.__table__, [
+        {
+            "donor_id": i,
+            "receiver_id": n_transactions + i,
+            "food_id": i,
+            "quantity": None,
+            "status": "initiated",
+            "created_at": now,
+        }
+        for i in range(1, n_transactions + 1)
+    ])
+
+
+def main():
+    n_transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 2_500
+    drivers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    app = make_app()
+    from services.routing import RoutingOptions, _load_jobs, plan, run_route_plan
+
+    with app.app_context():
+        seed(n_transactions, random.Random(42))
+        options = RoutingOptions(drivers=drivers)
+
+        # Planning alone, with the savings-only distance for comparison
+        jobs = _load_jobs()
+        started = time.perf_counter()
+        planner, routable, routes, skipped = plan(jobs, datetime.now(), options)
+        plan_ms = (time.perf_counter() - started) * 1000
+        savings_km = sum(planner.route_km(planner.stops(route)) for route in planner.build_routes())
+        two_opt_km = sum(planner.route_km(route) for route in routes)
+        separate_km = sum(planner.route_km(planner.stops([job])) for job in range(planner.n))
+
+        summary = run_route_plan(options)
+        summary.pop("routes")
+        print(json.dumps({
+            "stops": 2 * n_transactions,
+            "plan_ms": round(plan_ms, 1),
+            "routes": len(routes),
+            "unrouted": len(skipped),
+            "one_trip_per_transaction_km": round(separate_km, 1),
+            "savings_km": round(savings_km, 1),
+            "savings_two_opt_km": round(two_opt_km, 1),
+            "end_to_end": summary,
+        }))
+
+
+if __name__ == "__main__":
+    main()
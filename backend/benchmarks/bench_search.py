@@ -0,0 +1,73 @@
+"""/search latency over pending requests vs the LIKE scan a donor had to
+run before (filter /requests/all by substring).
+
+    python -m benchmarks.bench_search [rows]     (default: 100000)
+
+On SQLite this measures the in-memory trigram fallback (index build time
+is reported separately); point BENCH_DATABASE_URL at PostgreSQL, after
+`flask db upgrade`, to measure the GIN indexes.
+"""
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import insert_in_chunks, make_app, time_calls
+
+ITERATIONS = 200
+FOODS = ["rice", "brown rice", "basmati rice", "wheat flour", "lentils", "tomatoes", "onions", "potatoes",
+         "milk", "bread", "eggs", "apples", "bananas", "cooking oil", "sugar", "chickpeas", "spinach",
+         "paneer", "yogurt", "biscuits"]
+QUERIES = ["rice", "tomato", "potatos", "flour", "chick peas", "banana", "oil", "yoghurt"]
+
+
+def seed(n):
+    from models import Request, User
+
+    rng = random.Random(7)
+    insert_in_chunks(User.__table__, [{"user_id": 1, "name": "receiver", "email": "r@bench.local", "password": "x"}])
+    now = datetime.utcnow()
+    insert_in_chunks(Request.__table__, [
+        {"receiver_id": 1, "food_type": f"{rng.choice(FOODS)} {i % 97}", "quantity": 5, "urgency_level": "medium",
+         "status": "pending" if i % 5 else "completed", "created_at": now - timedelta(hours=rng.randrange(24 * 60))}
+        for i in range(n)
+    ])
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = make_app()
+    client = app.test_client()
+
+    from app import db
+    from models import Request
+    from services.search import TARGETS, fallback_indexes
+
+    with app.app_context():
+        seed(rows)
+        if app.extensions["search"] != "postgresql":
+            started = time.perf_counter()
+            index = fallback_indexes.get(TARGETS["requests"])
+            print(json.dumps({"fallback_index_build_ms": round((time.perf_counter() - started) * 1000, 1),
+                              "indexed_rows": len(index.docs), "trigrams": len(index.postings)}))
+
+        def like_scan(i):
+            q = QUERIES[i % len(QUERIES)]
+            db.session.query(Request.request_id, Request.food_type).filter(
+                Request.status == "pending", Request.food_type.ilike(f"%{q}%")).all()
+
+        def search(i):
+            resp = client.get(f"/search?q={QUERIES[i % len(QUERIES)]}&type=requests")
+            assert resp.status_code == 200
+
+        for name, fn in (("like_scan", like_scan), ("search_endpoint", search)):
+            print(json.dumps({"variant": name, "rows": rows, **time_calls(fn, ITERATIONS)}))
+
+        for q in QUERIES:
+            hits = client.get(f"/search?q={q}&type=requests&limit=3").get_json()["requests"]
+            print(json.dumps({"query": q, "top": [(h["food_type"], h["score"]) for h in hits]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Serializing a 100k-row request list: the previous per-row code (ORM
+instances, hand-built dicts, strftime, stdlib jsonify) vs the declared
+schemas over row tuples, encoded by the stdlib and the orjson providers.
+
+    python -m benchmarks.bench_serialization [rows]     (default: 100000)
+
+Each variant is timed end to end (query, dicts, JSON response body) and
+split into its build and encode phases; best of REPEATS runs.
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import insert_in_chunks, make_app
+
+REPEATS = 3
+
+
+def seed(n):
+    from models import Request, User
+
+    insert_in_chunks(User.__table__, [{"user_id": 1, "name": "receiver", "email": "r@bench.local", "password": "x"}])
+    created = datetime(2026, 1, 1, 8, 30, 15, 250000)
+    insert_in_chunks(Request.__table__, [
+        {"receiver_id": 1, "food_type": "rice", "quantity": 5, "urgency_level": "medium", "status": "pending",
+         "deadline": created + timedelta(days=2, seconds=i) if i % 3 else None, "created_at": created}
+        for i in range(n)
+    ])
+
+
+def legacy_to_dict(r):
+    # The per-row serializer /requests/all used before the schemas
+    return {
+        "request_id": r.request_id,
+        "receiver_id": r.receiver_id,
+        "food_type": r.food_type,
+        "quantity": r.quantity,
+        "urgency_level": r.urgency_level,
+        "deadline": r.deadline.strftime("%Y-%m-%d %H:%M:%S") if r.deadline else None,
+        "created_at": r.created_at.strftime("%Y-%m-%d %H:%M:%S") if r.created_at else None
+    }
+
+
+def timed(build, provider):
+    from app import db
+
+    best = None
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        data = build()
+        built = time.perf_counter()
+        body = provider.response(data).get_data()
+        done = time.perf_counter()
+        run = (built - started, done - built, done - started)
+        best = run if best is None or run[2] < best[2] else best
+    return body, {"build_ms": round(best[0] * 1000, 1), "encode_ms": round(best[1] * 1000, 1),
+                  "total_ms": round(best[2] * 1000, 1), "bytes": len(body)}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = make_app()
+
+    from flask.json.provider import DefaultJSONProvider
+    from models import Request
+    from services.json_provider import OrjsonProvider, orjson
+    from services.serializers import REQUEST
+
+    variants = [
+        ("legacy_orm_strftime_stdlib", lambda: [legacy_to_dict(r) for r in Request.query.order_by(Request.request_id)],
+         DefaultJSONProvider(app)),
+        ("schema_rows_stdlib", lambda: REQUEST.dump_many(REQUEST.query().order_by(Request.request_id)),
+         DefaultJSONProvider(app)),
+    ]
+    if orjson is not None:
+        variants.append(("schema_rows_orjson", lambda: REQUEST.dump_many(REQUEST.query().order_by(Request.request_id)),
+                         OrjsonProvider(app)))
+
+    with app.app_context():
+        seed(rows)
+        results = {}
+        baseline = None
+        for name, build, provider in variants:
+            body, result = timed(build, provider)
+            baseline = baseline or body
+            result["same_output"] = body == baseline
+            results[name] = result
+            print(json.dumps({"variant": name, "rows": rows, **result}), flush=True)
+
+        legacy = results["legacy_orm_strftime_stdlib"]["total_ms"]
+        for name, result in results.items():
+            print(json.dumps({"variant": name, "speedup_vs_legacy": round(legacy / result["total_ms"], 2)}))
+
+
+if __name__ == "__main__":
+    main()
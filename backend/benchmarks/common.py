@@ -0,0 +1,80 @@
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+# Benchmarks run from backend/ (python -m benchmarks.<name>) against a
+# throwaway SQLite database unless BENCH_DATABASE_URL points elsewhere.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def make_app(db_path="bench.sqlite3"):
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        url = f"sqlite:///{os.path.abspath(db_path)}"
+    os.environ["DATABASE_URL"] = url
+    # Benchmarks hammer the app from one address; measure it unthrottled
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    # One process does every write, so local change versions and cached
+    # profiles are safe
+    os.environ.setdefault("CHANGE_VERSIONS_LOCAL", "1")
+    os.environ.setdefault("CACHE_PROFILES_LOCAL", "1")
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def insert_in_chunks(table, rows, chunk_size=20000):
+    from app import db
+
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(table.insert(), rows[start:start + chunk_size])
+    db.session.commit()
+
+
+@contextmanager
+def count_queries():
+    # Counts SQL statements sent through the app engine inside the block
+    from sqlalchemy import event
+    from app import db
+
+    counter = {"queries": 0}
+
+    def before_cursor_execute(*args):
+        counter["queries"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
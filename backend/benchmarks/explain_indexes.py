@@ -0,0 +1,110 @@
+"""EXPLAIN the hot filter paths and fail (exit code 1) if any of them stops
+using its index. Runs on SQLite by default, or on PostgreSQL via
+BENCH_DATABASE_URL (sequential scans are disabled there so the small seed
+still shows which index the planner can use).
+
+    python -m benchmarks.explain_indexes
+"""
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.common import insert_in_chunks, make_app
+
+ROWS = 20_000
+
+
+def seed(rng):
+    from models import FoodItem, Request, Transaction, User
+
+    today = date.today()
+    insert_in_chunks(User.__table__, [
+        {"user_id": i, "name": f"user{i}", "email": f"user{i}@bench.local", "password": "x",
+         "location_lat": rng.uniform(8, 17), "location_long": rng.uniform(73, 82)}
+        for i in range(1, ROWS + 1)
+    ])
+    insert_in_chunks(FoodItem.__table__, [
+        {"food_id": i, "donor_id": rng.randint(1, ROWS), "name": "rice", "quantity": 5,
+         "expiry_date": today + timedelta(days=rng.randint(-30, 10)),
+         "status": rng.choices(["available", "collected", "expired"], [1, 6, 3])[0]}
+        for i in range(1, ROWS + 1)
+    ])
+    insert_in_chunks(Request.__table__, [
+        {"request_id": i, "receiver_id": rng.randint(1, ROWS), "food_type": "rice", "quantity": 5,
+         "deadline": datetime.now() + timedelta(days=rng.randint(-30, 10)),
+         "status": rng.choices(["pending", "completed", "cancelled"], [1, 6, 3])[0]}
+        for i in range(1, ROWS + 1)
+    ])
+    insert_in_chunks(Transaction.__table__, [
+        {"txn_id": i, "donor_id": rng.randint(1, ROWS), "receiver_id": rng.randint(1, ROWS),
+         "food_id": i, "status": rng.choices(["initiated", "completed", "cancelled"], [1, 6, 3])[0]}
+        for i in range(1, ROWS + 1)
+    ])
+
+
+def hot_queries():
+    # (expected index names, query) pairs mirroring the routes and services
+    from models import FoodItem, Request, Transaction, User, db
+
+    today = date.today()
+    return [
+        (["ix_food_items_status_food_id"],
+         FoodItem.query.filter(FoodItem.status == "available", FoodItem.food_id > 100)
+         .order_by(FoodItem.food_id).limit(101)),
+        (["ix_food_items_donor_id_food_id"],
+         FoodItem.query.filter(FoodItem.donor_id == 7, FoodItem.food_id > 0).order_by(FoodItem.food_id)),
+        (["ix_food_items_available_expiry"],
+         FoodItem.query.filter(FoodItem.status == "available", FoodItem.expiry_date < today - timedelta(days=20))),
+        (["ix_requests_status_request_id"],
+         Request.query.filter(Request.status == "pending", Request.request_id > 100)
+         .order_by(Request.request_id).limit(101)),
+        (["ix_requests_pending_deadline"],
+         Request.query.filter(Request.status == "pending", Request.deadline < datetime.now() - timedelta(days=20))),
+        (["ix_users_location", "ix_requests_pending_receiver_id"],
+         db.session.query(Request.request_id)
+         .join(User, User.user_id == Request.receiver_id)
+         .filter(Request.status == "pending", User.location_lat.between(12.0, 12.1),
+                 User.location_long.between(77.0, 77.1))),
+        (["ix_transactions_status_txn_id"],
+         Transaction.query.filter(Transaction.status == "initiated", Transaction.txn_id > 0)
+         .order_by(Transaction.txn_id).limit(101)),
+        (["ix_transactions_donor_id_txn_id", "ix_transactions_receiver_id_txn_id"],
+         Transaction.query.filter((Transaction.donor_id == 7) | (Transaction.receiver_id == 7))),
+    ]
+
+
+def explain(query):
+    from models import db
+
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    rows = db.session.execute(text(prefix + sql)).all()
+    return sql, "\n".join(str(row[-1]) for row in rows)
+
+
+def main():
+    app = make_app()
+    from models import db
+
+    failures = 0
+    with app.app_context():
+        seed(random.Random(7))
+        db.session.execute(text("ANALYZE"))
+        if db.engine.dialect.name == "postgresql":
+            db.session.execute(text("SET enable_seqscan = off"))
+
+        for expected, query in hot_queries():
+            _, plan = explain(query)
+            missing = [name for name in expected if name not in plan]
+            failures += bool(missing)
+            print(json.dumps({"expected": expected, "ok": not missing, "plan": plan.splitlines()}))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+"""Load test for every endpoint in food_bp, request_bp, transaction_bp and
+user_bp against a seeded synthetic city.
+
+    python -m benchmarks.load_test [options]
+    python -m benchmarks.load_test --compare base.json new.json [--threshold 0.25]
+
+The city is N users clustered around neighbourhood centres (donors and
+receivers), M food items and K requests with realistic status mixes, and
+transactions behind the accepted/completed requests. Each endpoint is then
+called --iterations times from --concurrency threads; results (p50/p95/p99
+latency, throughput, SQL statements per request, status codes) go to stdout
+and, with --out, to a JSON file that --compare diffs against another run.
+
+Requests go through the WSGI app in-process by default. --url drives a
+running server instead; seed its database by pointing BENCH_DATABASE_URL at
+it (queries per request are only counted in-process), and start it with
+RATE_LIMIT_ENABLED=0 or the per-IP buckets throttle the run.
+
+    --users 2000 --foods 20000 --requests 20000 --concurrency 8 --iterations 200
+    --only /food/       run only endpoints whose name contains the string
+    --seed 7            random seed for the city and the request mix
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import BACKEND_DIR, insert_in_chunks, make_app, percentile
+
+BLUEPRINTS = ("food_bp", "request_bp", "transaction_bp", "user_bp")
+CITY_CENTRE = (12.9716, 77.5946)
+NEIGHBOURHOODS = 24
+NEIGHBOURHOOD_SPREAD_KM = 1.5
+CITY_RADIUS_KM = 12.0
+PASSWORD = "load-test-password"
+
+FOODS = ["rice", "brown rice", "wheat flour", "lentils", "tomatoes", "onions", "potatoes", "milk", "bread",
+         "eggs", "apples", "bananas", "cooking oil", "sugar", "chickpeas", "spinach", "paneer", "yogurt"]
+FOOD_STATUSES = {"available": 55, "pending": 10, "in_transit": 5, "collected": 20, "expired": 10}
+REQUEST_STATUSES = {"pending": 45, "accepted": 10, "in_transit": 5, "completed": 25, "cancelled": 8,
+                    "timed_out": 7}
+URGENCY = {"high": 20, "medium": 50, "low": 30}
+
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def city_point(rng, centres):
+    # Gaussian scatter around a random neighbourhood centre
+    lat, lon = rng.choice(centres)
+    km_per_deg_lon = 111.32 * math.cos(math.radians(lat))
+    return (lat + rng.gauss(0, NEIGHBOURHOOD_SPREAD_KM) / 110.57,
+            lon + rng.gauss(0, NEIGHBOURHOOD_SPREAD_KM) / km_per_deg_lon)
+
+
+# ------------------------------------------------------------
+# Synthetic city
+# ------------------------------------------------------------
+class City:
+    # Ids the scenarios draw from. Destructive calls (deletes, claims) pop
+    # from their own pools so every call hits a row in the state it expects.
+
+    def __init__(self):
+        self.donors = []
+        self.receivers = []
+        self.users = {}  # user_id -> (lat, lon)
+        self.foods = []
+        self.available_foods = []
+        self.deletable_foods = deque()
+        self.requests = []
+        self.pending_requests = []
+        self.cancellable_requests = deque()
+        self.transactions = []
+        self.next_user = 0
+        self.lock = threading.Lock()
+
+    def pop(self, pool):
+        with self.lock:
+            return pool.popleft() if pool else None
+
+    def new_user_number(self):
+        with self.lock:
+            self.next_user += 1
+            return self.next_user
+
+
+def seed_city(n_users, n_foods, n_requests, rng):
+    from app import db
+    from models import FoodItem, Request, Role, Transaction, User, user_roles
+    from services.passwords import password_hasher
+    from services.stats import rebuild_stats
+
+    city = City()
+    centres = []
+    for _ in range(NEIGHBOURHOODS):
+        distance, bearing = CITY_RADIUS_KM * math.sqrt(rng.random()), rng.uniform(0, 2 * math.pi)
+        centres.append((CITY_CENTRE[0] + distance * math.cos(bearing) / 110.57,
+                        CITY_CENTRE[1] + distance * math.sin(bearing) / (111.32 * math.cos(math.radians(CITY_CENTRE[0])))))
+
+    insert_in_chunks(Role.__table__, [
+        {"role_id": i, "role_name": name} for i, name in enumerate(("donor", "receiver", "admin"), 1)
+    ])
+    # One real hash (configured method) shared by every seeded user
+    password = password_hasher.hash(PASSWORD)
+    users, roles = [], []
+    for user_id in range(1, n_users + 1):
+        lat, lon = city_point(rng, centres)
+        city.users[user_id] = (lat, lon)
+        users.append({"user_id": user_id, "name": f"user{user_id}", "email": f"user{user_id}@load.local",
+                      "password": password, "phone": f"9{user_id:09d}", "location_lat": lat, "location_long": lon,
+                      "created_at": datetime.utcnow() - timedelta(days=rng.randrange(365))})
+        role_id = 1 if rng.random() < 0.4 else 2
+        (city.donors if role_id == 1 else city.receivers).append(user_id)
+        roles.append({"user_id": user_id, "role_id": role_id})
+    city.next_user = n_users
+    insert_in_chunks(User.__table__, users)
+    db.session.execute(user_roles.insert(), roles)
+
+    today = date.today()
+    foods = []
+    for food_id in range(1, n_foods + 1):
+        status = weighted(rng, FOOD_STATUSES)
+        expiry = today + timedelta(days=rng.randrange(1, 8)) if status != "expired" else \
+            today - timedelta(days=rng.randrange(1, 30))
+        foods.append({"food_id": food_id, "donor_id": rng.choice(city.donors), "name": rng.choice(FOODS),
+                      "quantity": rng.randrange(5, 200), "expiry_date": expiry, "status": status,
+                      "created_at": datetime.utcnow() - timedelta(hours=rng.randrange(24 * 30))})
+    insert_in_chunks(FoodItem.__table__, foods)
+    city.foods = [f["food_id"] for f in foods]
+    available = [f for f in foods if f["status"] == "available"]
+
+    requests, transactions = [], []
+    for request_id in range(1, n_requests + 1):
+        status = weighted(rng, REQUEST_STATUSES)
+        created = datetime.utcnow() - timedelta(hours=rng.randrange(24 * 60))
+        requests.append({"request_id": request_id, "receiver_id": rng.choice(city.receivers),
+                         "food_type": rng.choice(FOODS), "quantity": rng.randrange(1, 20),
+                         "urgency_level": weighted(rng, URGENCY), "status": status, "created_at": created,
+                         "deadline": created + timedelta(days=rng.randrange(1, 10))})
+        if status in ("accepted", "in_transit", "completed"):
+            food = rng.choice(foods)
+            transactions.append({
+                "txn_id": len(transactions) + 1, "donor_id": food["donor_id"],
+                "receiver_id": requests[-1]["receiver_id"], "food_id": food["food_id"], "request_id": request_id,
+                "quantity": requests[-1]["quantity"],
+                "status": {"accepted": "initiated", "in_transit": "in_progress"}.get(status, "completed"),
+                "created_at": created + timedelta(hours=1),
+            })
+    insert_in_chunks(Request.__table__, requests)
+    insert_in_chunks(Transaction.__table__, transactions)
+    rebuild_stats()
+    db.session.commit()
+
+    with_txn_foods = {t["food_id"] for t in transactions}
+    city.requests = [r["request_id"] for r in requests]
+    city.pending_requests = [r["request_id"] for r in requests if r["status"] == "pending"]
+    city.available_foods = [f["food_id"] for f in available]
+    with_txn_requests = {t["request_id"] for t in transactions}
+    # Reserved for deletes: rows nothing references
+    city.deletable_foods = deque(f["food_id"] for f in foods
+                                 if f["food_id"] not in with_txn_foods and f["status"] != "available")
+    city.cancellable_requests = deque(r["request_id"] for r in requests
+                                      if r["request_id"] not in with_txn_requests and r["status"] == "cancelled")
+    city.transactions = [t["txn_id"] for t in transactions]
+    return city
+
+
+# ------------------------------------------------------------
+# Scenarios: (name, method, build(rng, city) -> (url, json body or RawBody))
+# ------------------------------------------------------------
+class RawBody:
+    # A non-JSON body with its own headers (CSV uploads)
+    def __init__(self, data, headers):
+        self.data = data
+        self.headers = headers
+
+
+def _near(rng, city):
+    lat, lon = city.users[rng.choice(city.donors)]
+    return f"lat={lat:.5f}&long={lon:.5f}"
+
+
+def _new_user(rng, city):
+    n = city.new_user_number()
+    lat, lon = city.users[rng.randrange(1, len(city.users) + 1)]
+    return {"name": f"user{n}", "email": f"user{n}@load.local", "password": PASSWORD, "phone": f"9{n:09d}",
+            "location_lat": lat, "location_long": lon, "roles": [rng.choice(["donor", "receiver"])]}
+
+
+def _expiry(rng):
+    return (date.today() + timedelta(days=rng.randrange(1, 8))).isoformat()
+
+
+def _food_item(rng, city):
+    return {"user_id": rng.choice(city.donors), "food_name": rng.choice(FOODS), "quantity": rng.randrange(5, 50),
+            "expiry_date": _expiry(rng)}
+
+
+def _food_csv(rng, city, n=50):
+    lines = ["user_id,food_name,quantity,expiry_date"]
+    lines += [",".join(str(item[k]) for k in ("user_id", "food_name", "quantity", "expiry_date"))
+              for item in (_food_item(rng, city) for _ in range(n))]
+    headers = {"Content-Type": "text/csv", "Idempotency-Key": uuid.uuid4().hex}
+    return RawBody(("\n".join(lines) + "\n").encode(), headers)
+
+
+SCENARIOS = [
+    # user_bp
+    ("POST /register", "POST", lambda rng, c: ("/register", _new_user(rng, c))),
+    ("POST /login", "POST", lambda rng, c: (
+        "/login", {"email": f"user{rng.randrange(1, len(c.users) + 1)}@load.local", "password": PASSWORD})),
+    ("GET /profile/<user_id>", "GET", lambda rng, c: (f"/profile/{rng.randrange(1, len(c.users) + 1)}", None)),
+    ("PUT /profile/<user_id>", "PUT", lambda rng, c: (
+        f"/profile/{rng.randrange(1, len(c.users) + 1)}", {"phone": f"8{rng.randrange(10 ** 9):09d}"})),
+    # food_bp
+    ("POST /food/add", "POST", lambda rng, c: ("/food/add", {
+        "user_id": rng.choice(c.donors), "food_name": rng.choice(FOODS), "quantity": rng.randrange(5, 50),
+        "expiry_date": _expiry(rng)})),
+    ("POST /food/bulk", "POST", lambda rng, c: (
+        "/food/bulk", [_food_item(rng, c) for _ in range(50)])),
+    ("POST /food/bulk (csv, Idempotency-Key)", "POST", lambda rng, c: ("/food/bulk", _food_csv(rng, c))),
+    ("GET /food/my/<donor_id>", "GET", lambda rng, c: (f"/food/my/{rng.choice(c.donors)}", None)),
+    ("PUT /food/update/<food_id>", "PUT", lambda rng, c: (
+        f"/food/update/{rng.choice(c.foods)}", {"quantity": rng.randrange(5, 200)})),
+    ("DELETE /food/delete/<food_id>", "DELETE", lambda rng, c: (f"/food/delete/{c.pop(c.deletable_foods)}", None)),
+    ("GET /food/requests/nearby", "GET", lambda rng, c: (
+        f"/food/requests/nearby?{_near(rng, c)}&radius_km=3", None)),
+    ("POST /food/match/<food_id>/<request_id>", "POST", lambda rng, c: (
+        f"/food/match/{rng.choice(c.available_foods)}/{rng.choice(c.pending_requests)}", None)),
+    ("POST /food/match/batch", "POST", lambda rng, c: ("/food/match/batch", {"dry_run": True})),
+    ("GET /food/transactions/donor/<donor_id>", "GET", lambda rng, c: (
+        f"/food/transactions/donor/{rng.choice(c.donors)}", None)),
+    # request_bp
+    ("POST /requests/add_request", "POST", lambda rng, c: ("/requests/add_request", {
+        "receiver_id": rng.choice(c.receivers), "food_type": rng.choice(FOODS), "quantity": rng.randrange(1, 20),
+        "urgency_level": weighted(rng, URGENCY), "deadline": f"{_expiry(rng)} 18:00:00"})),
+    ("GET /requests/all", "GET", lambda rng, c: ("/requests/all?status=pending&limit=100", None)),
+    ("PUT /requests/update/<request_id>", "PUT", lambda rng, c: (
+        f"/requests/update/{rng.choice(c.pending_requests)}", {"urgency_level": weighted(rng, URGENCY)})),
+    ("DELETE /requests/cancel/<request_id>", "DELETE", lambda rng, c: (
+        f"/requests/cancel/{c.pop(c.cancellable_requests)}", None)),
+    ("GET /requests/available", "GET", lambda rng, c: ("/requests/available?limit=100", None)),
+    ("POST /requests/accept/<food_id>", "POST", lambda rng, c: (
+        f"/requests/accept/{rng.choice(c.available_foods)}",
+        {"receiver_id": rng.choice(c.receivers), "request_id": rng.choice(c.pending_requests), "quantity": 1})),
+    # transaction_bp
+    ("POST /transactions/create", "POST", lambda rng, c: ("/transactions/create", {
+        "donor_id": rng.choice(c.donors), "receiver_id": rng.choice(c.receivers),
+        "food_id": rng.choice(c.available_foods), "quantity": 1})),
+    ("GET /transactions/all", "GET", lambda rng, c: ("/transactions/all?limit=100", None)),
+    ("GET /transactions/user/<user_id>", "GET", lambda rng, c: (
+        f"/transactions/user/{rng.choice(c.receivers)}", None)),
+    ("PUT /transactions/update/<txn_id>", "PUT", lambda rng, c: (
+        f"/transactions/update/{rng.choice(c.transactions)}", {"status": "in_progress"})),
+    ("POST /transactions/routes/plan", "POST", lambda rng, c: (
+        "/transactions/routes/plan", {"drivers": 20, "dry_run": True})),
+]
+
+
+def missing_scenarios(app):
+    # Endpoints of the covered blueprints with no scenario, e.g. a new route
+    covered = {name for name, _, _ in SCENARIOS}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.split(".", 1)[0] not in BLUEPRINTS:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if f"{method} {rule.rule.replace('<int:', '<')}" not in covered:
+                missing.append(f"{method} {rule.rule}")
+    return missing
+
+
+# ------------------------------------------------------------
+# Drivers
+# ------------------------------------------------------------
+class InProcessDriver:
+    # Flask test client per thread; SQL statements counted per thread
+    def __init__(self, app):
+        from sqlalchemy import event
+        from app import db
+
+        self.app = app
+        self.local = threading.local()
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.local.queries = getattr(self.local, "queries", 0) + 1
+
+    def call(self, method, url, body):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        self.local.queries = 0
+        if isinstance(body, RawBody):
+            resp = client.open(url, method=method, data=body.data, headers=body.headers)
+        else:
+            resp = client.open(url, method=method, json=body)
+        resp.close()
+        return resp.status_code, self.local.queries
+
+
+class HttpDriver:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def call(self, method, url, body):
+        if isinstance(body, RawBody):
+            data, headers = body.data, body.headers
+        else:
+            data = json.dumps(body).encode() if body is not None else None
+            headers = {"Content-Type": "application/json"} if data else {}
+        req = urllib.request.Request(self.base_url + url, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                resp.read()
+                return resp.status, None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def run_scenario(driver, city, scenario, iterations, concurrency, seed):
+    name, method, build = scenario
+    rngs = threading.local()
+    counter = iter(range(iterations))
+    samples, queries, statuses = [], [], Counter()
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        rngs.rng = random.Random(f"{seed}:{name}:{worker_id}")
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            url, body = build(rngs.rng, city)
+            started = time.perf_counter()
+            status, n = driver.call(method, url, body)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                samples.append(elapsed)
+                statuses[status] += 1
+                if n is not None:
+                    queries.append(n)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+
+    return {
+        "calls": len(samples),
+        "errors": sum(count for status, count in statuses.items() if status >= 500),
+        "status_counts": {str(status): count for status, count in sorted(statuses.items())},
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "throughput_rps": round(len(samples) / wall, 1),
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run(args):
+    app = make_app("load_test.sqlite3")
+    missing = missing_scenarios(app)
+    if missing:
+        print(json.dumps({"error": "endpoints without a load test scenario", "endpoints": missing}))
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        started = time.perf_counter()
+        city = seed_city(args.users, args.foods, args.requests, rng)
+        seed_ms = round((time.perf_counter() - started) * 1000)
+        from app import db
+        dialect = db.engine.dialect.name
+
+    driver = HttpDriver(args.url) if args.url else InProcessDriver(app)
+    commit, dirty = git_revision()
+    results = {
+        "meta": {
+            "commit": commit, "dirty": dirty, "at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(), "database": dialect, "target": args.url or "in-process",
+            "users": args.users, "foods": args.foods, "requests": args.requests,
+            "concurrency": args.concurrency, "iterations": args.iterations, "seed": args.seed, "seed_ms": seed_ms,
+        },
+        "endpoints": {},
+    }
+    print(json.dumps({"meta": results["meta"]}), flush=True)
+
+    for scenario in SCENARIOS:
+        if args.only and args.only not in scenario[0]:
+            continue
+        result = run_scenario(driver, city, scenario, args.iterations, args.concurrency, args.seed)
+        results["endpoints"][scenario[0]] = result
+        print(json.dumps({"endpoint": scenario[0], **result}), flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return results
+
+
+# ------------------------------------------------------------
+# Comparing two runs
+# ------------------------------------------------------------
+def compare(base_path, new_path, threshold):
+    # Regression: p95 slower by more than `threshold`, more SQL statements
+    # per request, or new 5xx responses
+    with open(base_path) as f:
+        base = json.load(f)["endpoints"]
+    with open(new_path) as f:
+        new = json.load(f)["endpoints"]
+
+    regressions = 0
+    for name in sorted(set(base) | set(new)):
+        before, after = base.get(name), new.get(name)
+        if before is None or after is None:
+            print(json.dumps({"endpoint": name, "only_in": "new" if before is None else "base"}))
+            continue
+        p95_change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        more_queries = (before["queries_per_request"] is not None and after["queries_per_request"] is not None
+                        and after["queries_per_request"] > before["queries_per_request"])
+        new_errors = after["errors"] > before["errors"]
+        regressed = p95_change > threshold or more_queries or new_errors
+        regressions += regressed
+        print(json.dumps({
+            "endpoint": name,
+            "p95_ms": [before["p95_ms"], after["p95_ms"]], "p95_change": round(p95_change, 3),
+            "queries_per_request": [before["queries_per_request"], after["queries_per_request"]],
+            "errors": [before["errors"], after["errors"]],
+            "throughput_rps": [before["throughput_rps"], after["throughput_rps"]],
+            "regressed": regressed,
+        }))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--foods", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--only")
+    parser.add_argument("--url")
+    parser.add_argument("--out")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    results = run(args)
+    sys.exit(1 if any(r["errors"] for r in results["endpoints"].values()) else 0)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("EXPIRY_SWEEP_INTERVAL_SECONDS", "0")
+    main()
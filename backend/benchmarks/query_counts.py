@@ -0,0 +1,123 @@
+"""Fails (exit code 1) when an endpoint's SQL query count grows with the
+number of rows it returns, i.e. when an N+1 lazy load sneaks back in, or
+when revalidating an unchanged list (If-None-Match) runs any query at all.
+
+    python -m benchmarks.query_counts
+"""
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.common import count_queries, insert_in_chunks, make_app
+
+SIZES = (5, 200)
+
+# Cheap hashes, hashed inline, so /login is measured on its queries alone
+HASH_METHOD = "pbkdf2:sha256:1000"
+os.environ.setdefault("PASSWORD_HASH_METHOD", HASH_METHOD)
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+ENDPOINTS = [
+    ("GET", "/transactions/all?limit=1000", None),
+    ("GET", "/transactions/user/1", None),
+    ("GET", "/requests/all?limit=1000", None),
+    ("GET", "/requests/available?limit=1000", None),
+    ("GET", "/food/my/1?limit=1000", None),
+    ("GET", "/food/requests/nearby?user_id=1&radius_km=50", None),
+    ("GET", "/profile/1", None),
+    ("GET", "/stats/dashboard?user_id=1", None),
+    ("POST", "/login", {"email": "user1@bench.local", "password": "secret"}),
+]
+
+# Answered from change versions alone when the client's copy is current
+CONDITIONAL = ["/requests/all?limit=1000", "/requests/available?limit=1000", "/food/my/1?limit=1000"]
+
+
+def seed(n):
+    from app import db
+    from models import FoodItem, Request, Role, Transaction, User, user_roles
+
+    password = generate_password_hash("secret", method=HASH_METHOD)
+    insert_in_chunks(Role.__table__, [
+        {"role_id": i, "role_name": name} for i, name in enumerate(("donor", "receiver", "admin"), 1)
+    ])
+    insert_in_chunks(User.__table__, [
+        {
+            "user_id": i,
+            "name": f"user{i}",
+            "email": f"user{i}@bench.local",
+            "password": password,
+            "location_lat": 12.9 + i * 1e-4,
+            "location_long": 77.6,
+        }
+        for i in range(1, n + 1)
+    ])
+    db.session.execute(user_roles.insert(), [{"user_id": 1, "role_id": r} for r in (1, 2, 3)])
+    insert_in_chunks(FoodItem.__table__, [
+        {"food_id": i, "donor_id": 1, "name": f"food{i}", "quantity": 5,
+         "expiry_date": date.today() + timedelta(days=3), "status": "available"}
+        for i in range(1, n + 1)
+    ])
+    insert_in_chunks(Request.__table__, [
+        {"request_id": i, "receiver_id": i, "food_type": "rice", "quantity": 5, "status": "pending"}
+        for i in range(1, n + 1)
+    ])
+    insert_in_chunks(Transaction.__table__, [
+        {"txn_id": i, "donor_id": 1, "receiver_id": i, "food_id": i, "status": "initiated"}
+        for i in range(1, n + 1)
+    ])
+
+
+def measure(n):
+    app = make_app()
+    client = app.test_client()
+    counts = {}
+    with app.app_context():
+        seed(n)
+        for method, url, body in ENDPOINTS:
+            with count_queries() as counter:
+                resp = client.open(url, method=method, json=body)
+            assert resp.status_code < 400, (url, resp.status_code)
+            counts[f"{method} {url}"] = counter["queries"]
+    return counts
+
+
+def measure_conditional():
+    app = make_app()
+    client = app.test_client()
+    results = []
+    with app.app_context():
+        seed(SIZES[0])
+        for url in CONDITIONAL:
+            etag = client.get(url).headers["ETag"]
+            with count_queries() as counter:
+                resp = client.get(url, headers={"If-None-Match": etag})
+            results.append({"endpoint": f"GET {url} (If-None-Match)", "status": resp.status_code,
+                            "queries": counter["queries"],
+                            "ok": resp.status_code == 304 and counter["queries"] == 0})
+    return results
+
+
+def main():
+    small, large = (measure(n) for n in SIZES)
+
+    failures = 0
+    for endpoint, base in small.items():
+        grown = large[endpoint]
+        ok = grown <= base
+        failures += not ok
+        print(json.dumps({"endpoint": endpoint, f"queries@{SIZES[0]}": base,
+                          f"queries@{SIZES[1]}": grown, "ok": ok}))
+
+    for result in measure_conditional():
+        failures += not result["ok"]
+        print(json.dumps(result))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Check: one uvicorn worker holds N concurrent /events/stream subscribers
+and every subscriber gets exactly the new listings its filters select.
+
+    python -m benchmarks.sse_subscribers [subscribers]     (default: 1000)
+
+Subscribers are split between no filter, ?food_type=rice, ?food_type=dal
+and ?types=food&lat=&long=&radius_km= around one of the donors. Listings
+are then posted through the regular /food/add route and fan-out latency
+(POST sent -> event read by a subscriber) is reported. Exits 1 if any
+subscriber misses an event or receives one it filtered out. Requires
+uvicorn (requirements-async.txt).
+"""
+import asyncio
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_asgi import SERVERS, free_port, wait_for
+from benchmarks.common import BACKEND_DIR, insert_in_chunks, make_app, percentile
+
+LISTINGS = 20
+CONNECT_CONCURRENCY = 100
+DELIVERY_TIMEOUT_SECONDS = 30
+
+# donor id -> location; donor 1 is inside the geo subscribers' radius
+DONORS = {1: (12.97, 77.59), 2: (28.61, 77.21)}
+CENTER = (12.95, 77.60)
+RADIUS_KM = 20
+
+FILTERS = [
+    ("all", "", lambda food: True),
+    ("rice", "food_type=rice", lambda food: food["name"] == "rice"),
+    ("dal", "food_type=dal", lambda food: food["name"] == "dal"),
+    ("nearby", f"types=food&lat={CENTER[0]}&long={CENTER[1]}&radius_km={RADIUS_KM}",
+     lambda food: food["donor_id"] == 1),
+]
+
+
+def seed():
+    from models import User
+
+    insert_in_chunks(User.__table__, [
+        {"user_id": i, "name": f"donor{i}", "email": f"donor{i}@bench.local", "password": "x",
+         "location_lat": lat, "location_long": lon}
+        for i, (lat, lon) in DONORS.items()
+    ])
+
+
+class Subscriber:
+    def __init__(self, kind, query):
+        self.kind = kind
+        self.query = query
+        self.received = {}  # food id -> perf_counter when read
+        self.ready = asyncio.Event()
+
+    async def run(self, port, connect_slots):
+        async with connect_slots:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2 ** 20)
+            writer.write(f"GET /events/stream?{self.query} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                         f"Accept: text/event-stream\r\n\r\n".encode())
+            status = int((await reader.readline()).split()[1])
+            if status != 200:
+                raise RuntimeError(f"subscribe failed with {status}")
+        try:
+            # Chunked transfer framing lines are ignored; SSE lines are whole
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.startswith(b": connected"):
+                    self.ready.set()
+                elif line.startswith(b"data: "):
+                    event = json.loads(line[6:])
+                    if event["type"] == "food.created":
+                        self.received[event["id"]] = time.perf_counter()
+        finally:
+            writer.close()
+
+
+def post_food(port, food):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    body = {"user_id": food["donor_id"], "food_name": food["name"], "quantity": 1, "expiry_date": "2030-01-01"}
+    conn.request("POST", "/food/add", json.dumps(body), {"Content-Type": "application/json"})
+    status = conn.getresponse().status
+    conn.close()
+    if status != 201:
+        raise RuntimeError(f"/food/add returned {status}")
+
+
+async def check(port, count):
+    subscribers = [Subscriber(*FILTERS[i % len(FILTERS)][:2]) for i in range(count)]
+    connect_slots = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(sub.run(port, connect_slots)) for sub in subscribers]
+    await asyncio.wait_for(asyncio.gather(*(sub.ready.wait() for sub in subscribers)), 60)
+    connect_seconds = time.perf_counter() - started
+
+    # Food ids are assigned in posting order on the fresh database
+    foods = [{"id": i + 1, "name": "rice" if i % 2 else "dal", "donor_id": 1 + (i // 2) % 2} for i in range(LISTINGS)]
+    sent_at = {}
+    for food in foods:
+        sent_at[food["id"]] = time.perf_counter()
+        await asyncio.to_thread(post_food, port, food)
+
+    matchers = {kind: match for kind, _, match in FILTERS}
+    expected = {sub: {f["id"] for f in foods if matchers[sub.kind](f)} for sub in subscribers}
+    deadline = time.monotonic() + DELIVERY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline and any(expected[sub] - set(sub.received) for sub in subscribers):
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.5)  # let anything unexpected arrive too
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    missing = sum(len(expected[sub] - set(sub.received)) for sub in subscribers)
+    unexpected = sum(len(set(sub.received) - expected[sub]) for sub in subscribers)
+    latencies = [(at - sent_at[food_id]) * 1000 for sub in subscribers for food_id, at in sub.received.items()]
+    return {
+        "subscribers": count,
+        "connect_seconds": round(connect_seconds, 2),
+        "listings": LISTINGS,
+        "deliveries": len(latencies),
+        "missing": missing,
+        "unexpected": unexpected,
+        "fanout_p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "fanout_p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+        "fanout_max_ms": round(max(latencies), 1) if latencies else None,
+        "ok": missing == 0 and unexpected == 0,
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    app = make_app()
+    with app.app_context():
+        seed()
+
+    env = dict(os.environ, DATABASE_URL=app.config["SQLALCHEMY_DATABASE_URI"], EXPIRY_SWEEP_INTERVAL_SECONDS="0",
+               EVENTS_MAX_SUBSCRIBERS=str(max(count, 10000)))
+    port = free_port()
+    proc = subprocess.Popen(
+        [part.replace("{port}", str(port)) for part in SERVERS["asgi"]],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port)
+        result = asyncio.run(check(port, count))
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(json.dumps(result))
+    return result["ok"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,166 @@
+import json
+import time
+
+import click
+from flask import current_app
+
+from app import db
+from services.archival import archive_closed, ensure_transaction_partitions, make_sink
+from services.expiry import run_sweep
+from services.forecast import run_forecast
+from services.idempotency import idempotency
+from services.matching import MAX_DISTANCE_KM, run_batch_match
+from services.notifications import OutboxWorker, make_sink as make_notify_sink
+from services.routing import (MAX_ROUTE_HOURS, MAX_STOPS, VEHICLE_CAPACITY, RoutingOptions,
+                              run_route_plan)
+from services.stats import rebuild_stats
+
+
+# flask --app app match-batch [--max-distance-km 15] [--dry-run]
+@click.command("match-batch")
+@click.option("--max-distance-km", default=MAX_DISTANCE_KM, show_default=True, type=float)
+@click.option("--dry-run", is_flag=True, help="Compute assignments without writing transactions.")
+def match_batch_command(max_distance_km, dry_run):
+    """Match all available food items with pending requests in one pass."""
+    summary = run_batch_match(max_distance_km=max_distance_km, dry_run=dry_run)
+    click.echo(json.dumps(summary))
+
+
+# flask --app app plan-routes [--drivers 20] [--capacity 100] [--depot-lat .. --depot-long ..] [--dry-run]
+@click.command("plan-routes")
+@click.option("--drivers", type=int, help="Default: as many routes as needed.")
+@click.option("--capacity", default=VEHICLE_CAPACITY, show_default=True, type=int)
+@click.option("--max-stops", default=MAX_STOPS, show_default=True, type=int)
+@click.option("--max-route-hours", default=MAX_ROUTE_HOURS, show_default=True, type=float)
+@click.option("--depot-lat", type=float, help="With --depot-long, routes start here instead of the first pickup.")
+@click.option("--depot-long", type=float)
+@click.option("--dry-run", is_flag=True, help="Plan routes without moving transactions to in_progress.")
+def plan_routes_command(drivers, capacity, max_stops, max_route_hours, depot_lat, depot_long, dry_run):
+    """Plan pickup/drop routes for initiated transactions and start them."""
+    depot = (depot_lat, depot_long) if depot_lat is not None and depot_long is not None else None
+    options = RoutingOptions(capacity=capacity, max_stops=max_stops, max_route_hours=max_route_hours,
+                             drivers=drivers, depot=depot)
+    summary = run_route_plan(options, dry_run=dry_run)
+    summary.pop("routes")  # the stop lists are for the API; the CLI prints the totals
+    click.echo(json.dumps(summary))
+
+
+# flask --app app sweep-expired [--loop --interval 60] [--batch-size 1000]
+@click.command("sweep-expired")
+@click.option("--batch-size", default=1000, show_default=True, type=int)
+@click.option("--loop", is_flag=True, help="Keep sweeping every --interval seconds.")
+@click.option("--interval", default=60, show_default=True, type=float)
+def sweep_expired_command(batch_size, loop, interval):
+    """Mark expired food items and timed-out requests."""
+    while True:
+        click.echo(json.dumps(run_sweep(batch_size)))
+        if not loop:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+
+# flask --app app rebuild-stats
+@click.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recompute the impact dashboard counters from the source tables."""
+    click.echo(json.dumps(rebuild_stats()))
+
+
+# flask --app app archive-closed [--older-than-days 180] [--sink table|csv|parquet --dir archive]
+@click.command("archive-closed")
+@click.option("--older-than-days", type=int, help="Default: ARCHIVE_AFTER_DAYS.")
+@click.option("--batch-size", type=int, help="Default: ARCHIVE_BATCH_SIZE.")
+@click.option("--sink", type=click.Choice(["table", "csv", "parquet"]), help="Default: ARCHIVE_SINK.")
+@click.option("--dir", "directory", help="Output directory for csv/parquet. Default: ARCHIVE_DIR.")
+@click.option("--loop", is_flag=True, help="Keep archiving every --interval seconds.")
+@click.option("--interval", default=3600, show_default=True, type=float)
+def archive_closed_command(older_than_days, batch_size, sink, directory, loop, interval):
+    """Move closed requests and transactions to the archive."""
+    config = current_app.config
+    sink = make_sink(sink or config["ARCHIVE_SINK"], directory or config["ARCHIVE_DIR"])
+    while True:
+        click.echo(json.dumps(archive_closed(
+            older_than_days if older_than_days is not None else config["ARCHIVE_AFTER_DAYS"],
+            batch_size or config["ARCHIVE_BATCH_SIZE"],
+            sink,
+        )))
+        if not loop:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+
+# flask --app app ensure-partitions [--months-ahead 3]
+@click.command("ensure-partitions")
+@click.option("--months-ahead", default=3, show_default=True, type=int)
+def ensure_partitions_command(months_ahead):
+    """Create the monthly transactions partitions up to --months-ahead (PostgreSQL)."""
+    click.echo(json.dumps({"created_partitions": ensure_transaction_partitions(months_ahead)}))
+
+
+# flask --app app purge-idempotency-keys [--loop --interval 3600] [--batch-size 1000]
+@click.command("purge-idempotency-keys")
+@click.option("--batch-size", default=1000, show_default=True, type=int)
+@click.option("--loop", is_flag=True, help="Keep purging every --interval seconds.")
+@click.option("--interval", default=3600, show_default=True, type=float)
+def purge_idempotency_keys_command(batch_size, loop, interval):
+    """Delete stored Idempotency-Key responses older than IDEMPOTENCY_TTL_SECONDS."""
+    while True:
+        click.echo(json.dumps({"purged_idempotency_keys": idempotency.purge_expired(batch_size)}))
+        if not loop:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+
+# flask --app app drain-outbox [--loop --interval 1] [--sink log|webhook|memory] [--batch-size 500]
+@click.command("drain-outbox")
+@click.option("--sink", type=click.Choice(["log", "webhook", "memory"]), help="Default: NOTIFY_SINK.")
+@click.option("--batch-size", type=int, help="Default: OUTBOX_BATCH_SIZE.")
+@click.option("--loop", is_flag=True, help="Keep draining, polling every --interval seconds when idle.")
+@click.option("--interval", default=1.0, show_default=True, type=float)
+@click.option("--report-every", default=10.0, show_default=True, type=float,
+              help="Seconds between lag/throughput reports with --loop.")
+def drain_outbox_command(sink, batch_size, loop, interval, report_every):
+    """Deliver pending donor/receiver notifications from the outbox."""
+    config = current_app.config
+    worker = OutboxWorker(
+        make_notify_sink(sink or config["NOTIFY_SINK"], config),
+        batch_size=batch_size or config["OUTBOX_BATCH_SIZE"],
+        max_attempts=config["OUTBOX_MAX_ATTEMPTS"],
+        backoff_seconds=config["OUTBOX_BACKOFF_SECONDS"],
+        backoff_max_seconds=config["OUTBOX_BACKOFF_MAX_SECONDS"],
+    )
+    worker.run(loop=loop, interval=interval, report_every=report_every,
+               report=lambda stats: click.echo(json.dumps(stats)))
+
+
+# flask --app app forecast-demand [--history-days 56] [--horizon-days 7] [--cell-km 5] [--dir forecast]
+@click.command("forecast-demand")
+@click.option("--history-days", type=int, help="Default: FORECAST_HISTORY_DAYS.")
+@click.option("--horizon-days", type=int, help="Default: FORECAST_HORIZON_DAYS.")
+@click.option("--cell-km", type=float, help="Default: FORECAST_CELL_KM.")
+@click.option("--dir", "directory", help="Default: FORECAST_DIR.")
+def forecast_demand_command(history_days, horizon_days, cell_km, directory):
+    """Forecast demand, supply and shortfall per area and food type."""
+    config = current_app.config
+    click.echo(json.dumps(run_forecast(
+        directory or config["FORECAST_DIR"],
+        history_days=history_days or config["FORECAST_HISTORY_DAYS"],
+        horizon_days=horizon_days or config["FORECAST_HORIZON_DAYS"],
+        cell_km=cell_km or config["FORECAST_CELL_KM"],
+        chunk_size=config["FORECAST_CHUNK_SIZE"],
+    )))
+
+
+def register_commands(app):
+    app.cli.add_command(match_batch_command)
+    app.cli.add_command(plan_routes_command)
+    app.cli.add_command(sweep_expired_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(archive_closed_command)
+    app.cli.add_command(ensure_partitions_command)
+    app.cli.add_command(purge_idempotency_keys_command)
+    app.cli.add_command(drain_outbox_command)
+    app.cli.add_command(forecast_demand_command)
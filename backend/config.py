@@ -1,8 +1,169 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
+
+from services.async_db import async_database_url
+from services.db_pool import InstrumentedQueuePool
 
 load_dotenv()
 
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+def build_engine_options(url):
+    # Pool sizing only applies to server databases; SQLite keeps the pools
+    # Flask-SQLAlchemy picks for it.
+    if not url or url.startswith("sqlite"):
+        return {}
+
+    options = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True)}
+    connect_args = {}
+
+    if _env_bool("DB_PGBOUNCER", False):
+        # PgBouncer (transaction pooling) owns the pool, and server-side
+        # prepared statements would not survive across its backends
+        options["poolclass"] = NullPool
+        if url.startswith("postgresql+psycopg:"):
+            connect_args["prepare_threshold"] = None
+        elif url.startswith("postgresql+asyncpg:"):
+            connect_args["prepared_statement_cache_size"] = 0
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout_ms and url.startswith("postgresql+asyncpg:"):
+        connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+    elif statement_timeout_ms and url.startswith("postgresql"):
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Async engine for the ASGI entry point (asgi.py); derived from
+    # DATABASE_URL (asyncpg / aiosqlite) unless set explicitly
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(SQLALCHEMY_DATABASE_URI)
+
+    # Background expiry sweeper; 0 disables the in-process thread (use
+    # `flask sweep-expired --loop` as a separate worker instead)
+    EXPIRY_SWEEP_INTERVAL_SECONDS = int(os.getenv("EXPIRY_SWEEP_INTERVAL_SECONDS", "0"))
+    EXPIRY_SWEEP_BATCH_SIZE = int(os.getenv("EXPIRY_SWEEP_BATCH_SIZE", "1000"))
+
+    # `flask archive-closed` moves completed/cancelled/timed-out rows older
+    # than ARCHIVE_AFTER_DAYS to the archive tables ("table", readable with
+    # ?archived=include) or to compressed files under ARCHIVE_DIR ("csv",
+    # or "parquet" with pyarrow installed)
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+    ARCHIVE_SINK = os.getenv("ARCHIVE_SINK", "table")
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+    # Create endpoints honour an Idempotency-Key header: the first response
+    # is kept for IDEMPOTENCY_TTL_SECONDS in idempotency_keys (`flask
+    # purge-idempotency-keys` deletes older rows), the latest
+    # IDEMPOTENCY_CACHE_SIZE also in process memory. A key whose first
+    # request has not finished after IDEMPOTENCY_LOCK_SECONDS can be retried.
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+    # Donor/receiver notifications for new transactions and status changes
+    # go to the notification_outbox table with the change itself;
+    # `flask drain-outbox --loop` delivers them through NOTIFY_SINK ("log",
+    # "webhook" to NOTIFY_WEBHOOK_URL, or "memory"), retrying failures with
+    # exponential backoff until OUTBOX_MAX_ATTEMPTS
+    OUTBOX_ENABLED = _env_bool("OUTBOX_ENABLED", True)
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "5"))
+    OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+    NOTIFY_SINK = os.getenv("NOTIFY_SINK", "log")
+    NOTIFY_WEBHOOK_URL = os.getenv("NOTIFY_WEBHOOK_URL")
+    NOTIFY_WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_WEBHOOK_TIMEOUT_SECONDS", "5"))
+
+    # `flask forecast-demand` (run it nightly) aggregates the last
+    # FORECAST_HISTORY_DAYS of requests and listings per FORECAST_CELL_KM
+    # grid cell and food type and writes FORECAST_HORIZON_DAYS of predicted
+    # shortfalls under FORECAST_DIR; /forecast/shortfalls memory-maps it
+    FORECAST_DIR = os.getenv("FORECAST_DIR", "forecast")
+    FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "56"))
+    FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", "7"))
+    FORECAST_CELL_KM = float(os.getenv("FORECAST_CELL_KM", "5"))
+    FORECAST_CHUNK_SIZE = int(os.getenv("FORECAST_CHUNK_SIZE", "50000"))
+
+    # Token-bucket rate limits as "rate/burst" (requests per second, "0"
+    # = off): per client IP, per client IP on each endpoint in
+    # RATE_LIMIT_ENDPOINTS ("endpoint=rate/burst,..."), and per caller
+    # from each IP (X-User-Id or ?user_id= is unauthenticated, so it is
+    # only ever in addition to the IP buckets and never shared across IPs). Over the limit answers 429 with Retry-After. Buckets are kept
+    # per process, or in Redis with RATE_LIMIT_BACKEND=redis so every worker
+    # shares them. RATE_LIMIT_EXEMPT lists blueprints/endpoints never limited.
+    RATE_LIMIT_ENABLED = _env_bool("RATE_LIMIT_ENABLED", True)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    RATE_LIMIT_USER = os.getenv("RATE_LIMIT_USER", "20/40")
+    RATE_LIMIT_IP = os.getenv("RATE_LIMIT_IP", "100/200")
+    RATE_LIMIT_ENDPOINTS = os.getenv(
+        "RATE_LIMIT_ENDPOINTS",
+        "request_bp.get_all_requests=2/10,transaction_bp.get_all_transactions=2/10",
+    )
+    RATE_LIMIT_EXEMPT = os.getenv("RATE_LIMIT_EXEMPT", "metrics_bp")
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+    # Read-through cache for role and profile lookups ("local" or "redis")
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+    # Profiles change on PUT /profile, which only clears the cache of the
+    # worker that served it, so they are cached with CACHE_BACKEND=redis or,
+    # for one process serving every request, CACHE_PROFILES_LOCAL
+    CACHE_PROFILES_LOCAL = _env_bool("CACHE_PROFILES_LOCAL", False)
+
+    # List GETs answer 304 from per-scope change versions, which live in
+    # Redis with CACHE_BACKEND=redis. Process-local versions miss writes
+    # made by other workers and CLI commands, so without Redis conditional
+    # GETs are off unless CHANGE_VERSIONS_LOCAL is set (one process doing
+    # every write, e.g. the dev server with the in-process sweeper).
+    CHANGE_VERSIONS_LOCAL = _env_bool("CHANGE_VERSIONS_LOCAL", False)
+
+    # Password hashing runs in a process pool of PASSWORD_HASH_WORKERS (0 =
+    # inline); /register and /login answer 503 once MAX_PENDING hashes are
+    # queued. Stored hashes with other cost parameters are upgraded on login.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0"))  # 0 = 4 per worker
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+    # "orjson" encodes responses with orjson when it is installed (pip
+    # install orjson); "stdlib" keeps Flask's json module
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+
+    # Live feed at /events/stream (Server-Sent Events). "local" fans out
+    # within one process; "postgres" relays through LISTEN/NOTIFY so every
+    # worker's subscribers see every commit.
+    EVENTS_ENABLED = _env_bool("EVENTS_ENABLED", True)
+    EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "local")
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+    EVENTS_SUBSCRIBER_BUFFER = int(os.getenv("EVENTS_SUBSCRIBER_BUFFER", "1000"))
+    EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "1000"))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+    # Per-endpoint latency/SQL metrics at /metrics; SLOW_QUERY_MS > 0 logs
+    # statements slower than that (bound parameters are never logged)
+    METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
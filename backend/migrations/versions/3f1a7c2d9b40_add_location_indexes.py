@@ -0,0 +1,26 @@
+"""add location indexes for nearby request search
+
+Revision ID: 3f1a7c2d9b40
+Revises: 9c90da0943a4
+Create Date: 2026-10-18 09:12:31.418204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a7c2d9b40'
+down_revision = '9c90da0943a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_location', 'users', ['location_lat', 'location_long'], unique=False)
+    op.create_index(op.f('ix_requests_receiver_id'), 'requests', ['receiver_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_requests_receiver_id'), table_name='requests')
+    op.drop_index('ix_users_location', table_name='users')
@@ -0,0 +1,51 @@
+"""add indexes for hot status and owner filters
+
+Revision ID: 5d2c8e6f1a93
+Revises: b7e4d91a0c25
+Create Date: 2026-10-18 11:40:05.271630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c8e6f1a93'
+down_revision = 'b7e4d91a0c25'
+branch_labels = None
+depends_on = None
+
+
+def _partial(condition):
+    return dict(postgresql_where=sa.text(condition), sqlite_where=sa.text(condition))
+
+
+def upgrade():
+    op.create_index('ix_food_items_status_food_id', 'food_items', ['status', 'food_id'], unique=False)
+    op.create_index('ix_food_items_donor_id_food_id', 'food_items', ['donor_id', 'food_id'], unique=False)
+    op.create_index('ix_food_items_available_expiry', 'food_items', ['expiry_date'], unique=False,
+                    **_partial("status = 'available'"))
+
+    op.create_index('ix_requests_status_request_id', 'requests', ['status', 'request_id'], unique=False)
+    op.create_index('ix_requests_pending_receiver_id', 'requests', ['receiver_id'], unique=False,
+                    **_partial("status = 'pending'"))
+    op.create_index('ix_requests_pending_deadline', 'requests', ['deadline'], unique=False,
+                    **_partial("status = 'pending'"))
+
+    op.create_index('ix_transactions_status_txn_id', 'transactions', ['status', 'txn_id'], unique=False)
+    op.create_index('ix_transactions_donor_id_txn_id', 'transactions', ['donor_id', 'txn_id'], unique=False)
+    op.create_index('ix_transactions_receiver_id_txn_id', 'transactions', ['receiver_id', 'txn_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transactions_receiver_id_txn_id', table_name='transactions')
+    op.drop_index('ix_transactions_donor_id_txn_id', table_name='transactions')
+    op.drop_index('ix_transactions_status_txn_id', table_name='transactions')
+
+    op.drop_index('ix_requests_pending_deadline', table_name='requests')
+    op.drop_index('ix_requests_pending_receiver_id', table_name='requests')
+    op.drop_index('ix_requests_status_request_id', table_name='requests')
+
+    op.drop_index('ix_food_items_available_expiry', table_name='food_items')
+    op.drop_index('ix_food_items_donor_id_food_id', table_name='food_items')
+    op.drop_index('ix_food_items_status_food_id', table_name='food_items')
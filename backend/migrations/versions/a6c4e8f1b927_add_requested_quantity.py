@@ -0,0 +1,43 @@
+"""add requests.requested_quantity
+
+Revision ID: a6c4e8f1b927
+Revises: f2a7c5e9d341
+Create Date: 2026-10-18 19:02:41.508316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4e8f1b927'
+down_revision = 'f2a7c5e9d341'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('requested_quantity', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('requests_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('requested_quantity', sa.Integer(), nullable=True))
+
+    # Backfill. Only batch matching ever draws quantity down, and only it
+    # takes a request to 0, so those rows asked for what was allocated.
+    # Elsewhere claims and partial batch allocations can't be told apart;
+    # quantity may undercount but never counts an allocation twice.
+    op.execute(
+        "UPDATE requests SET requested_quantity = CASE WHEN quantity = 0 THEN "
+        "COALESCE((SELECT SUM(t.quantity) FROM transactions t "
+        "WHERE t.request_id = requests.request_id AND t.status != 'cancelled'), 0) "
+        "ELSE quantity END"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('requests_archive', schema=None) as batch_op:
+        batch_op.drop_column('requested_quantity')
+
+    with op.batch_alter_table('requests', schema=None) as batch_op:
+        batch_op.drop_column('requested_quantity')
@@ -0,0 +1,46 @@
+"""add full text and trigram indexes for /search
+
+Revision ID: a6f3d0b9c217
+Revises: e41b6c7d2f58
+Create Date: 2026-10-18 15:02:47.640193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6f3d0b9c217'
+down_revision = 'e41b6c7d2f58'
+branch_labels = None
+depends_on = None
+
+# PostgreSQL only: other databases search through the in-memory trigram
+# index in services/search.py
+SEARCH_INDEXES = (
+    ('ix_requests_pending_food_type_fts', 'requests', "to_tsvector('english', food_type)", "status = 'pending'"),
+    ('ix_requests_pending_food_type_trgm', 'requests', 'food_type gin_trgm_ops', "status = 'pending'"),
+    ('ix_food_items_available_name_fts', 'food_items', "to_tsvector('english', name)", "status = 'available'"),
+    ('ix_food_items_available_name_trgm', 'food_items', 'name gin_trgm_ops', "status = 'available'"),
+)
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if not _is_postgresql():
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression, condition in SEARCH_INDEXES:
+        op.create_index(name, table, [sa.text(expression)], unique=False,
+                        postgresql_using='gin', postgresql_where=sa.text(condition))
+
+
+def downgrade():
+    if not _is_postgresql():
+        return
+    for name, table, _, _ in reversed(SEARCH_INDEXES):
+        op.drop_index(name, table_name=table)
+    # pg_trgm is left installed; other objects may depend on it
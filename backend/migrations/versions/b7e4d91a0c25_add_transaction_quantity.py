@@ -0,0 +1,26 @@
+"""add quantity to transactions for partial allocations
+
+Revision ID: b7e4d91a0c25
+Revises: 3f1a7c2d9b40
+Create Date: 2026-10-18 10:03:47.902115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4d91a0c25'
+down_revision = '3f1a7c2d9b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('quantity', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_column('quantity')
@@ -0,0 +1,150 @@
+"""partition transactions by month and add archive tables
+
+Revision ID: c3e8a1f5b702
+Revises: a6f3d0b9c217
+Create Date: 2026-10-18 16:21:38.904517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f5b702'
+down_revision = 'a6f3d0b9c217'
+branch_labels = None
+depends_on = None
+
+COLUMNS = 'txn_id, donor_id, receiver_id, food_id, request_id, quantity, status, completed_at, created_at'
+INDEXES = (
+    ('ix_transactions_status_txn_id', ['status', 'txn_id']),
+    ('ix_transactions_donor_id_txn_id', ['donor_id', 'txn_id']),
+    ('ix_transactions_receiver_id_txn_id', ['receiver_id', 'txn_id']),
+)
+
+# Range partitioning needs the partition key in the primary key, so the key
+# becomes (txn_id, created_at); txn_id still comes from the same sequence.
+CREATE_PARTITIONED = """
+CREATE TABLE transactions (
+    txn_id integer NOT NULL DEFAULT nextval('transactions_txn_id_seq'),
+    donor_id integer NOT NULL REFERENCES users (user_id),
+    receiver_id integer NOT NULL REFERENCES users (user_id),
+    food_id integer NOT NULL REFERENCES food_items (food_id),
+    request_id integer REFERENCES requests (request_id),
+    quantity integer,
+    status txn_status_enum NOT NULL,
+    completed_at timestamp without time zone,
+    created_at timestamp without time zone NOT NULL,
+    CONSTRAINT transactions_pkey PRIMARY KEY (txn_id, created_at)
+) PARTITION BY RANGE (created_at)
+"""
+
+# One partition per month from the oldest row to three months ahead (the
+# archival job keeps creating them); anything outside lands in the default
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    part_start date;
+    last_start date := (date_trunc('month', now()) + interval '3 months')::date;
+BEGIN
+    SELECT date_trunc('month', coalesce(min(created_at), now()))::date INTO part_start
+    FROM transactions_old;
+    WHILE part_start <= last_start LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+            'transactions_p' || to_char(part_start, 'YYYY_MM'), part_start, (part_start + interval '1 month')::date
+        );
+        part_start := (part_start + interval '1 month')::date;
+    END LOOP;
+END $$
+"""
+
+CREATE_UNPARTITIONED = """
+CREATE TABLE transactions (
+    txn_id integer NOT NULL DEFAULT nextval('transactions_txn_id_seq'),
+    donor_id integer NOT NULL REFERENCES users (user_id),
+    receiver_id integer NOT NULL REFERENCES users (user_id),
+    food_id integer NOT NULL REFERENCES food_items (food_id),
+    request_id integer REFERENCES requests (request_id),
+    quantity integer,
+    status txn_status_enum NOT NULL,
+    completed_at timestamp without time zone,
+    created_at timestamp without time zone NOT NULL,
+    CONSTRAINT transactions_pkey PRIMARY KEY (txn_id)
+)
+"""
+
+
+def _swap_transactions_table(create_sql, create_partitions=False):
+    # Rename the current table out of the way, create the new one, copy the
+    # rows over, hand it the txn_id sequence and drop the old table
+    op.execute('ALTER TABLE transactions RENAME TO transactions_old')
+    op.execute('ALTER TABLE transactions_old RENAME CONSTRAINT transactions_pkey '
+               'TO transactions_old_pkey')
+    op.execute(create_sql)
+    if create_partitions:
+        op.execute(CREATE_MONTHLY_PARTITIONS)
+        op.execute('CREATE TABLE transactions_default PARTITION OF transactions DEFAULT')
+    op.execute(f'INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_old')
+    op.execute('ALTER SEQUENCE transactions_txn_id_seq OWNED BY transactions.txn_id')
+    op.execute('DROP TABLE transactions_old')
+    for name, columns in INDEXES:
+        op.create_index(name, 'transactions', columns, unique=False)
+
+
+def upgrade():
+    op.create_table('requests_archive',
+    sa.Column('request_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('food_type', sa.String(length=100), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('urgency_level', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('deadline', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('request_id')
+    )
+    op.create_index('ix_requests_archive_receiver_id_request_id', 'requests_archive',
+                    ['receiver_id', 'request_id'], unique=False)
+
+    op.create_table('transactions_archive',
+    sa.Column('txn_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('donor_id', sa.Integer(), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('food_id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('txn_id')
+    )
+    op.create_index('ix_transactions_archive_donor_id_txn_id', 'transactions_archive',
+                    ['donor_id', 'txn_id'], unique=False)
+    op.create_index('ix_transactions_archive_receiver_id_txn_id', 'transactions_archive',
+                    ['receiver_id', 'txn_id'], unique=False)
+
+    # Partitioning is PostgreSQL only; elsewhere transactions stays a plain
+    # table and only gains the NOT NULL on created_at
+    op.execute('UPDATE transactions SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('transactions', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        return
+    _swap_transactions_table(CREATE_PARTITIONED, create_partitions=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _swap_transactions_table(CREATE_UNPARTITIONED)
+    else:
+        with op.batch_alter_table('transactions', schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+
+    op.drop_index('ix_transactions_archive_receiver_id_txn_id', table_name='transactions_archive')
+    op.drop_index('ix_transactions_archive_donor_id_txn_id', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
+    op.drop_index('ix_requests_archive_receiver_id_request_id', table_name='requests_archive')
+    op.drop_table('requests_archive')
@@ -0,0 +1,79 @@
+"""add incrementally maintained impact stats tables
+
+Revision ID: e41b6c7d2f58
+Revises: 5d2c8e6f1a93
+Create Date: 2026-10-18 14:12:05.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41b6c7d2f58'
+down_revision = '5d2c8e6f1a93'
+branch_labels = None
+depends_on = None
+
+COUNTERS = (
+    'listings_total',
+    'active_listings',
+    'expired_listings',
+    'donations_completed',
+    'quantity_donated',
+    'receipts_completed',
+    'quantity_received',
+)
+
+# Same numbers services/stats.py rebuild_stats() computes
+COMPLETED_QTY = 'COALESCE(t.quantity, f.quantity)'
+BACKFILL_USERS = f"""
+INSERT INTO user_stats (user_id, {', '.join(COUNTERS)}, updated_at)
+SELECT u.user_id,
+    (SELECT COUNT(*) FROM food_items f WHERE f.donor_id = u.user_id),
+    (SELECT COUNT(*) FROM food_items f WHERE f.donor_id = u.user_id AND f.status = 'available'),
+    (SELECT COUNT(*) FROM food_items f WHERE f.donor_id = u.user_id AND f.status = 'expired'),
+    (SELECT COUNT(*) FROM transactions t WHERE t.donor_id = u.user_id AND t.status = 'completed'),
+    (SELECT COALESCE(SUM({COMPLETED_QTY}), 0) FROM transactions t
+        LEFT JOIN food_items f ON f.food_id = t.food_id
+        WHERE t.donor_id = u.user_id AND t.status = 'completed'),
+    (SELECT COUNT(*) FROM transactions t WHERE t.receiver_id = u.user_id AND t.status = 'completed'),
+    (SELECT COALESCE(SUM({COMPLETED_QTY}), 0) FROM transactions t
+        LEFT JOIN food_items f ON f.food_id = t.food_id
+        WHERE t.receiver_id = u.user_id AND t.status = 'completed'),
+    CURRENT_TIMESTAMP
+FROM users u
+"""
+BACKFILL_GLOBAL = f"""
+INSERT INTO global_stats (shard, {', '.join(COUNTERS)}, updated_at)
+SELECT 0, {', '.join(f'COALESCE(SUM({c}), 0)' for c in COUNTERS)}, CURRENT_TIMESTAMP
+FROM user_stats
+"""
+
+
+def _counter_columns():
+    return [sa.Column(name, sa.Integer(), server_default='0', nullable=False) for name in COUNTERS]
+
+
+def upgrade():
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    *_counter_columns(),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('global_stats',
+    sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+    *_counter_columns(),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('shard')
+    )
+
+    op.execute(BACKFILL_USERS)
+    op.execute(BACKFILL_GLOBAL)
+
+
+def downgrade():
+    op.drop_table('global_stats')
+    op.drop_table('user_stats')
@@ -1,7 +1,7 @@
 from app import db
 from datetime import datetime, timezone
 from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy import Enum
+from sqlalchemy import DDL, Enum, event, text
 
 roles_enum = Enum('donor', 'receiver', 'admin', name='role_enum')
 status_enum = Enum('available', 'expired', 'reserved', 'collected')
@@ -21,6 +21,12 @@ txn_status_enum = Enum(
     name="txn_status_enum"
 )
 
+# Trigram operator classes for the /search indexes
+event.listen(
+    db.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 
 user_roles = db.Table(
     "user_roles",
@@ -32,6 +38,10 @@ user_roles = db.Table(
 # ============================================================
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # Bounding-box prefilter for nearby searches
+        db.Index("ix_users_location", "location_lat", "location_long"),
+    )
 
     user_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(100), nullable=False)
@@ -40,7 +50,7 @@ class User(db.Model):
     phone = db.Column(db.String(15))
     location_lat = db.Column(db.Float)
     location_long = db.Column(db.Float)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     # MANY-TO-MANY ROLE RELATION
     roles = db.relationship(
@@ -93,6 +103,29 @@ class Role(db.Model):
 # ============================================================
 class FoodItem(db.Model):
     __tablename__ = "food_items"
+    __table_args__ = (
+        # Keyset listings: /requests/available and /food/my/<donor_id>
+        db.Index("ix_food_items_status_food_id", "status", "food_id"),
+        db.Index("ix_food_items_donor_id_food_id", "donor_id", "food_id"),
+        # Expiry checks only ever look at available items
+        db.Index(
+            "ix_food_items_available_expiry", "expiry_date",
+            postgresql_where=text("status = 'available'"),
+            sqlite_where=text("status = 'available'"),
+        ),
+        # /search over available items (PostgreSQL only)
+        db.Index(
+            "ix_food_items_available_name_fts", text("to_tsvector('english', name)"),
+            postgresql_using="gin",
+            postgresql_where=text("status = 'available'"),
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_food_items_available_name_trgm", "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+            postgresql_where=text("status = 'available'"),
+        ).ddl_if(dialect="postgresql"),
+    )
 
     food_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     donor_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
@@ -100,7 +133,7 @@ class FoodItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     expiry_date = db.Column(db.Date, nullable=False)
     status = db.Column(food_status_enum, default="available", nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     # Relationships
     donor = db.relationship("User", back_populates="foods")
@@ -115,14 +148,44 @@ class FoodItem(db.Model):
 # ============================================================
 class Request(db.Model):
     __tablename__ = "requests"
+    __table_args__ = (
+        db.Index("ix_requests_status_request_id", "status", "request_id"),
+        # Nearby search and matching join pending requests to their receivers
+        db.Index(
+            "ix_requests_pending_receiver_id", "receiver_id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        db.Index(
+            "ix_requests_pending_deadline", "deadline",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # /search: full text and trigram matches on pending requests
+        # (PostgreSQL only; other databases use the in-memory fallback)
+        db.Index(
+            "ix_requests_pending_food_type_fts", text("to_tsvector('english', food_type)"),
+            postgresql_using="gin",
+            postgresql_where=text("status = 'pending'"),
+        ).ddl_if(dialect="postgresql"),
+        db.Index(
+            "ix_requests_pending_food_type_trgm", "food_type",
+            postgresql_using="gin",
+            postgresql_ops={"food_type": "gin_trgm_ops"},
+            postgresql_where=text("status = 'pending'"),
+        ).ddl_if(dialect="postgresql"),
+    )
 
     request_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    receiver_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    receiver_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False, index=True)
     food_type = db.Column(db.String(100), nullable=False)
+    # quantity is what is still unallocated (batch matching draws it down);
+    # requested_quantity keeps what the receiver asked for
     quantity = db.Column(db.Integer, nullable=False)
+    requested_quantity = db.Column(db.Integer, default=lambda ctx: ctx.get_current_parameters()["quantity"])
     urgency_level = db.Column(db.String(50))  # e.g., "high", "medium", "low"
     status = db.Column(request_status_enum, default="pending", nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     deadline = db.Column(db.DateTime, nullable=True)
 
     # Relationships
@@ -137,16 +200,25 @@ class Request(db.Model):
 # TRANSACTIONS TABLE
 # ============================================================
 class Transaction(db.Model):
+    # On PostgreSQL the table is range-partitioned by month on created_at
+    # (migration c3e8a1f5b702, services/archival.py keeps partitions ahead);
+    # the database key there is (txn_id, created_at), txn_id alone is unique.
     __tablename__ = "transactions"
+    __table_args__ = (
+        db.Index("ix_transactions_status_txn_id", "status", "txn_id"),
+        db.Index("ix_transactions_donor_id_txn_id", "donor_id", "txn_id"),
+        db.Index("ix_transactions_receiver_id_txn_id", "receiver_id", "txn_id"),
+    )
 
     txn_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     donor_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
     food_id = db.Column(db.Integer, db.ForeignKey("food_items.food_id"), nullable=False)
     request_id = db.Column(db.Integer, db.ForeignKey("requests.request_id"), nullable=True)
+    quantity = db.Column(db.Integer, nullable=True)  # None = the whole food item
     status = db.Column(txn_status_enum, default="initiated", nullable=False)
     completed_at = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
 
     # Relationships
     donor = db.relationship("User", foreign_keys=[donor_id], back_populates="donations_made")
@@ -155,4 +227,120 @@ class Transaction(db.Model):
     request = db.relationship("Request", back_populates="transactions")
 
     def __repr__(self):
-        return f"<Transaction {self.txn_id} ({self.status})>"
\ No newline at end of file
+        return f"<Transaction {self.txn_id} ({self.status})>"
+
+# ============================================================
+# ARCHIVE (closed rows moved out by services/archival.py)
+# ============================================================
+# Same columns as the hot tables plus archived_at; no foreign keys, so the
+# rows they pointed at can be archived or deleted independently.
+class RequestArchive(db.Model):
+    __tablename__ = "requests_archive"
+    __table_args__ = (
+        db.Index("ix_requests_archive_receiver_id_request_id", "receiver_id", "request_id"),
+    )
+
+    request_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    receiver_id = db.Column(db.Integer, nullable=False)
+    food_type = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    requested_quantity = db.Column(db.Integer)
+    urgency_level = db.Column(db.String(50))
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    deadline = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+class TransactionArchive(db.Model):
+    __tablename__ = "transactions_archive"
+    __table_args__ = (
+        db.Index("ix_transactions_archive_donor_id_txn_id", "donor_id", "txn_id"),
+        db.Index("ix_transactions_archive_receiver_id_txn_id", "receiver_id", "txn_id"),
+    )
+
+    txn_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    donor_id = db.Column(db.Integer, nullable=False)
+    receiver_id = db.Column(db.Integer, nullable=False)
+    food_id = db.Column(db.Integer, nullable=False)
+    request_id = db.Column(db.Integer)
+    quantity = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False)
+    completed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+# ============================================================
+# IMPACT STATS (kept up to date by services/stats.py)
+# ============================================================
+class StatsCounters:
+    # Listings by donor, completed transactions by either side
+    listings_total = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    active_listings = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    expired_listings = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    donations_completed = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    quantity_donated = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    receipts_completed = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    quantity_received = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+
+class UserStats(StatsCounters, db.Model):
+    __tablename__ = "user_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), primary_key=True)
+
+
+class GlobalStats(StatsCounters, db.Model):
+    # Global totals are spread over a few shard rows so concurrent writers
+    # don't all queue on one row lock; readers sum the shards
+    __tablename__ = "global_stats"
+
+    shard = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+# ============================================================
+# IDEMPOTENCY KEYS (services/idempotency.py)
+# ============================================================
+class IdempotencyKey(db.Model):
+    # One row per Idempotency-Key seen on a write endpoint, keyed by a hash
+    # of caller, endpoint and the client's key (see services.idempotency.
+    # scoped_key). status_code is
+    # NULL while the first request is still running; afterwards the row
+    # holds the response that replays get back.
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        db.Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    content_type = db.Column(db.String(100))
+    response_body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+# ============================================================
+# NOTIFICATION OUTBOX (services/notifications.py)
+# ============================================================
+class OutboxMessage(db.Model):
+    # One pending notification per recipient, written in the same database
+    # transaction as the transaction change it reports; `flask drain-outbox`
+    # delivers and deletes them
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        db.Index("ix_notification_outbox_due", "dead", "available_at", "id"),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    recipient_id = db.Column(db.Integer, nullable=False)
+    txn_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    available_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    last_error = db.Column(db.Text)
+    dead = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
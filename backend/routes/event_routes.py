@@ -0,0 +1,55 @@
+from flask import Blueprint, Response, current_app, request, jsonify
+from services.events import EVENT_TYPES, EventFilter, SubscriberLimit, event_hub, sse_frame
+
+event_bp = Blueprint("event_bp", __name__, url_prefix="/events")
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+# Live feed of new/changed food listings, requests and transactions as
+# Server-Sent Events, replacing client polling. Optional filters:
+# ?types=food,request  ?food_type=rice  ?lat=&long=&radius_km= (owner's
+# location). Reconnecting clients resume with the Last-Event-ID header.
+@event_bp.route("/stream", methods=["GET"])
+def stream():
+    event_filter, last_event_id, error = _stream_args(request.args, request.headers)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        sub = event_hub.subscribe(event_filter, last_event_id)
+    except SubscriberLimit:
+        return jsonify({"error": "Too many event stream subscribers"}), 503, {"Retry-After": "5"}
+
+    heartbeat = current_app.config["EVENTS_HEARTBEAT_SECONDS"]
+
+    def generate():
+        try:
+            yield ": connected\n\n"
+            while True:
+                events = sub.get(heartbeat)
+                yield "".join(sse_frame(e) for e in events) if events else ": heartbeat\n\n"
+        finally:
+            sub.close()
+
+    return Response(generate(), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+# Shared with the async entry point (asgi.py)
+def _stream_args(args, headers):
+    types = [t.strip() for t in args.get("types", "").split(",") if t.strip()]
+    unknown = sorted(set(types) - set(EVENT_TYPES))
+    if unknown:
+        return None, None, f"unknown event types: {', '.join(unknown)}"
+
+    lat = args.get("lat", type=float)
+    lon = args.get("long", type=float)
+    radius_km = args.get("radius_km", type=float)
+    if radius_km is not None and radius_km <= 0:
+        return None, None, "radius_km must be positive"
+    if radius_km is not None and (lat is None or lon is None):
+        return None, None, "radius_km requires lat and long"
+
+    last_event_id = headers.get("Last-Event-ID", type=int) or args.get("last_event_id", type=int)
+    event_filter = EventFilter(types, args.get("food_type"), lat, lon, radius_km)
+    return event_filter, last_event_id, None
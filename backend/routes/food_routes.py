@@ -1,11 +1,23 @@
 from flask import Blueprint, request, jsonify
-from models import Request, Transaction, db, FoodItem
+from models import Request, Transaction, db, FoodItem, User
+from services.claims import claim_error, claim_food
+from services.food_ingest import ingest_food_rows
+from services.geo import find_nearby_requests
+from services.idempotency import idempotent, request_body
+from services.matching import MAX_DISTANCE_KM, run_batch_match
+from services.pagination import paginate
+from services.serializers import DONOR_FOOD, DONOR_TRANSACTION
+from services.stats import StatsDelta
+from services.versions import conditional_get
 from datetime import datetime
+import csv
+import io
 
 food_bp = Blueprint("food_bp", __name__, url_prefix="/food")
 
 
 @food_bp.route("/add", methods=["POST"])
+@idempotent
 def add_food():
     data = request.json
 
@@ -20,9 +32,45 @@ def add_food():
         expiry_date=datetime.strptime(data["expiry_date"], "%Y-%m-%d")
     )
     db.session.add(new_food)
+
+    stats = StatsDelta()
+    stats.listing_added(donor_id)
+    stats.apply()
+
     db.session.commit()
     return jsonify({"message": "Food item added successfully!"}), 201
 
+# ------------------------------------------------------------
+# 1b) Bulk Add Food (JSON array or CSV upload)
+# ------------------------------------------------------------
+@food_bp.route("/bulk", methods=["POST"])
+@idempotent
+def bulk_add_food():
+    default_donor_id = request.args.get("user_id") or request.headers.get("X-User-Id")
+
+    if request.mimetype == "text/csv":
+        # Parsed straight off the request stream (or the Idempotency-Key
+        # spool of it), one chunk at a time
+        stream = io.TextIOWrapper(request_body(), encoding="utf-8-sig", newline="")
+        rows = csv.DictReader(stream)
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            default_donor_id = data.get("user_id") or default_donor_id
+            data = data.get("items")
+        if not isinstance(data, list):
+            return jsonify({"error": "Expected a JSON array of food items or a text/csv body"}), 400
+        rows = data
+
+    inserted, errors = ingest_food_rows(rows, default_donor_id=default_donor_id)
+
+    return jsonify({
+        "message": f"{inserted} food items added",
+        "inserted": inserted,
+        "errors": errors
+    }), 201 if inserted else 400
+
+
 # @food_bp.route("/available", methods=["GET"])
 # def available_foods():
 #     foods = FoodItem.query.filter_by(status="available").all()
@@ -37,20 +85,15 @@ def add_food():
 # 2) Get All Foods Donated by Logged-In Donor
 # ------------------------------------------------------------
 @food_bp.route("/my/<int:donor_id>", methods=["GET"])
+@conditional_get(lambda args, donor_id: [f"foods:donor:{donor_id}"])
 def get_my_food(donor_id):
-    foods = FoodItem.query.filter_by(donor_id=donor_id).all()
-
-    result = [
-        {
-            "food_id": f.food_id,
-            "food_name": f.name,
-            "quantity": f.quantity,
-            "expiry_date": f.expiry_date.strftime("%Y-%m-%d")
-        }
-        for f in foods
-    ]
+    query = DONOR_FOOD.query().filter(FoodItem.donor_id == donor_id)
 
-    return jsonify(result), 200
+    status = request.args.get("status")
+    if status:
+        query = query.filter(FoodItem.status == status)
+
+    return paginate(query, FoodItem.food_id, DONOR_FOOD.dump)
 
 
 # ------------------------------------------------------------
@@ -85,6 +128,10 @@ def delete_food(food_id):
     if not food:
         return jsonify({"error": "Food item not found"}), 404
 
+    stats = StatsDelta()
+    stats.listing_removed(food.donor_id, food.status)
+    stats.apply()
+
     db.session.delete(food)
     db.session.commit()
 
@@ -92,51 +139,82 @@ def delete_food(food_id):
 
 
 # ------------------------------------------------------------
-# 5) Get Nearby Requests (placeholder logic)
+# 5) Get Nearby Requests (radius and/or k-nearest)
 # ------------------------------------------------------------
 @food_bp.route("/requests/nearby", methods=["GET"])
 def get_nearby_requests():
-    # For now, return all active requests.
-    # Later you can filter using location or distance.
-    requests = Request.query.filter_by(status="pending").all()
-
-    result = [
-        {
-            "request_id": r.request_id,
-            "receiver_id": r.receiver_id,
-            "food_type": r.food_type,
-            "quantity": r.quantity,
-            "urgency_level": r.urgency_level
-        }
-        for r in requests
-    ]
+    lat, lon, radius_km, limit, error = _nearby_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Fall back to the caller's saved location
+    if lat is None or lon is None:
+        user_id = _caller_id(request.args, request.headers)
+        user = User.query.get(user_id) if user_id else None
+        if not user or user.location_lat is None or user.location_long is None:
+            return jsonify({"error": NEARBY_LOCATION_REQUIRED}), 400
+        lat, lon = user.location_lat, user.location_long
+
+    result = find_nearby_requests(lat, lon, radius_km=radius_km, limit=limit)
 
     return jsonify(result), 200
 
 
+NEARBY_LOCATION_REQUIRED = "lat/long or a user with a saved location is required"
+
+
+# Shared with the async entry point (asgi.py)
+def _nearby_args(args):
+    lat = args.get("lat", type=float)
+    lon = args.get("long", type=float)
+    radius_km = args.get("radius_km", type=float)
+    limit = args.get("limit", type=int)
+
+    if radius_km is not None and radius_km <= 0:
+        return None, None, None, None, "radius_km must be positive"
+    if limit is not None and limit <= 0:
+        return None, None, None, None, "limit must be positive"
+    return lat, lon, radius_km, limit, None
+
+
+def _caller_id(args, headers):
+    return args.get("user_id", type=int) or headers.get("X-User-Id", type=int)
+
+
 # ------------------------------------------------------------
 # 6) Match Food Item + Request (Create Transaction)
 # ------------------------------------------------------------
 @food_bp.route("/match/<int:food_id>/<int:request_id>", methods=["POST"])
+@idempotent
 def match_food(food_id, request_id):
-    food = FoodItem.query.get(food_id)
     req = Request.query.get(request_id)
-
-    if not food:
-        return jsonify({"error": "Food not found"}), 404
     if not req:
         return jsonify({"error": "Request not found"}), 404
 
+    data = request.get_json(silent=True) or {}
+    quantity = data.get("quantity")
+    if quantity is not None and (isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0):
+        return jsonify({"error": "quantity must be a positive integer"}), 400
+
+    # Same conditional claim as /requests/accept, so an item another
+    # receiver already holds can't be matched again
+    claim = claim_food(food_id, quantity)
+    if claim is None:
+        db.session.rollback()
+        body, status = claim_error(food_id)
+        return jsonify(body), status
+    donor_id, claimed_quantity = claim
+
     # Create transaction
     new_txn = Transaction(
-        donor_id=food.donor_id,
+        donor_id=donor_id,
         receiver_id=req.receiver_id,
         food_id=food_id,
         request_id=request_id,
-        timestamp=datetime.now()
+        quantity=claimed_quantity
     )
 
-    req.status = "fulfilled"
+    req.status = "accepted"
 
     db.session.add(new_txn)
     db.session.commit()
@@ -144,22 +222,27 @@ def match_food(food_id, request_id):
     return jsonify({"message": "Food matched & transaction created"}), 201
 
 
+# ------------------------------------------------------------
+# 6b) Batch Match All Available Food With Pending Requests
+# ------------------------------------------------------------
+@food_bp.route("/match/batch", methods=["POST"])
+def batch_match():
+    data = request.get_json(silent=True) or {}
+
+    max_distance_km = data.get("max_distance_km", MAX_DISTANCE_KM)
+    if isinstance(max_distance_km, bool) or not isinstance(max_distance_km, (int, float)) or max_distance_km <= 0:
+        return jsonify({"error": "max_distance_km must be a positive number"}), 400
+
+    summary = run_batch_match(max_distance_km=max_distance_km, dry_run=bool(data.get("dry_run")))
+
+    return jsonify(summary), 200
+
+
 # ------------------------------------------------------------
 # 7) View Donor Transactions
 # ------------------------------------------------------------
 @food_bp.route("/transactions/donor/<int:donor_id>", methods=["GET"])
 def get_donor_transactions(donor_id):
-    txns = Transaction.query.filter_by(donor_id=donor_id).all()
-
-    result = [
-        {
-            "transaction_id": t.transaction_id,
-            "receiver_id": t.receiver_id,
-            "food_id": t.food_id,
-            "request_id": t.request_id,
-            "timestamp": t.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        for t in txns
-    ]
+    txns = DONOR_TRANSACTION.query().filter(Transaction.donor_id == donor_id).order_by(Transaction.txn_id)
 
-    return jsonify(result), 200
+    return jsonify(DONOR_TRANSACTION.dump_many(txns)), 200
@@ -0,0 +1,47 @@
+from flask import Blueprint, request, jsonify
+from services.forecast import forecast_store
+
+forecast_bp = Blueprint("forecast_bp", __name__, url_prefix="/forecast")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+# Predicted shortfalls (demand minus supply) per grid cell, food type and
+# day, largest first, e.g. /forecast/shortfalls?food_type=rice&lat=..&long=..
+# Served from the file `flask forecast-demand` writes; nothing is computed here.
+@forecast_bp.route("/shortfalls", methods=["GET"])
+def get_shortfalls():
+    meta, records = forecast_store.load()
+    if meta is None:
+        return jsonify({"error": "No forecast yet; run flask forecast-demand"}), 503
+
+    args = request.args
+    try:
+        lat = float(args["lat"]) if "lat" in args else None
+        lon = float(args["long"]) if "long" in args else None
+        radius_km = float(args.get("radius_km", 10))
+        days = int(args["days"]) if "days" in args else None
+        min_shortfall = float(args.get("min_shortfall", 0))
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "lat, long, radius_km, days, min_shortfall and limit must be numbers"}), 400
+    if (lat is None) != (lon is None):
+        return jsonify({"error": "lat and long must be given together"}), 400
+    if radius_km <= 0:
+        return jsonify({"error": "radius_km must be positive"}), 400
+    if days is not None and not 1 <= days <= meta["horizon_days"]:
+        return jsonify({"error": f"days must be between 1 and {meta['horizon_days']}"}), 400
+    if not 1 <= limit <= MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_LIMIT}"}), 400
+
+    shortfalls = forecast_store.shortfalls(
+        meta, records, food_type=args.get("food_type"), lat=lat, lon=lon, radius_km=radius_km,
+        days=days, min_shortfall=min_shortfall, limit=limit,
+    )
+    return jsonify({
+        "generated_at": meta["generated_at"],
+        "first_day": meta["first_day"],
+        "cell_km": meta["cell_km"],
+        "shortfalls": shortfalls,
+    }), 200
@@ -0,0 +1,78 @@
+from flask import Blueprint, Response, jsonify
+from models import db
+from services.cache import cache
+from services.events import event_hub
+from services.idempotency import idempotency
+from services.notifications import outbox_backlog
+from services.db_pool import pool_status
+from services.instrumentation import render_prometheus, request_metrics
+from services.passwords import password_hasher
+from services.rate_limit import rate_limiter
+from services.versions import change_versions
+
+metrics_bp = Blueprint("metrics_bp", __name__, url_prefix="/metrics")
+
+
+# Prometheus text exposition: per-endpoint latency histograms, SQL counts
+# and time per endpoint, plus cache, password hashing, event feed,
+# conditional GET, idempotent replay, rate limiting, notification outbox
+# and pool numbers
+@metrics_bp.route("", methods=["GET"])
+def prometheus_metrics():
+    cache_stats = cache.stats()
+    extra = [
+        ("cache_hits_total", "counter", "Read-through cache hits.", cache_stats["hits"]),
+        ("cache_misses_total", "counter", "Read-through cache misses.", cache_stats["misses"]),
+    ]
+
+    hasher_stats = password_hasher.stats()
+    extra += [
+        ("password_hash_rejected_total", "counter", "Hashing requests refused with 503.", hasher_stats["rejected"]),
+        ("password_hash_upgraded_total", "counter", "Stored hashes upgraded on login.", hasher_stats["rehashed"]),
+    ]
+
+    event_stats = event_hub.stats()
+    extra += [
+        ("events_subscribers", "gauge", "Open /events/stream connections.", event_stats["subscribers"]),
+        ("events_published_total", "counter", "Events fanned out to subscribers.", event_stats["published"]),
+        ("events_dropped_total", "counter", "Events dropped from slow subscribers' buffers.", event_stats["dropped"]),
+    ]
+
+    extra.append(("conditional_get_not_modified_total", "counter",
+                  "List GETs answered 304 from change versions.", change_versions.not_modified))
+    extra.append(("idempotent_replays_total", "counter",
+                  "Writes answered with the stored response of an earlier Idempotency-Key.", idempotency.replays))
+    extra.append(("rate_limited_total", "counter",
+                  "Requests answered 429 by the rate limiter.", rate_limiter.stats()["limited"]))
+
+    # The drain-outbox worker prints its own throughput/lag; the backlog is
+    # visible from here
+    backlog = outbox_backlog()
+    extra += [
+        ("outbox_pending", "gauge", "Notifications waiting for delivery.", backlog["pending"]),
+        ("outbox_dead", "gauge", "Notifications that ran out of delivery attempts.", backlog["dead"]),
+        ("outbox_oldest_pending_seconds", "gauge", "Age of the oldest undelivered notification.",
+         backlog["oldest_pending_seconds"]),
+    ]
+
+    pool = pool_status(db.engine)
+    for key, kind in (("checked_out", "gauge"), ("overflow", "gauge"), ("checkouts", "counter"),
+                      ("waits", "counter"), ("timeouts", "counter")):
+        if key in pool:
+            suffix = "_total" if kind == "counter" else ""
+            extra.append((f"db_pool_{key}{suffix}", kind, f"Connection pool {key.replace('_', ' ')}.", pool[key]))
+
+    body = render_prometheus(request_metrics, extra)
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+# cache hit/miss counters for role and profile lookups
+@metrics_bp.route("/cache", methods=["GET"])
+def cache_metrics():
+    return jsonify(cache.stats()), 200
+
+
+# connection pool checkouts, waits and overflow
+@metrics_bp.route("/pool", methods=["GET"])
+def pool_metrics():
+    return jsonify(pool_status(db.engine)), 200
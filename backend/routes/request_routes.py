@@ -1,11 +1,29 @@
-from models import db, Request, User, FoodItem, Transaction
+from models import db, Request, RequestArchive, User, FoodItem, Transaction
+from datetime import datetime
 from flask import Blueprint, request, jsonify
+from services.archival import parse_archived, with_archive
+from services.claims import claim_error, claim_food
+from services.idempotency import idempotent
+from services.pagination import paginate
+from services.serializers import AVAILABLE_FOOD, REQUEST
+from services.versions import conditional_get
 
 request_bp = Blueprint("request_bp", __name__, url_prefix="/requests")
 
 
+# Change-version scopes behind the ETag (also used by asgi.py)
+def _request_scopes(args):
+    return ["requests"]
+
+
+def _available_scopes(args):
+    donor_id = args.get("donor_id", type=int)
+    return [f"foods:donor:{donor_id}"] if donor_id else ["foods"]
+
+
 #create new request
 @request_bp.route("/add_request", methods=["POST"])
+@idempotent
 def add_request():
     data = request.json
 
@@ -45,24 +63,40 @@ def add_request():
     }), 201
 
 
-#show all requests
+#show all requests (keyset paginated, ?stream=ndjson|json for exports)
 @request_bp.route("/all", methods=["GET"])
+@conditional_get(_request_scopes)
 def get_all_requests():
-    requests = Request.query.all()
+    query, columns, error = _request_rows(db.session.query, request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    return paginate(query, columns.request_id, REQUEST.dump)
+
+
+# Shared with the async entry point (asgi.py); make is db.session.query or
+# select. ?archived=include|only reaches requests moved to the archive.
+def _request_rows(make, args):
+    mode, error = parse_archived(args)
+    if error:
+        return None, None, error
+    query, columns = with_archive(
+        make, REQUEST.columns, RequestArchive.__table__, mode,
+        where=lambda stmt, columns: _apply_request_filters(stmt, args, columns),
+    )
+    return query, columns, None
 
-    result = []
-    for r in requests:
-        result.append({
-            "request_id": r.request_id,
-            "receiver_id": r.receiver_id,
-            "food_type": r.food_type,
-            "quantity": r.quantity,
-            "urgency_level": r.urgency_level,
-            "deadline": r.deadline.strftime("%Y-%m-%d %H:%M:%S") if r.deadline else None,
-            "created_at": r.created_at.strftime("%Y-%m-%d %H:%M:%S") if hasattr(r, "created_at") else None
-        })
 
-    return jsonify(result), 200
+def _apply_request_filters(query, args, columns):
+    status = args.get("status")
+    if status:
+        query = query.filter(columns.status == status)
+    receiver_id = args.get("receiver_id", type=int)
+    if receiver_id:
+        query = query.filter(columns.receiver_id == receiver_id)
+    urgency_level = args.get("urgency_level")
+    if urgency_level:
+        query = query.filter(columns.urgency_level == urgency_level)
+    return query
 
 
 #update or modify a req
@@ -74,6 +108,13 @@ def update_request(request_id):
 
     data = request.json
 
+    if "quantity" in data:
+        quantity = data["quantity"]
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 0:
+            return jsonify({"error": "quantity must be a non-negative integer"}), 400
+    if "quantity" in data and req.requested_quantity is not None:
+        # What batch matching already allocated stays allocated
+        req.requested_quantity += data["quantity"] - req.quantity
     req.quantity = data.get("quantity", req.quantity)
     req.status = data.get("status", req.status)
     req.urgency_level = data.get("urgency_level", req.urgency_level)
@@ -97,18 +138,23 @@ def cancel_request(request_id):
 
 #see all available donations- food items
 @request_bp.route("/available", methods=["GET"])
+@conditional_get(_available_scopes)
 def available_foods():
-    foods = FoodItem.query.filter_by(status="available").all()
-    return jsonify([{
-        "food_id": f.food_id,
-        "name": f.name,
-        "quantity": f.quantity,
-        "expiry_date": str(f.expiry_date)
-    } for f in foods])
+    query = _apply_available_filters(AVAILABLE_FOOD.query(), request.args)
+    return paginate(query, FoodItem.food_id, AVAILABLE_FOOD.dump)
+
+
+def _apply_available_filters(query, args):
+    query = query.filter(FoodItem.status == "available")
+    donor_id = args.get("donor_id", type=int)
+    if donor_id:
+        query = query.filter(FoodItem.donor_id == donor_id)
+    return query
 
 
 #accept a donation - creates a transaction
 @request_bp.route("/accept/<int:food_id>", methods=["POST"])
+@idempotent
 def accept_food(food_id):
     data = request.json
     receiver_id = data.get("receiver_id")
@@ -118,19 +164,26 @@ def accept_food(food_id):
     if not receiver:
         return jsonify({"error": "Receiver not found"}), 404
 
-    food = FoodItem.query.get(food_id)
-    if not food:
-        return jsonify({"error": "Food item not found"}), 404
+    quantity = data.get("quantity")
+    if quantity is not None and (isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0):
+        return jsonify({"error": "quantity must be a positive integer"}), 400
 
-    donor = User.query.get(food.donor_id)
+    # Conditional claim: only one concurrent receiver can win the item
+    claim = claim_food(food_id, quantity)
+    if claim is None:
+        db.session.rollback()
+        body, status = claim_error(food_id)
+        return jsonify(body), status
+    donor_id, claimed_quantity = claim
 
     # Create Transaction
     txn = Transaction(
-        donor_id=donor.user_id,
+        donor_id=donor_id,
         receiver_id=receiver.user_id,
         request_id=request_id,
         food_id=food_id,
-        status="accepted"
+        quantity=claimed_quantity,
+        status="initiated"
     )
 
     db.session.add(txn)
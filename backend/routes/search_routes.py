@@ -0,0 +1,28 @@
+from flask import Blueprint, request, jsonify
+from services.search import DEFAULT_LIMIT, MAX_LIMIT, TARGETS, search
+
+search_bp = Blueprint("search_bp", __name__)
+
+
+# Ranked search over pending requests and available food by name, e.g.
+# /search?q=rice&type=requests. Matches whole words (stemmed) and misspelt
+# or partial words; fresher listings rank higher among equal matches.
+@search_bp.route("/search", methods=["GET"])
+def search_listings():
+    query = (request.args.get("q") or "").strip()
+    if len(query) < 2:
+        return jsonify({"error": "q must be at least 2 characters"}), 400
+
+    kind = request.args.get("type", "all")
+    if kind != "all" and kind not in TARGETS:
+        return jsonify({"error": f"type must be one of: all, {', '.join(TARGETS)}"}), 400
+    types = list(TARGETS) if kind == "all" else [kind]
+
+    try:
+        limit = int(request.args.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1 or limit > MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_LIMIT}"}), 400
+
+    return jsonify({"query": query, **search(query, types, limit)}), 200
@@ -0,0 +1,16 @@
+from flask import Blueprint, request, jsonify
+from services.stats import get_dashboard
+
+stats_bp = Blueprint("stats_bp", __name__, url_prefix="/stats")
+
+
+# Impact dashboard: global totals plus the caller's own counters, read from
+# the incrementally maintained stats tables (O(1) in the number of
+# transactions). ?user_id= or X-User-Id selects the user; omit for global only.
+@stats_bp.route("/dashboard", methods=["GET"])
+def dashboard():
+    user_id = request.args.get("user_id", type=int) or request.headers.get("X-User-Id", type=int)
+    result = get_dashboard(user_id)
+    if result["updated_at"] is not None:
+        result["updated_at"] = result["updated_at"].strftime("%Y-%m-%d %H:%M:%S")
+    return jsonify(result), 200
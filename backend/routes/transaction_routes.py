@@ -3,13 +3,21 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from datetime import datetime, timezone
-from models import Transaction, FoodItem, User
-from datetime import datetime
+from models import Transaction, TransactionArchive, FoodItem, User, txn_status_enum
+from services.archival import parse_archived, with_archive
+from services.claims import claim_error, claim_food
+from services.idempotency import idempotent
+from services.pagination import paginate
+from services.routing import RoutingOptions, run_route_plan
+from services.serializers import TRANSACTION
+from services.stats import StatsDelta
+from sqlalchemy import select
 
 transaction_bp = Blueprint("transaction_bp", __name__, url_prefix="/transactions")
 
 # create new transaction
 @transaction_bp.route("/create", methods=["POST"])
+@idempotent
 def create_transaction():
     data = request.get_json()
 
@@ -20,92 +28,161 @@ def create_transaction():
     if not donor_id or not receiver_id or not food_id:
         return jsonify({"error": "Missing required fields"}), 400
 
-    # Check if the food item exists
-    food_item = FoodItem.query.get(food_id)
-    if not food_item:
-        return jsonify({"error": "Food item not found"}), 404
+    quantity = data.get("quantity")
+    if quantity is not None and (isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0):
+        return jsonify({"error": "quantity must be a positive integer"}), 400
 
-    # Check if already claimed
-    if food_item.status != "available":
-        return jsonify({"error": "Food item already claimed"}), 400
+    # Conditional claim: only one concurrent caller can win the item
+    claim = claim_food(food_id, quantity)
+    if claim is None:
+        db.session.rollback()
+        body, status = claim_error(food_id)
+        return jsonify(body), status
+    _, claimed_quantity = claim
 
-    # Create a new transaction
     transaction = Transaction(
         donor_id=donor_id,
         receiver_id=receiver_id,
         food_id=food_id,
-        date=datetime.now(timezone.utc),
-        status="claimed"
+        quantity=claimed_quantity,
+        status="initiated",
+        created_at=datetime.now(timezone.utc)
     )
 
-    # Mark food item as claimed
-    food_item.status = "claimed"
-
     db.session.add(transaction)
     db.session.commit()
 
     return jsonify({
         "message": "Transaction created successfully",
-        "transaction_id": transaction.txn_id
+        "transaction_id": transaction.txn_id,
+        "quantity": claimed_quantity
     }), 201
 
 
-# 🟡 2. Get all transactions
+# 🟡 2. Get all transactions (keyset paginated, ?stream=ndjson|json for exports,
+# ?archived=include|only for archived ones)
 @transaction_bp.route("/all", methods=["GET"])
 def get_all_transactions():
-    transactions = Transaction.query.all()
-
-    output = []
-    for txn in transactions:
-        output.append({
-            "txn_id": txn.txn_id,
-            "donor_id": txn.donor_id,
-            "receiver_id": txn.receiver_id,
-            "food_id": txn.food_id,
-            "food_name": txn.food.food_name if txn.food else None,
-            "date": txn.date.strftime("%Y-%m-%d %H:%M:%S"),
-            "status": txn.status
-        })
-
-    return jsonify(output), 200
+    query, columns, error = _transaction_rows(
+        request.args, lambda stmt, columns: _apply_transaction_filters(stmt, request.args, columns)
+    )
+    if error:
+        return jsonify({"error": error}), 400
+
+    return paginate(query, columns.txn_id, TRANSACTION.dump)
+
+
+def _apply_transaction_filters(query, args, columns):
+    status = args.get("status")
+    if status:
+        query = query.filter(columns.status == status)
+    donor_id = args.get("donor_id", type=int)
+    if donor_id:
+        query = query.filter(columns.donor_id == donor_id)
+    receiver_id = args.get("receiver_id", type=int)
+    if receiver_id:
+        query = query.filter(columns.receiver_id == receiver_id)
+    return query
+
+
+# Column-only projection with the food name joined in, so listing N
+# transactions is one SELECT instead of 1 + N lazy loads of txn.food.
+# where(query, columns) filters hot and archived rows alike.
+def _transaction_rows(args, where):
+    mode, error = parse_archived(args)
+    if error:
+        return None, None, error
+    query, columns = with_archive(
+        db.session.query, TRANSACTION.columns, TransactionArchive.__table__, mode,
+        join=lambda stmt, table: stmt.outerjoin(FoodItem, FoodItem.food_id == table.c.food_id),
+        where=where,
+    )
+    return query, columns, None
 
 
 # 🔵 3. Get transactions for a specific user (donor or receiver)
 @transaction_bp.route("/user/<int:user_id>", methods=["GET"])
 def get_user_transactions(user_id):
-    transactions = Transaction.query.filter(
-        (Transaction.donor_id == user_id) | (Transaction.receiver_id == user_id)
-    ).all()
+    query, columns, error = _transaction_rows(
+        request.args, lambda stmt, columns: stmt.filter((columns.donor_id == user_id) | (columns.receiver_id == user_id))
+    )
+    if error:
+        return jsonify({"error": error}), 400
+
+    transactions = query.order_by(columns.txn_id).all()
 
     if not transactions:
         return jsonify({"message": "No transactions found for this user"}), 404
 
-    output = []
-    for txn in transactions:
-        output.append({
-            "txn_id": txn.txn_id,
-            "donor_id": txn.donor_id,
-            "receiver_id": txn.receiver_id,
-            "food_id": txn.food_id,
-            "food_name": txn.food.food_name if txn.food else None,
-            "date": txn.date.strftime("%Y-%m-%d %H:%M:%S"),
-            "status": txn.status
-        })
-
-    return jsonify(output), 200
+    return jsonify(TRANSACTION.dump_many(transactions)), 200
 
 
 # 🔴 4. Update transaction status (optional)
 @transaction_bp.route("/update/<int:txn_id>", methods=["PUT"])
 def update_transaction_status(txn_id):
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     new_status = data.get("status")
+    if new_status not in txn_status_enum.enums:
+        return jsonify({"error": f"status must be one of: {', '.join(txn_status_enum.enums)}"}), 400
 
-    txn = Transaction.query.get(txn_id)
+    # Row lock until the commit: a concurrent update waits and then sees
+    # this one's status, so the counters move once per real change
+    txn = db.session.get(Transaction, txn_id, with_for_update=True)
     if not txn:
         return jsonify({"error": "Transaction not found"}), 404
 
+    # Entering or leaving "completed" moves the impact counters. A
+    # whole-item transaction keeps the quantity it was counted with, so
+    # leaving "completed" later takes back exactly what was added
+    quantity = txn.quantity
+    if quantity is None and "completed" in (txn.status, new_status) and txn.status != new_status:
+        quantity = txn.quantity = db.session.scalar(select(FoodItem.quantity).where(FoodItem.food_id == txn.food_id))
+    stats = StatsDelta()
+    stats.transaction_moved(txn.donor_id, txn.receiver_id, quantity, txn.status, new_status)
+    stats.apply()
+
     txn.status = new_status
     db.session.commit()
 
     return jsonify({"message": "Transaction status updated"}), 200
+
+
+# 🔴 5. Plan multi-stop pickup/drop routes over initiated transactions
+_ROUTE_LIMITS = ("capacity", "max_stops", "max_route_hours", "speed_kmh", "stop_minutes")
+
+
+@transaction_bp.route("/routes/plan", methods=["POST"])
+def plan_routes():
+    data = request.get_json(silent=True) or {}
+
+    limits = {}
+    for name in _ROUTE_LIMITS:
+        if name in data:
+            value = data[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                return jsonify({"error": f"{name} must be a positive number"}), 400
+            limits[name] = value
+
+    drivers = data.get("drivers")
+    if drivers is not None and (isinstance(drivers, bool) or not isinstance(drivers, int) or drivers <= 0):
+        return jsonify({"error": "drivers must be a positive integer"}), 400
+
+    depot = data.get("depot")
+    if depot is not None:
+        try:
+            depot = (float(depot["lat"]), float(depot["long"]))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "depot must be an object with numeric lat and long"}), 400
+
+    txn_ids = data.get("transaction_ids")
+    if txn_ids is not None and (not isinstance(txn_ids, list)
+                                or not all(isinstance(i, int) and not isinstance(i, bool) for i in txn_ids)):
+        return jsonify({"error": "transaction_ids must be a list of integers"}), 400
+
+    summary = run_route_plan(
+        RoutingOptions(drivers=drivers, depot=depot, **limits),
+        txn_ids=txn_ids,
+        dry_run=bool(data.get("dry_run")),
+    )
+
+    return jsonify(summary), 200
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
-from models import db, User, Role
-from werkzeug.security import generate_password_hash, check_password_hash
+from models import db, User, user_roles
+from sqlalchemy.orm import joinedload
+from services.passwords import HasherBusy, password_hasher
+from services.user_lookups import get_user_profile, invalidate_user_profile, role_ids_by_name
 
 user_bp = Blueprint("user_bp", __name__)
 
@@ -8,8 +10,11 @@ user_bp = Blueprint("user_bp", __name__)
 def register():
     data = request.json
 
-    # Hash password
-    hashed_pw = generate_password_hash(data["password"], method="pbkdf2:sha256")
+    # Hash password (in the hashing pool, see services/passwords.py)
+    try:
+        hashed_pw = password_hasher.hash(data["password"])
+    except HasherBusy:
+        return _hasher_busy()
 
     # Create user (without roles first)
     new_user = User(
@@ -24,36 +29,59 @@ def register():
     # Assign roles (expects array like ["donor", "receiver"])
     role_names = data.get("roles", [])
 
+    # Role ids come from the cache instead of one query per role name
+    role_ids = role_ids_by_name(role_names)
     for role_name in role_names:
-        role = Role.query.filter_by(role_name=role_name).first()
-        if role:
-            new_user.roles.append(role)
-        else:
+        if role_ids[role_name] is None:
             return jsonify({"error": f"Role '{role_name}' not found"}), 400
 
     db.session.add(new_user)
+    db.session.flush()
+    if role_ids:
+        db.session.execute(user_roles.insert(), [
+            {"user_id": new_user.user_id, "role_id": role_id} for role_id in set(role_ids.values())
+        ])
     db.session.commit()
 
     return jsonify({"message": "User registered successfully!"}), 201
 
+def _hasher_busy():
+    response = jsonify({"error": "Server busy, please retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 # ------------------------------------------------------
 # LOGIN
 # ------------------------------------------------------
 @user_bp.route("/login", methods=["POST"])
 def login():
+    if password_hasher.busy():
+        return _hasher_busy()
+
     data = request.json
 
     email = data.get("email")
     password = data.get("password")
 
-    user = User.query.filter_by(email=email).first()
+    # Roles come back in the same SELECT instead of a second lazy load
+    user = User.query.options(joinedload(User.roles)).filter_by(email=email).first()
 
     if not user:
         return jsonify({"error": "Invalid email"}), 400
 
-    if not check_password_hash(user.password, password):
+    try:
+        valid, upgraded_hash = password_hasher.verify(user.password, password)
+    except HasherBusy:
+        return _hasher_busy()
+
+    if not valid:
         return jsonify({"error": "Invalid password"}), 400
 
+    # Stored hash used older cost parameters; keep the upgraded one
+    if upgraded_hash:
+        user.password = upgraded_hash
+        db.session.commit()
+
     return jsonify({
         "message": "Login successful",
         "user_id": user.user_id,
@@ -66,20 +94,12 @@ def login():
 # ------------------------------------------------------
 @user_bp.route("/profile/<int:user_id>", methods=["GET"])
 def get_profile(user_id):
-    user = User.query.get(user_id)
+    profile = get_user_profile(user_id)
 
-    if not user:
+    if not profile:
         return jsonify({"error": "User not found"}), 404
 
-    return jsonify({
-        "user_id": user.user_id,
-        "name": user.name,
-        "email": user.email,
-        "phone": user.phone,
-        "location_lat": user.location_lat,
-        "location_long": user.location_long,
-        "roles": [r.role_name for r in user.roles]
-    }), 200
+    return jsonify(profile), 200
 
 # ------------------------------------------------------
 # UPDATE PROFILE
@@ -99,5 +119,6 @@ def update_profile(user_id):
     user.location_long = data.get("location_long", user.location_long)
 
     db.session.commit()
+    invalidate_user_profile(user_id)
 
     return jsonify({"message": "Profile updated"}), 200
@@ -0,0 +1,279 @@
+import csv
+import gzip
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, select, text, union_all
+
+from models import db, Request, RequestArchive, Transaction, TransactionArchive
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet  # optional, see ARCHIVE_SINK in config.py
+except ImportError:
+    pyarrow = parquet = None
+
+logger = logging.getLogger(__name__)
+
+CLOSED_REQUEST_STATUSES = ("completed", "cancelled", "timed_out")
+CLOSED_TRANSACTION_STATUSES = ("completed", "cancelled")
+ARCHIVED_MODES = ("exclude", "include", "only")
+_PRIMARY_KEYS = {"requests": "request_id", "transactions": "txn_id"}
+
+
+# ------------------------------------------------------------
+# Sinks: where a batch of moved rows goes, before the DELETE commits
+# ------------------------------------------------------------
+class TableSink:
+    # Cold tables in the same database (same transaction as the DELETE);
+    # the only sink the ?archived= read path and rebuild-stats can see
+    name = "table"
+    tables = {"requests": RequestArchive.__table__, "transactions": TransactionArchive.__table__}
+
+    def write(self, kind, rows, archived_at):
+        db.session.execute(self.tables[kind].insert(), [dict(row, archived_at=archived_at) for row in rows])
+
+
+class FileSink:
+    # One compressed file per batch under directory/<kind>/, written and
+    # fsynced before the DELETE commits. A failed commit can leave a file
+    # whose rows are still in the database, so consumers should dedupe on
+    # the primary key.
+    suffix = None
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, kind, rows, archived_at):
+        folder = os.path.join(self.directory, kind)
+        os.makedirs(folder, exist_ok=True)
+        first = rows[0][_PRIMARY_KEYS[kind]]
+        path = os.path.join(folder, f"{archived_at:%Y%m%dT%H%M%S}-{first}{self.suffix}")
+        self._write(path, [dict(row, archived_at=archived_at) for row in rows])
+
+    def _write(self, path, rows):
+        raise NotImplementedError
+
+
+class CsvSink(FileSink):
+    name = "csv"
+    suffix = ".csv.gz"
+
+    def _write(self, path, rows):
+        with gzip.open(path, "wt", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ParquetSink(FileSink):
+    name = "parquet"
+    suffix = ".parquet"
+
+    def _write(self, path, rows):
+        parquet.write_table(pyarrow.Table.from_pylist(rows), path, compression="zstd")
+
+
+def make_sink(name, directory=None):
+    if name == "table":
+        return TableSink()
+    if name == "csv":
+        return CsvSink(directory)
+    if name == "parquet":
+        if parquet is None:
+            raise RuntimeError("ARCHIVE_SINK=parquet needs pyarrow (pip install pyarrow)")
+        return ParquetSink(directory)
+    raise ValueError(f"unknown archive sink {name!r}; use table, csv or parquet")
+
+
+# ------------------------------------------------------------
+# Archival job
+# ------------------------------------------------------------
+def _move(kind, model, pk, condition, sink, batch_size, archived_at):
+    # DELETE ... WHERE pk IN (SELECT pk ... LIMIT batch_size) RETURNING *,
+    # handed to the sink in the same transaction; one commit per batch
+    total = 0
+    while True:
+        batch = select(pk).where(condition).order_by(pk).limit(batch_size)
+        stmt = (
+            delete(model)
+            .where(pk.in_(batch))
+            .returning(*model.__table__.c)
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(stmt).mappings().all()
+        if rows:
+            sink.write(kind, rows, archived_at)
+        db.session.commit()
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def archive_closed(older_than_days, batch_size=1000, sink=None, now=None):
+    # Moves closed transactions, then closed requests no transaction still
+    # points at, created more than older_than_days ago. Incremental impact
+    # counters are unaffected; rebuild-stats reads transactions_archive too.
+    from services.versions import change_versions
+
+    sink = sink or TableSink()
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = now - timedelta(days=older_than_days)
+    started = time.perf_counter()
+
+    transactions = _move(
+        "transactions", Transaction, Transaction.txn_id,
+        Transaction.status.in_(CLOSED_TRANSACTION_STATUSES) & (Transaction.created_at < cutoff),
+        sink, batch_size, now,
+    )
+    requests = _move(
+        "requests", Request, Request.request_id,
+        Request.status.in_(CLOSED_REQUEST_STATUSES) & (Request.created_at < cutoff)
+        & ~exists().where(Transaction.request_id == Request.request_id),
+        sink, batch_size, now,
+    )
+    if transactions or requests:
+        change_versions.bump(["requests", "transactions"])
+
+    stats = {
+        "archived_transactions": transactions,
+        "archived_requests": requests,
+        "sink": sink.name,
+        "dropped_partitions": drop_empty_partitions(cutoff.date()),
+        "created_partitions": ensure_transaction_partitions(),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("archival: %s", stats)
+    return stats
+
+
+# ------------------------------------------------------------
+# Monthly partitions of transactions (PostgreSQL)
+# ------------------------------------------------------------
+PARTITION_PREFIX = "transactions_p"
+DEFAULT_PARTITION = "transactions_default"
+
+
+def _month(day, offset=0):
+    month = day.year * 12 + day.month - 1 + offset
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def is_partitioned():
+    if db.engine.dialect.name != "postgresql":
+        return False
+    return db.session.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'transactions' AND c.relnamespace = to_regnamespace(current_schema()))"
+    ))
+
+
+def _partitions():
+    return db.session.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'transactions'::regclass"
+    )).all()
+
+
+def ensure_transaction_partitions(months_ahead=3, today=None):
+    # Creates the monthly partitions from this month to months_ahead. Rows
+    # that already landed in the default partition for a new month are moved
+    # into it (the default is detached meanwhile, in one transaction).
+    if not is_partitioned():
+        return []
+    today = today or date.today()
+    existing = set(_partitions())
+    created = []
+    for offset in range(months_ahead + 1):
+        start = _month(today, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        bounds = {"start": start, "end": _month(start, 1)}
+        in_default = db.session.scalar(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+        ), bounds)
+        if in_default:
+            db.session.execute(text(f"ALTER TABLE transactions DETACH PARTITION {DEFAULT_PARTITION}"))
+        db.session.execute(text(
+            f"CREATE TABLE {name} PARTITION OF transactions FOR VALUES FROM ('{start}') TO ('{bounds['end']}')"
+        ))
+        if in_default:
+            db.session.execute(text(
+                f"INSERT INTO transactions SELECT * FROM {DEFAULT_PARTITION} "
+                "WHERE created_at >= :start AND created_at < :end"
+            ), bounds)
+            db.session.execute(text(
+                f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+            ), bounds)
+            db.session.execute(text(f"ALTER TABLE transactions ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        db.session.commit()
+        created.append(name)
+    return created
+
+
+def drop_empty_partitions(before):
+    # Drops monthly partitions that end on or before `before` and hold no
+    # rows (everything in them was archived)
+    if not is_partitioned():
+        return []
+    dropped = []
+    for name in sorted(_partitions()):
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y_%m").date()
+        if _month(start, 1) > before:
+            continue
+        if db.session.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+            continue
+        db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+        dropped.append(name)
+    return dropped
+
+
+# ------------------------------------------------------------
+# Read path: hot rows, archived rows or both
+# ------------------------------------------------------------
+def parse_archived(args):
+    # Returns (mode, error message) for ?archived=exclude|include|only
+    mode = args.get("archived", "exclude")
+    if mode not in ARCHIVED_MODES:
+        return None, f"archived must be one of: {', '.join(ARCHIVED_MODES)}"
+    return mode, None
+
+
+def with_archive(make, columns, archive_table, mode, join=None, where=None):
+    # `columns` are a schema's columns over a hot table; returns (query,
+    # columns namespace for the keyset). make is select or db.session.query;
+    # join(stmt, table) and where(stmt, table.c) are applied to each side,
+    # so "include" filters both tables before the UNION ALL.
+    hot_table = columns[0].table
+
+    def side(make, table):
+        if table is not hot_table:
+            columns_over = [table.c[c.key] if c.table is hot_table else c for c in columns]
+        else:
+            columns_over = columns
+        stmt = make(*columns_over)
+        if join:
+            stmt = join(stmt, table)
+        if where:
+            stmt = where(stmt, table.c)
+        return stmt
+
+    if mode == "exclude":
+        return side(make, hot_table), hot_table.c
+    if mode == "only":
+        return side(make, archive_table), archive_table.c
+
+    both = union_all(side(select, hot_table), side(select, archive_table)).subquery(f"{hot_table.name}_all")
+    return make(*both.c), both.c
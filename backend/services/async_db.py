@@ -0,0 +1,34 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Sync driver -> async driver for the same database
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url):
+    if not url or "://" not in url:
+        return None
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def create_async_db_engine(url):
+    # Same pool settings as the sync engine. The async engine keeps
+    # SQLAlchemy's default AsyncAdaptedQueuePool, since QueuePool subclasses
+    # (InstrumentedQueuePool) can't be used with asyncio drivers.
+    from config import build_engine_options
+    from services.db_pool import InstrumentedQueuePool
+
+    options = build_engine_options(url)
+    if options.get("poolclass") is InstrumentedQueuePool:
+        del options["poolclass"]
+    return create_async_engine(url, **options)
+
+
+def create_async_session_factory(engine):
+    # Handlers only read; rows must never lazy-load once a session ends
+    return async_sessionmaker(engine, expire_on_commit=False)
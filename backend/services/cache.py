@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LocalCacheBackend:
+    # Thread-safe in-process LRU with per-entry TTL
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    # Shared backend for any client with Redis-style get/set(ex=)/delete
+    # (redis-py, or a local stand-in). Values are stored as JSON.
+
+    def __init__(self, client, prefix="frns:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+class Cache:
+    # Read-through cache with hit/miss counters, set up like the other Flask
+    # extensions (cache = Cache(); cache.init_app(app)).
+
+    def __init__(self):
+        self.backend = LocalCacheBackend()
+        self.default_ttl = 300
+        self.cache_profiles = True
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app, backend=None):
+        self.default_ttl = app.config.get("CACHE_TTL_SECONDS", 300)
+
+        if backend is None and app.config.get("CACHE_BACKEND") == "redis":
+            import redis  # optional, only needed for the shared backend
+            backend = RedisCacheBackend(redis.Redis.from_url(app.config["CACHE_REDIS_URL"]))
+
+        self.backend = backend or LocalCacheBackend(app.config.get("CACHE_MAX_ENTRIES", 10000))
+        # Entries that writes invalidate are only safe where every worker
+        # sees the invalidation
+        self.cache_profiles = (isinstance(self.backend, RedisCacheBackend)
+                               or app.config.get("CACHE_PROFILES_LOCAL", False))
+        app.extensions["cache"] = self
+
+    def get_or_load(self, key, loader, ttl=None):
+        # loader() returning None is not cached, so missing rows are looked
+        # up again next time
+        value = self.backend.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value, ttl or self.default_ttl)
+        return value
+
+    async def get_or_load_async(self, key, loader, ttl=None):
+        # Same as get_or_load for an async loader (the async entry point).
+        # Backend calls stay synchronous: the local LRU never blocks, and a
+        # Redis round trip is short next to the database query it replaces.
+        value = self.backend.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            self.backend.set(key, value, ttl or self.default_ttl)
+        return value
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "entries": len(self.backend) if hasattr(self.backend, "__len__") else None,
+            "evictions": getattr(self.backend, "evictions", None),
+        }
+
+
+cache = Cache()
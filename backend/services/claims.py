@@ -0,0 +1,57 @@
+from sqlalchemy import case, select, update
+
+from models import db, FoodItem
+from services.events import make_event, record
+from services.stats import StatsDelta
+
+MAX_CLAIM_ATTEMPTS = 3
+
+
+def claim_food(food_id, quantity=None):
+    # Atomically claims `quantity` units of an available food item (all that
+    # is left when quantity is None) with one conditional UPDATE ... RETURNING.
+    # The WHERE clause re-checks status/quantity, so two concurrent claimers
+    # can never both win: under PostgreSQL the loser blocks on the row lock,
+    # re-evaluates the condition and matches nothing.
+    #
+    # Returns (donor_id, claimed_quantity) or None. The caller adds its
+    # Transaction and commits, which releases the row lock.
+    for _ in range(MAX_CLAIM_ATTEMPTS):
+        if quantity is None:
+            # Whole-item claim: guard on the quantity we read so a concurrent
+            # partial claim in between makes us retry instead of over-claim
+            wanted = db.session.execute(
+                select(FoodItem.quantity).where(FoodItem.food_id == food_id, FoodItem.status == "available")
+            ).scalar()
+            if not wanted:
+                return None
+            guard = FoodItem.quantity == wanted
+        else:
+            wanted = quantity
+            guard = FoodItem.quantity >= quantity
+
+        remaining = FoodItem.quantity - wanted
+        row = db.session.execute(
+            update(FoodItem)
+            .where(FoodItem.food_id == food_id, FoodItem.status == "available", guard)
+            .values(quantity=remaining, status=case((remaining == 0, "pending"), else_="available"))
+            .returning(FoodItem.donor_id, FoodItem.status, FoodItem.quantity)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+        if row is not None:
+            stats = StatsDelta()
+            stats.listing_moved(row.donor_id, "available", row.status)
+            stats.apply()
+            record(make_event("food", "updated", food_id, status=row.status, user_id=row.donor_id, quantity=row.quantity))
+            return row.donor_id, wanted
+        if quantity is not None:
+            return None
+    return None
+
+
+def claim_error(food_id):
+    # (body, status) explaining why claim_food() returned None
+    if db.session.get(FoodItem, food_id) is None:
+        return {"error": "Food item not found"}, 404
+    return {"error": "Food item already claimed or not enough quantity left"}, 400
@@ -0,0 +1,407 @@
+import asyncio
+import json
+import logging
+import queue
+import select as select_module
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from itertools import count
+
+from sqlalchemy import event as sa_event, inspect as sa_inspect, select, text
+from sqlalchemy.pool import StaticPool
+
+from models import db, FoodItem, Request, Transaction, User
+from services.geo import bounding_box, haversine_km
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "frns_events"
+EVENT_TYPES = ("food", "request", "transaction")
+
+# ORM model -> (event prefix, primary key, owning user, food type column)
+_TRACKED = {
+    FoodItem: ("food", "food_id", "donor_id", "name"),
+    Request: ("request", "request_id", "receiver_id", "food_type"),
+    Transaction: ("transaction", "txn_id", "donor_id", None),
+}
+
+
+def _type_key(value):
+    return (value or "").strip().lower()
+
+
+def make_event(kind, action, entity_id, status=None, user_id=None, food_type=None, quantity=None, **extra):
+    # kind is food/request/transaction, action created/updated/deleted
+    return {
+        "type": f"{kind}.{action}",
+        "id": entity_id,
+        "status": status,
+        "user_id": user_id,
+        "food_type": food_type,
+        "quantity": quantity,
+        **extra,
+    }
+
+
+# -- subscribers -----------------------------------------------------------
+
+class EventFilter:
+    def __init__(self, types=None, food_type=None, lat=None, lon=None, radius_km=None):
+        self.types = set(types) if types else None
+        self.food_type = _type_key(food_type) or None
+        self.center = (lat, lon) if lat is not None and lon is not None and radius_km else None
+        self.radius_km = radius_km
+        if self.center:
+            self.box = bounding_box(lat, lon, radius_km)
+
+    def matches(self, event):
+        if self.types and event["type"].split(".", 1)[0] not in self.types:
+            return False
+        if self.food_type and _type_key(event.get("food_type")) != self.food_type:
+            return False
+        if self.center:
+            lat, lon = event.get("lat"), event.get("long")
+            if lat is None or lon is None:
+                return False
+            min_lat, max_lat, min_lon, max_lon = self.box
+            if not min_lat <= lat <= max_lat or (min_lon is not None and not min_lon <= lon <= max_lon):
+                return False
+            return haversine_km(self.center[0], self.center[1], lat, lon) <= self.radius_km
+        return True
+
+
+class Subscription:
+    # Bounded per-client buffer. A client that stops reading loses its
+    # oldest events (counted in `dropped`) instead of growing memory; it can
+    # resync through the list endpoints.
+
+    def __init__(self, hub, event_filter, max_buffer):
+        self.hub = hub
+        self.filter = event_filter
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self.closed = False
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._loop = None
+        self._ready = None
+
+    def push(self, event):
+        with self._cond:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+                self.hub.dropped += 1
+            self._buffer.append(event)
+            self._cond.notify()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    def _drain(self):
+        with self._cond:
+            events = list(self._buffer)
+            self._buffer.clear()
+            return events
+
+    def get(self, timeout):
+        # Blocks a thread (WSGI); returns [] on timeout
+        with self._cond:
+            if not self._buffer:
+                self._cond.wait(timeout)
+        return self._drain()
+
+    async def get_async(self, timeout):
+        # Waits on the event loop (ASGI); returns [] on timeout
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+        self._ready.clear()
+        events = self._drain()
+        if events:
+            return events
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._drain()
+
+    def close(self):
+        # Also wakes a waiting reader so it can notice and return
+        self.closed = True
+        self.hub.unsubscribe(self)
+        with self._cond:
+            self._cond.notify()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+
+class SubscriberLimit(Exception):
+    pass
+
+
+class EventHub:
+    # In-process fan-out. Subscribers with a food_type filter are indexed by
+    # it, so an event is only matched against the subscribers that could
+    # want it; the last `replay_size` events are kept for Last-Event-ID.
+
+    def __init__(self, max_subscribers=10000, buffer_size=1000, replay_size=1000):
+        self.max_subscribers = max_subscribers
+        self.buffer_size = buffer_size
+        self.published = 0
+        self.dropped = 0
+        self._seq = count(1)
+        self._recent = deque(maxlen=replay_size)
+        self._by_food_type = {}
+        self._unfiltered = set()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def configure(self, max_subscribers, buffer_size, replay_size):
+        self.max_subscribers = max_subscribers
+        self.buffer_size = buffer_size
+        self._recent = deque(self._recent, maxlen=replay_size)
+
+    def subscribe(self, event_filter, last_event_id=None):
+        sub = Subscription(self, event_filter, self.buffer_size)
+        with self._lock:
+            if self._size >= self.max_subscribers:
+                raise SubscriberLimit()
+            bucket = self._by_food_type.setdefault(event_filter.food_type, set()) if event_filter.food_type else self._unfiltered
+            bucket.add(sub)
+            self._size += 1
+            backlog = [e for e in self._recent if last_event_id is not None and e["seq"] > last_event_id]
+        for event in backlog:
+            if event_filter.matches(event):
+                sub.push(event)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            food_type = sub.filter.food_type
+            bucket = self._by_food_type.get(food_type) if food_type else self._unfiltered
+            if bucket is not None and sub in bucket:
+                bucket.discard(sub)
+                self._size -= 1
+                if food_type and not bucket:
+                    del self._by_food_type[food_type]
+
+    def publish(self, events):
+        for event in events:
+            with self._lock:
+                event["seq"] = next(self._seq)
+                self._recent.append(event)
+                candidates = list(self._unfiltered)
+                candidates.extend(self._by_food_type.get(_type_key(event.get("food_type")), ()))
+            for sub in candidates:
+                if sub.filter.matches(event):
+                    sub.push(event)
+            self.published += 1
+
+    def stats(self):
+        return {"subscribers": self._size, "published": self.published, "dropped": self.dropped}
+
+
+# -- capture and publishing --------------------------------------------------
+
+class EventPublisher:
+    # Session hooks buffer events per transaction in session.info and hand
+    # them over on commit (never on rollback): first to the commit hooks
+    # (change version tracking), then, with EVENTS_ENABLED, to a background
+    # thread that fills in locations/food types in a few batched queries
+    # and fans them out locally, or through PostgreSQL NOTIFY so every
+    # worker process's hub sees them (EVENTS_BACKEND=postgres).
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.enabled = False
+        self.backend = "local"
+        self.engine = None
+        self.inline = False
+        self.commit_hooks = []
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def init_app(self, app):
+        app.extensions["event_publisher"] = self
+        sa_event.listen(db.session, "after_flush", _collect_orm_changes)
+        sa_event.listen(db.session, "after_commit", self._after_commit)
+        sa_event.listen(db.session, "after_soft_rollback", _discard)
+
+        self.enabled = app.config.get("EVENTS_ENABLED", True)
+        self.backend = app.config.get("EVENTS_BACKEND", "local")
+        self.hub.configure(
+            app.config.get("EVENTS_MAX_SUBSCRIBERS", 10000),
+            app.config.get("EVENTS_SUBSCRIBER_BUFFER", 1000),
+            app.config.get("EVENTS_REPLAY_SIZE", 1000),
+        )
+        with app.app_context():
+            self.engine = db.engine
+        # In-memory SQLite shares one connection between threads; a
+        # background reader would roll back the request's transaction
+        self.inline = isinstance(self.engine.pool, StaticPool)
+
+    def on_commit(self, hook):
+        # hook(events) runs on the committing thread after every commit that
+        # changed food items, requests or transactions
+        self.commit_hooks.append(hook)
+
+    def _start(self):
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._publish_loop, name="event-publisher", daemon=True))
+        if self.backend == "postgres":
+            self._threads.append(threading.Thread(target=self._listen_loop, name="event-listener", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _after_commit(self, session):
+        events = session.info.pop("pending_events", None)
+        if not events:
+            return
+        for hook in self.commit_hooks:
+            hook(events)
+        if not self.enabled:
+            return
+        if self.inline:
+            self._publish(events)
+        else:
+            self._start()
+            self._queue.put(events)
+
+    def _publish_loop(self):
+        while True:
+            events = self._queue.get()
+            # Coalesce whatever else is queued into one batch
+            while not self._queue.empty() and len(events) < 5000:
+                events.extend(self._queue.get_nowait())
+            self._publish(events)
+
+    def _publish(self, events):
+        try:
+            with self.engine.connect() as conn:
+                _resolve(conn, events)
+                if self.backend == "postgres":
+                    conn.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        [{"channel": NOTIFY_CHANNEL, "payload": json.dumps(e, default=str)} for e in events],
+                    )
+                    conn.commit()
+            if self.backend != "postgres":
+                self.hub.publish(events)
+        except Exception:
+            logger.exception("failed to publish %d events", len(events))
+
+    def _listen_loop(self):
+        while True:
+            try:
+                raw = self.engine.raw_connection()
+                raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while True:
+                    if select_module.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    batch = []
+                    while conn.notifies:
+                        batch.append(json.loads(conn.notifies.pop(0).payload))
+                    if batch:
+                        self.hub.publish(batch)
+            except Exception:
+                logger.exception("event listener lost its connection, reconnecting")
+                time.sleep(1)
+
+
+def record(*events):
+    # Buffers events for the current transaction; used by the Core bulk
+    # paths (claims, matching, ingest, expiry) that bypass ORM flush events
+    db.session.info.setdefault("pending_events", []).extend(events)
+
+
+def _discard(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop("pending_events", None)
+
+
+def _collect_orm_changes(session, flush_context):
+    events = []
+    for obj in session.new:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            events.append(_orm_event(obj, tracked, "created"))
+    for obj in session.dirty:
+        tracked = _TRACKED.get(type(obj))
+        if tracked and session.is_modified(obj, include_collections=False):
+            events.append(_orm_event(obj, tracked, "updated"))
+    for obj in session.deleted:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            events.append(_orm_event(obj, tracked, "deleted"))
+    if events:
+        session.info.setdefault("pending_events", []).extend(events)
+
+
+def _orm_event(obj, tracked, action):
+    kind, pk, owner, food_type = tracked
+    extra = {}
+    if kind == "transaction":
+        extra = {"food_id": obj.food_id, "request_id": obj.request_id, "receiver_id": obj.receiver_id}
+        # after_flush still sees the pre-flush history: the notification
+        # outbox only reacts to real status changes
+        previous = sa_inspect(obj).attrs.status.history.deleted
+        if action == "updated" and previous and previous[0] != obj.status:
+            extra["previous_status"] = previous[0]
+    return make_event(
+        kind, action, getattr(obj, pk),
+        status=obj.status,
+        user_id=getattr(obj, owner),
+        food_type=getattr(obj, food_type) if food_type else None,
+        quantity=obj.quantity,
+        **extra,
+    )
+
+
+def _resolve(conn, events):
+    # Owner locations and food types the capturing code did not already
+    # know, one IN query each
+    now = datetime.now(timezone.utc).isoformat()
+    user_ids = {e["user_id"] for e in events if "lat" not in e and e.get("user_id") is not None}
+    food_ids = {e.get("food_id", e["id"]) for e in events
+                if e["food_type"] is None and e["type"].split(".")[0] in ("food", "transaction")}
+    request_ids = {e["id"] for e in events if e["food_type"] is None and e["type"].startswith("request.")}
+
+    locations = dict(
+        (row.user_id, (row.location_lat, row.location_long))
+        for row in conn.execute(select(User.user_id, User.location_lat, User.location_long)
+                                .where(User.user_id.in_(user_ids)))
+    ) if user_ids else {}
+    food_names = dict(conn.execute(
+        select(FoodItem.food_id, FoodItem.name).where(FoodItem.food_id.in_(food_ids))
+    ).all()) if food_ids else {}
+    request_types = dict(conn.execute(
+        select(Request.request_id, Request.food_type).where(Request.request_id.in_(request_ids))
+    ).all()) if request_ids else {}
+
+    for e in events:
+        if "lat" not in e:
+            e["lat"], e["long"] = locations.get(e.get("user_id"), (None, None))
+        if e["food_type"] is None:
+            if e["type"].startswith("request."):
+                e["food_type"] = request_types.get(e["id"])
+            else:
+                e["food_type"] = food_names.get(e.get("food_id", e["id"]))
+        e["at"] = now
+
+
+def sse_frame(event):
+    # One Server-Sent Events message; the hub sequence number is the id a
+    # reconnecting client sends back as Last-Event-ID
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+event_hub = EventHub()
+event_publisher = EventPublisher(event_hub)
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import select, update
+
+from models import db, FoodItem, Request
+from services.events import make_event, record
+from services.stats import StatsDelta
+
+logger = logging.getLogger(__name__)
+
+
+def _sweep(model, pk, condition, new_status, batch_size, returning=None, on_batch=None):
+    # Set-based UPDATE ... WHERE pk IN (SELECT pk ... LIMIT batch_size), one
+    # commit per batch, so locks stay short and the partial expiry/deadline
+    # indexes drive the inner select. With on_batch, the UPDATE returns the
+    # `returning` columns of the swept rows and on_batch(rows) runs before
+    # each commit.
+    total = 0
+    while True:
+        batch = select(pk).where(condition).limit(batch_size)
+        stmt = (
+            update(model)
+            .where(pk.in_(batch))
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+        if on_batch:
+            rows = db.session.execute(stmt.returning(*returning)).all()
+            on_batch(rows)
+            count = len(rows)
+        else:
+            count = db.session.execute(stmt).rowcount
+        db.session.commit()
+        total += count
+        if count < batch_size:
+            return total
+
+
+def expire_food_items(batch_size=1000, today=None):
+    today = today or date.today()
+    condition = (FoodItem.status == "available") & (FoodItem.expiry_date < today)
+
+    def record_changes(rows):
+        stats = StatsDelta()
+        for row in rows:
+            stats.listing_moved(row.donor_id, "available", "expired")
+        stats.apply()
+        record(*(
+            make_event("food", "updated", row.food_id, status="expired", user_id=row.donor_id,
+                       food_type=row.name, quantity=row.quantity)
+            for row in rows
+        ))
+
+    return _sweep(FoodItem, FoodItem.food_id, condition, "expired", batch_size,
+                  returning=(FoodItem.food_id, FoodItem.donor_id, FoodItem.name, FoodItem.quantity),
+                  on_batch=record_changes)
+
+
+def time_out_requests(batch_size=1000, now=None):
+    now = now or datetime.now()
+    condition = (Request.status == "pending") & (Request.deadline < now)
+
+    def record_changes(rows):
+        record(*(
+            make_event("request", "updated", row.request_id, status="timed_out", user_id=row.receiver_id,
+                       food_type=row.food_type, quantity=row.quantity)
+            for row in rows
+        ))
+
+    return _sweep(Request, Request.request_id, condition, "timed_out", batch_size,
+                  returning=(Request.request_id, Request.receiver_id, Request.food_type, Request.quantity),
+                  on_batch=record_changes)
+
+
+def run_sweep(batch_size=1000):
+    started = time.perf_counter()
+    stats = {
+        "expired_food_items": expire_food_items(batch_size),
+        "timed_out_requests": time_out_requests(batch_size),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("expiry sweep: %s", stats)
+    return stats
+
+
+class ExpirySweeper:
+    # In-process background thread that runs run_sweep() every interval
+    # seconds. Totals and the last sweep's counts are kept for monitoring.
+
+    def __init__(self, app, interval, batch_size=1000):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.sweeps = 0
+        self.totals = {"expired_food_items": 0, "timed_out_requests": 0}
+        self.last_sweep = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="expiry-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    stats = run_sweep(self.batch_size)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("expiry sweep failed")
+                    continue
+                finally:
+                    db.session.remove()
+
+            self.sweeps += 1
+            self.last_sweep = stats
+            for key in self.totals:
+                self.totals[key] += stats[key]
+
+
+def init_expiry_sweeper(app):
+    interval = app.config.get("EXPIRY_SWEEP_INTERVAL_SECONDS", 0)
+    if interval <= 0:
+        return None
+
+    sweeper = ExpirySweeper(app, interval, app.config.get("EXPIRY_SWEEP_BATCH_SIZE", 1000))
+    app.extensions["expiry_sweeper"] = sweeper
+    sweeper.start()
+    return sweeper
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from itertools import islice
+
+from sqlalchemy import insert, select
+
+from models import db, FoodItem, User
+from services.events import make_event, record
+from services.stats import StatsDelta
+
+BULK_CHUNK_SIZE = 500
+MAX_NAME_LENGTH = 100
+
+
+def parse_food_row(data, default_donor_id=None):
+    # Returns (values, None) for a valid row or (None, error message)
+    donor_id = data.get("user_id") or default_donor_id
+    name = (data.get("food_name") or "").strip()
+    quantity = data.get("quantity")
+    expiry = data.get("expiry_date")
+
+    try:
+        donor_id = int(donor_id)
+    except (TypeError, ValueError):
+        return None, "user_id is required"
+    if not name:
+        return None, "food_name is required"
+    if len(name) > MAX_NAME_LENGTH:
+        return None, f"food_name must be at most {MAX_NAME_LENGTH} characters"
+    # int() would take JSON true as 1 and cut 2.7 down to 2
+    if isinstance(quantity, bool) or (isinstance(quantity, float) and not quantity.is_integer()):
+        return None, "quantity must be an integer"
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        return None, "quantity must be an integer"
+    if quantity <= 0:
+        return None, "quantity must be positive"
+    try:
+        expiry_date = datetime.strptime(str(expiry), "%Y-%m-%d").date()
+    except ValueError:
+        return None, "Invalid expiry_date format. Use YYYY-MM-DD"
+
+    return {
+        "donor_id": donor_id,
+        "name": name,
+        "quantity": quantity,
+        "expiry_date": expiry_date,
+        "status": "available",
+    }, None
+
+
+def ingest_food_rows(rows, default_donor_id=None, chunk_size=BULK_CHUNK_SIZE):
+    # rows is any iterable of dicts (a JSON array or a csv.DictReader over
+    # the request stream). Rows are validated and inserted a chunk at a time
+    # with one executemany INSERT and one commit per chunk; invalid rows are
+    # skipped and reported by their 0-based position.
+    inserted = 0
+    errors = []
+    rows = iter(enumerate(rows))
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        now = datetime.now(timezone.utc)
+        valid = []
+        for index, data in chunk:
+            if not isinstance(data, dict):
+                errors.append({"row": index, "error": "row must be an object"})
+                continue
+            values, error = parse_food_row(data, default_donor_id)
+            if error:
+                errors.append({"row": index, "error": error})
+                continue
+            values["created_at"] = now
+            valid.append((index, values))
+
+        donor_ids = {values["donor_id"] for _, values in valid}
+        known = set(db.session.scalars(select(User.user_id).where(User.user_id.in_(donor_ids)))) if donor_ids else set()
+
+        batch = []
+        for index, values in valid:
+            if values["donor_id"] not in known:
+                errors.append({"row": index, "error": "Donor user not found"})
+            else:
+                batch.append(values)
+
+        if batch:
+            food_ids = db.session.scalars(
+                insert(FoodItem).returning(FoodItem.food_id, sort_by_parameter_order=True), batch
+            ).all()
+            stats = StatsDelta()
+            for values in batch:
+                stats.listing_added(values["donor_id"])
+            stats.apply()
+            record(*(
+                make_event("food", "created", food_id, status="available", user_id=values["donor_id"],
+                           food_type=values["name"], quantity=values["quantity"])
+                for food_id, values in zip(food_ids, batch)
+            ))
+            db.session.commit()
+            inserted += len(batch)
+
+    errors.sort(key=lambda e: e["row"])
+    return inserted, errors
@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import db, FoodItem, Request, Transaction, User
+from services.geo import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Demand (requested quantity) and supply (listed quantity) are summed per
+# (grid cell, food type, day) over the last history_days, one series per
+# (cell, food type) seen. Each series gets a weekly profile (mean per day
+# of week over the overall mean, shrunk toward flat while there are few
+# weeks of data) and a level (exponentially smoothed deseasonalized daily
+# total); the forecast for a day is level * profile[day of week].
+LEVEL_ALPHA = 0.3
+PROFILE_SHRINK_WEEKS = 2.0
+BACKTEST_DAYS = 7
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS_KM / 360
+
+META_FILE = "forecast.json"
+RECORD_DTYPE = np.dtype([
+    ("lat_idx", "<i4"),
+    ("lon_idx", "<i4"),
+    ("food_type", "<i4"),
+    ("day", "<i4"),  # days since 1970-01-01
+    ("demand", "<f4"),
+    ("supply", "<f4"),
+    ("shortfall", "<f4"),
+])
+
+# Composite int64 key per (cell, food type, day): 16 bits of latitude
+# index, 17 of longitude index (room for cells down to MIN_CELL_KM), 15 of
+# food type and 15 of day offset
+MIN_CELL_KM = 0.5
+_DAY_BITS = 15
+_TYPE_BITS = 15
+_LON_BITS = 17
+_LAT_OFFSET = 1 << 15
+_LON_OFFSET = 1 << 16
+
+
+def _type_key(value):
+    return (value or "").strip().lower()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ------------------------------------------------------------
+# Streaming aggregation into the (cell, food type, day) cube
+# ------------------------------------------------------------
+def _demand_statement(since):
+    # Requested quantity as asked for, whatever has been allocated since;
+    # rows from before requested_quantity existed fall back to quantity
+    return (
+        select(
+            User.location_lat, User.location_long, Request.food_type, Request.created_at,
+            func.coalesce(Request.requested_quantity, Request.quantity),
+        )
+        .join(User, User.user_id == Request.receiver_id)
+        .where(Request.created_at >= since, User.location_lat.isnot(None), User.location_long.isnot(None))
+    )
+
+
+def _supply_statement(since):
+    # Listed quantity: what is left plus what was claimed from the item
+    claimed = (
+        select(Transaction.food_id, func.sum(Transaction.quantity).label("quantity"))
+        .where(Transaction.status != "cancelled")
+        .group_by(Transaction.food_id)
+        .subquery()
+    )
+    return (
+        select(
+            User.location_lat, User.location_long, FoodItem.name, FoodItem.created_at,
+            FoodItem.quantity + func.coalesce(claimed.c.quantity, 0),
+        )
+        .join(User, User.user_id == FoodItem.donor_id)
+        .outerjoin(claimed, claimed.c.food_id == FoodItem.food_id)
+        .where(FoodItem.created_at >= since, User.location_lat.isnot(None), User.location_long.isnot(None))
+    )
+
+
+class CubeBuilder:
+    # Streams rows of (lat, long, food type, created_at, quantity) a chunk
+    # at a time; each chunk is reduced to (key, total) pairs with numpy, so
+    # memory follows the number of distinct cells/types/days, not rows
+
+    def __init__(self, start_day, days, cell_km, food_types):
+        self.start_ordinal = start_day.toordinal()
+        self.days = days
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.food_types = food_types  # shared name -> id between demand and supply
+        self.keys = []
+        self.totals = []
+        self.rows = 0
+
+    def add_chunk(self, rows):
+        lat = np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+        lon = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        quantity = np.fromiter((r[4] or 0 for r in rows), dtype=np.float64, count=len(rows))
+        day = np.fromiter((r[3].toordinal() - self.start_ordinal if r[3] else -1 for r in rows),
+                          dtype=np.int64, count=len(rows))
+
+        names, inverse = np.unique(np.array([_type_key(r[2]) for r in rows], dtype=object), return_inverse=True)
+        type_ids = np.array([self.food_types.setdefault(name, len(self.food_types)) for name in names],
+                            dtype=np.int64)[inverse]
+        if len(self.food_types) >= 1 << _TYPE_BITS:
+            raise ValueError(f"more than {(1 << _TYPE_BITS) - 1} distinct food types")
+
+        keep = (day >= 0) & (day < self.days)
+        cell = self._cell_codes(lat[keep], lon[keep])
+        key = (cell << (_TYPE_BITS + _DAY_BITS)) | (type_ids[keep] << _DAY_BITS) | day[keep]
+        unique, inverse = np.unique(key, return_inverse=True)
+        self.keys.append(unique)
+        self.totals.append(np.bincount(inverse, weights=quantity[keep], minlength=len(unique)))
+        self.rows += len(rows)
+
+    def _cell_codes(self, lat, lon):
+        lat_idx = np.floor(lat / self.cell_deg).astype(np.int64) + _LAT_OFFSET
+        lon_idx = np.floor(lon / self.cell_deg).astype(np.int64) + _LON_OFFSET
+        return (lat_idx << _LON_BITS) | lon_idx
+
+    def result(self):
+        # (sorted unique keys, totals)
+        if not self.keys:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        keys = np.concatenate(self.keys)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        return unique, np.bincount(inverse, weights=np.concatenate(self.totals), minlength=len(unique))
+
+
+def _stream(statement, builder, chunk_size):
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        builder.add_chunk(rows)
+
+
+def build_cube(start_day, days, cell_km, chunk_size):
+    # Returns (series keys, demand, supply, food type names, rows read);
+    # demand/supply are float32 arrays of shape (series, days)
+    food_types = {}
+    demand = CubeBuilder(start_day, days, cell_km, food_types)
+    supply = CubeBuilder(start_day, days, cell_km, food_types)
+    since = datetime.combine(start_day, datetime.min.time())
+    _stream(_demand_statement(since), demand, chunk_size)
+    _stream(_supply_statement(since), supply, chunk_size)
+
+    demand_keys, demand_totals = demand.result()
+    supply_keys, supply_totals = supply.result()
+    series_keys = np.union1d(demand_keys >> _DAY_BITS, supply_keys >> _DAY_BITS)
+
+    cubes = []
+    for keys, totals in ((demand_keys, demand_totals), (supply_keys, supply_totals)):
+        cube = np.zeros((len(series_keys), days), dtype=np.float32)
+        cube[np.searchsorted(series_keys, keys >> _DAY_BITS), keys & ((1 << _DAY_BITS) - 1)] = totals
+        cubes.append(cube)
+
+    names = [None] * len(food_types)
+    for name, type_id in food_types.items():
+        names[type_id] = name
+    return series_keys, cubes[0], cubes[1], names, demand.rows + supply.rows
+
+
+# ------------------------------------------------------------
+# Seasonal model
+# ------------------------------------------------------------
+def fit_forecast(history, first_weekday, horizon):
+    # history: (series, days) daily totals, day 0 falling on first_weekday
+    # (Monday = 0). Returns (series, horizon) forecasts for the days after.
+    series, days = history.shape
+    weekday = (first_weekday + np.arange(days)) % 7
+    mean = history.mean(axis=1)
+    safe_mean = np.where(mean > 0, mean, 1.0)
+
+    profile = np.ones((series, 7))
+    for w in range(7):
+        on_day = weekday == w
+        if on_day.any():
+            profile[:, w] = history[:, on_day].mean(axis=1) / safe_mean
+    weeks = days / 7
+    profile = 1 + (profile - 1) * (weeks / (weeks + PROFILE_SHRINK_WEEKS))
+    profile[mean <= 0] = 1.0
+
+    deseasonalized = history / np.where(profile[:, weekday] > 0, profile[:, weekday], 1.0)
+    level = deseasonalized[:, 0].astype(np.float64)
+    for d in range(1, days):
+        level = LEVEL_ALPHA * deseasonalized[:, d] + (1 - LEVEL_ALPHA) * level
+
+    future = (first_weekday + days + np.arange(horizon)) % 7
+    return (level[:, None] * profile[:, future]).astype(np.float32)
+
+
+def backtest(history, first_weekday):
+    # Mean absolute error over the last BACKTEST_DAYS of history when fitted
+    # on the days before, next to the seasonal naive forecast (same day
+    # last week); None while there are under three weeks of history
+    days = history.shape[1]
+    if days < BACKTEST_DAYS + 14 or not history.size:
+        return None
+    train, actual = history[:, :-BACKTEST_DAYS], history[:, -BACKTEST_DAYS:]
+    predicted = fit_forecast(train, first_weekday, BACKTEST_DAYS)
+    naive = train[:, -7:][:, :BACKTEST_DAYS]
+    return {
+        "days": BACKTEST_DAYS,
+        "mae": round(float(np.abs(predicted - actual).mean()), 4),
+        "seasonal_naive_mae": round(float(np.abs(naive - actual).mean()), 4),
+    }
+
+
+# ------------------------------------------------------------
+# Offline job: cube -> forecast -> result file
+# ------------------------------------------------------------
+def run_forecast(directory, history_days=56, horizon_days=7, cell_km=5.0, chunk_size=50000, today=None):
+    if cell_km < MIN_CELL_KM:
+        raise ValueError(f"cell_km must be at least {MIN_CELL_KM}")
+    if history_days >= 1 << _DAY_BITS:
+        raise ValueError(f"history_days must be under {1 << _DAY_BITS}")
+    started = time.perf_counter()
+    today = today or date.today()
+    start_day = today - timedelta(days=history_days)
+
+    series_keys, demand, supply, food_types, rows = build_cube(start_day, history_days, cell_km, chunk_size)
+    first_weekday = start_day.weekday()
+    demand_forecast = fit_forecast(demand, first_weekday, horizon_days)
+    supply_forecast = fit_forecast(supply, first_weekday, horizon_days)
+
+    cells = series_keys >> _TYPE_BITS
+    records = np.empty(len(series_keys) * horizon_days, dtype=RECORD_DTYPE)
+    records["lat_idx"] = np.repeat((cells >> _LON_BITS) - _LAT_OFFSET, horizon_days)
+    records["lon_idx"] = np.repeat((cells & ((1 << _LON_BITS) - 1)) - _LON_OFFSET, horizon_days)
+    records["food_type"] = np.repeat(series_keys & ((1 << _TYPE_BITS) - 1), horizon_days)
+    records["day"] = np.tile(np.arange(horizon_days) + (today - date(1970, 1, 1)).days, len(series_keys))
+    records["demand"] = demand_forecast.ravel()
+    records["supply"] = supply_forecast.ravel()
+    records["shortfall"] = np.maximum(records["demand"] - records["supply"], 0)
+    # Largest shortfall first: an unfiltered top-N read is a slice
+    records = records[np.argsort(-records["shortfall"], kind="stable")]
+
+    meta = {
+        "generated_at": _utcnow().isoformat(timespec="seconds"),
+        "first_day": today.isoformat(),
+        "horizon_days": horizon_days,
+        "history_days": history_days,
+        "cell_km": cell_km,
+        "food_types": food_types,
+        "series": int(len(series_keys)),
+        "rows_read": rows,
+        "backtest": {"demand": backtest(demand, first_weekday), "supply": backtest(supply, first_weekday)},
+    }
+    path = write_result(directory, records, meta)
+    stats = {
+        **{k: meta[k] for k in ("generated_at", "series", "rows_read", "backtest")},
+        "records": int(len(records)),
+        "file": path,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("forecast: %s", stats)
+    return stats
+
+
+def write_result(directory, records, meta):
+    # Each run writes a new .npy next to the previous one, then atomically
+    # points forecast.json at it; readers that still have the old file
+    # mapped keep a valid mapping, and older files are removed
+    os.makedirs(directory, exist_ok=True)
+    name = f"forecast-{_utcnow():%Y%m%dT%H%M%S%f}.npy"
+    np.save(os.path.join(directory, name), records)
+    meta = {**meta, "records_file": name}
+    tmp = os.path.join(directory, META_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, META_FILE))
+    for old in os.listdir(directory):
+        if old.startswith("forecast-") and old.endswith(".npy") and old != name:
+            os.remove(os.path.join(directory, old))
+    return os.path.join(directory, name)
+
+
+# ------------------------------------------------------------
+# Read side: the /forecast endpoint
+# ------------------------------------------------------------
+class ForecastStore:
+    # Memory-maps the latest result file and reloads it when forecast.json
+    # changes; queries are numpy masks over the mapping, never a recompute
+
+    def __init__(self):
+        self.directory = None
+        self._loaded = (None, None, None)  # (meta mtime, meta, records)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config.get("FORECAST_DIR", "forecast")
+        self._loaded = (None, None, None)
+        app.extensions["forecast"] = self
+
+    def load(self):
+        # (meta, records) or (None, None) when no forecast was written yet
+        meta_path = os.path.join(self.directory, META_FILE)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return None, None
+        with self._lock:
+            if self._loaded[0] == mtime:
+                return self._loaded[1], self._loaded[2]
+            with open(meta_path) as f:
+                meta = json.load(f)
+            records = np.load(os.path.join(self.directory, meta["records_file"]), mmap_mode="r")
+            self._loaded = (mtime, meta, records)
+            return meta, records
+
+    def shortfalls(self, meta, records, food_type=None, lat=None, lon=None, radius_km=None, days=None,
+                   min_shortfall=0.0, limit=50):
+        mask = records["shortfall"] > min_shortfall
+        if food_type is not None:
+            names = meta["food_types"]
+            key = _type_key(food_type)
+            if key not in names:
+                return []
+            mask &= records["food_type"] == names.index(key)
+        if days is not None:
+            first = (date.fromisoformat(meta["first_day"]) - date(1970, 1, 1)).days
+            mask &= records["day"] < first + days
+        cell_deg = meta["cell_km"] / KM_PER_DEGREE
+        if lat is not None:
+            centre_lat = np.radians((records["lat_idx"] + 0.5) * cell_deg)
+            centre_lon = np.radians((records["lon_idx"] + 0.5) * cell_deg)
+            dlat = centre_lat - np.radians(lat)
+            dlon = centre_lon - np.radians(lon)
+            a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat)) * np.cos(centre_lat) * np.sin(dlon / 2) ** 2
+            mask &= 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0))) <= radius_km
+
+        # Records are sorted by shortfall, so the first matches are the top
+        hits = records[np.flatnonzero(mask)[:limit]]
+        return [
+            {
+                "cell": {"lat": round((r["lat_idx"] + 0.5) * cell_deg, 5),
+                         "long": round((r["lon_idx"] + 0.5) * cell_deg, 5)},
+                "food_type": meta["food_types"][r["food_type"]],
+                "date": date.fromordinal(date(1970, 1, 1).toordinal() + int(r["day"])).isoformat(),
+                "predicted_demand": round(float(r["demand"]), 2),
+                "predicted_supply": round(float(r["supply"]), 2),
+                "shortfall": round(float(r["shortfall"]), 2),
+            }
+            for r in hits
+        ]
+
+
+forecast_store = ForecastStore()
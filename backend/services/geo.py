@@ -0,0 +1,128 @@
+import math
+
+from sqlalchemy import select
+
+from models import db, Request, User
+
+EARTH_RADIUS_KM = 6371.0088
+
+# k-nearest searches start small and double the search radius until enough
+# candidates are found, so dense areas never pull more than a few boxes' worth
+# of rows and sparse areas still find their nearest requests.
+START_RADIUS_KM = 2.0
+MAX_RADIUS_KM = 500.0
+DEFAULT_LIMIT = 50
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    # Returns (min_lat, max_lat, min_lon, max_lon). Longitude bounds are None
+    # when the box touches a pole or wraps the antimeridian, in which case
+    # only the latitude range can be used as a prefilter.
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, None, None
+
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def pending_requests_in_box_statement(lat, lon, radius_km):
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+
+    # Range scan on ix_users_location, then ix_requests_receiver_id for the join
+    stmt = (
+        select(
+            Request.request_id,
+            Request.receiver_id,
+            Request.food_type,
+            Request.quantity,
+            Request.urgency_level,
+            User.location_lat,
+            User.location_long,
+        )
+        .join(User, User.user_id == Request.receiver_id)
+        .where(
+            Request.status == "pending",
+            User.location_lat.between(min_lat, max_lat),
+        )
+    )
+    if min_lon is not None:
+        stmt = stmt.where(User.location_long.between(min_lon, max_lon))
+    return stmt
+
+
+def within_radius(rows, lat, lon, radius_km):
+    matches = []
+    for row in rows:
+        distance = haversine_km(lat, lon, row.location_lat, row.location_long)
+        if distance <= radius_km:
+            matches.append((distance, row))
+    return matches
+
+
+def search_radii(radius_km=None, limit=None):
+    # Yields the radii to try, in order, as (radius, max_radius, limit). With
+    # only a radius every request inside it is wanted; with a limit the k
+    # nearest (optionally still bounded by the radius), starting small and
+    # doubling.
+    if radius_km is None and limit is None:
+        limit = DEFAULT_LIMIT
+
+    max_radius = radius_km if radius_km is not None else MAX_RADIUS_KM
+    radius = max_radius if limit is None else min(START_RADIUS_KM, max_radius)
+    while True:
+        yield radius, max_radius, limit
+        if radius >= max_radius:
+            return
+        radius = min(radius * 2, max_radius)
+
+
+def is_complete(matches, radius, max_radius, limit):
+    # Anything outside the current radius is farther than everything inside
+    # it, so once we have k matches the k nearest are final.
+    return limit is None or len(matches) >= limit or radius >= max_radius
+
+
+def format_nearby(matches, limit):
+    matches.sort(key=lambda m: m[0])
+    if limit is not None:
+        matches = matches[:limit]
+
+    return [
+        {
+            "request_id": row.request_id,
+            "receiver_id": row.receiver_id,
+            "food_type": row.food_type,
+            "quantity": row.quantity,
+            "urgency_level": row.urgency_level,
+            "distance_km": round(distance, 3),
+        }
+        for distance, row in matches
+    ]
+
+
+def find_nearby_requests(lat, lon, radius_km=None, limit=None):
+    # Pending requests ordered by distance from (lat, lon)
+    for radius, max_radius, limit in search_radii(radius_km, limit):
+        rows = db.session.execute(pending_requests_in_box_statement(lat, lon, radius))
+        matches = within_radius(rows, lat, lon, radius)
+        if is_complete(matches, radius, max_radius, limit):
+            break
+    return format_nearby(matches, limit)
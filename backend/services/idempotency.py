@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import Response, current_app, g, jsonify, request
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+from services.cache import _MISSING, LocalCacheBackend
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Non-JSON bodies (CSV uploads) are hashed chunk by chunk and kept for the
+# view in a spool that only goes to disk past SPOOL_MAX_BYTES
+BODY_CHUNK_BYTES = 64 * 1024
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def _utcnow():
+    # created_at holds naive UTC like the other tables
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def request_fingerprint():
+    # Method, path and body; JSON bodies are compared by value so a client
+    # that re-serializes its payload with another key order still matches
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    body = request.get_json(silent=True)
+    if body is not None:
+        digest.update(json.dumps(body, sort_keys=True, separators=(",", ":")).encode())
+        return digest.hexdigest()
+
+    # Reading the body drains request.stream; the view gets the spooled
+    # copy back through request_body()
+    spool = tempfile.SpooledTemporaryFile(SPOOL_MAX_BYTES)
+    for chunk in iter(lambda: request.stream.read(BODY_CHUNK_BYTES), b""):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    g._idempotency_body = spool
+    return digest.hexdigest()
+
+
+def scoped_key(key):
+    # Keys are only unique per client: the stored key also names the caller
+    # (X-User-Id or ?user_id=, else the client address) and the endpoint, so
+    # two clients that happen to pick the same key never share a response.
+    # Hashed to fit the column whatever the lengths involved.
+    caller = request.headers.get("X-User-Id") or request.args.get("user_id")
+    caller = f"user:{caller}" if caller else f"addr:{request.remote_addr}"
+    return hashlib.sha256(f"{request.endpoint}\n{caller}\n{key}".encode()).hexdigest()
+
+
+def request_body():
+    # Binary stream of the raw request body, also after request_fingerprint
+    # has read it
+    spool = g.pop("_idempotency_body", None)
+    return spool if spool is not None else request.stream
+
+
+class IdempotencyStore:
+    # Responses of write requests that carried an Idempotency-Key. The
+    # idempotency_keys table is the source of truth (shared by every
+    # worker); finished responses are also kept in an in-process LRU, so
+    # most replays are answered without a query. A replay never reaches the
+    # view, so the domain tables are not touched.
+
+    def __init__(self):
+        self.ttl = timedelta(hours=24)
+        self.lock_timeout = timedelta(seconds=60)
+        self.recent = LocalCacheBackend()
+        self.replays = 0
+
+    def init_app(self, app):
+        self.ttl = timedelta(seconds=app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400))
+        self.lock_timeout = timedelta(seconds=app.config.get("IDEMPOTENCY_LOCK_SECONDS", 60))
+        self.recent = LocalCacheBackend(app.config.get("IDEMPOTENCY_CACHE_SIZE", 10000))
+        app.extensions["idempotency"] = self
+
+    def _replay(self, stored):
+        status_code, content_type, body = stored
+        self.replays += 1
+        return Response(body, status=status_code, content_type=content_type, headers={REPLAYED_HEADER: "true"})
+
+    def _answer(self, fingerprint, stored_fingerprint, stored):
+        if stored_fingerprint != fingerprint:
+            return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+        if stored[0] is None:
+            return jsonify({"error": f"A request with this {HEADER} is still being processed"}), 409, \
+                {"Retry-After": "1"}
+        return self._replay(stored)
+
+    def _claim(self, key, fingerprint, now):
+        # Returns None once this request owns the key, or the response to
+        # send instead (the stored one, or an error)
+        table = IdempotencyKey.__table__
+        row = db.session.execute(
+            select(table.c.fingerprint, table.c.status_code, table.c.content_type, table.c.response_body,
+                   table.c.created_at)
+            .where(table.c.key == key)
+        ).first()
+
+        if row is None:
+            try:
+                db.session.execute(table.insert().values(key=key, fingerprint=fingerprint, created_at=now))
+                db.session.commit()
+                return None
+            except IntegrityError:
+                # Another worker claimed it between the select and the insert
+                db.session.rollback()
+                return self._answer(fingerprint, fingerprint, (None, None, None))
+
+        stale = row.created_at < now - self.ttl
+        abandoned = row.status_code is None and row.created_at < now - self.lock_timeout
+        if not (stale or abandoned):
+            stored = (row.status_code, row.content_type, row.response_body)
+            if row.status_code is not None and row.fingerprint == fingerprint:
+                self._remember(key, row.fingerprint, stored, row.created_at, now)
+            return self._answer(fingerprint, row.fingerprint, stored)
+
+        # Expired, or its first request died before storing a response; the
+        # created_at guard makes sure only one retry takes it over
+        taken = db.session.execute(
+            update(table)
+            .where(table.c.key == key, table.c.created_at == row.created_at)
+            .values(fingerprint=fingerprint, status_code=None, content_type=None, response_body=None,
+                    created_at=now)
+        ).rowcount
+        db.session.commit()
+        return None if taken else self._answer(fingerprint, fingerprint, (None, None, None))
+
+    def _remember(self, key, fingerprint, stored, created_at, now):
+        remaining = (created_at + self.ttl - now).total_seconds()
+        if remaining > 0:
+            self.recent.set(key, (fingerprint, stored), ttl=remaining)
+
+    def _store(self, key, fingerprint, response, now):
+        # Whatever the view left uncommitted is discarded first (the request
+        # teardown would do the same); server errors free the key for a retry
+        db.session.rollback()
+        table = IdempotencyKey.__table__
+        if response is None or response.status_code >= 500:
+            db.session.execute(delete(table).where(table.c.key == key))
+            db.session.commit()
+            return
+        stored = (response.status_code, response.content_type, response.get_data())
+        db.session.execute(
+            update(table)
+            .where(table.c.key == key)
+            .values(status_code=stored[0], content_type=stored[1], response_body=stored[2])
+        )
+        db.session.commit()
+        self._remember(key, fingerprint, stored, now, now)
+
+    def handle(self, view, args, kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+
+        stored_key = scoped_key(key)
+        fingerprint = request_fingerprint()
+        recent = self.recent.get(stored_key)
+        if recent is not _MISSING:
+            return self._answer(fingerprint, *recent)
+
+        now = _utcnow()
+        answer = self._claim(stored_key, fingerprint, now)
+        if answer is not None:
+            return answer
+
+        response = None
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        finally:
+            try:
+                self._store(stored_key, fingerprint, response, now)
+            except Exception:
+                # The key stays claimed until IDEMPOTENCY_LOCK_SECONDS pass
+                logger.exception("failed to store the response for %s %s", HEADER, key)
+        return response
+
+    def purge_expired(self, batch_size=1000, now=None):
+        # Deletes keys older than the TTL, batch_size rows per commit
+        table = IdempotencyKey.__table__
+        cutoff = (now or _utcnow()) - self.ttl
+        total = 0
+        while True:
+            batch = select(table.c.key).where(table.c.created_at < cutoff).limit(batch_size)
+            count = db.session.execute(delete(table).where(table.c.key.in_(batch))).rowcount
+            db.session.commit()
+            total += count
+            if count < batch_size:
+                return total
+
+    def stats(self):
+        return {"replays": self.replays, "cached": len(self.recent)}
+
+
+idempotency = IdempotencyStore()
+
+
+def idempotent(view):
+    # View decorator for create endpoints: a request carrying an
+    # Idempotency-Key runs once; retries with the same key and body get the
+    # first response back, with the same key and another body a 422
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return idempotency.handle(view, args, kwargs)
+    return wrapper
@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+slow_query_logger = logging.getLogger("frns.slow_queries")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# [queries, seconds] for the async request being served, outside any Flask
+# request context (see RequestMetrics.track)
+_async_sql = ContextVar("metrics_async_sql", default=None)
+
+
+class _EndpointStats:
+    __slots__ = ("buckets", "latency_sum", "requests", "statuses", "sql_queries", "sql_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.statuses = {}
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+
+
+class RequestMetrics:
+    # Per-endpoint latency histograms plus SQL statement counts and time,
+    # attributed to the request that issued them.
+
+    def __init__(self):
+        self.slow_query_seconds = 0
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engine):
+        self.slow_query_seconds = app.config.get("SLOW_QUERY_MS", 0) / 1000
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        self.listen(engine)
+        app.extensions["request_metrics"] = self
+
+    def listen(self, engine):
+        # Also used for the async engine's sync_engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    # -- request hooks ---------------------------------------------------
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql_queries = 0
+        g._metrics_sql_seconds = 0.0
+
+    def _after_request(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        self.observe(
+            (request.blueprint or "", request.endpoint or "<unmatched>", request.method),
+            time.perf_counter() - start,
+            g.pop("_metrics_status", 500),
+            g.pop("_metrics_sql_queries", 0),
+            g.pop("_metrics_sql_seconds", 0.0),
+        )
+
+    def observe(self, key, elapsed, status, sql_queries=0, sql_seconds=0.0):
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = _EndpointStats()
+            stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            stats.latency_sum += elapsed
+            stats.requests += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.sql_queries += sql_queries
+            stats.sql_seconds += sql_seconds
+
+    @contextmanager
+    def track(self, key):
+        # For requests served outside Flask (asgi.py). Yields a dict whose
+        # "status" the caller fills in; SQL issued inside the block is
+        # attributed to key.
+        start = time.perf_counter()
+        sql = [0, 0.0]
+        token = _async_sql.set(sql)
+        outcome = {"status": 500}
+        try:
+            yield outcome
+        finally:
+            _async_sql.reset(token)
+            self.observe(key, time.perf_counter() - start, outcome["status"], sql[0], sql[1])
+
+    # -- SQL hooks -------------------------------------------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_metrics_query_start"].pop()
+
+        if has_request_context() and "_metrics_start" in g:
+            g._metrics_sql_queries += 1
+            g._metrics_sql_seconds += elapsed
+        elif (sql := _async_sql.get()) is not None:
+            sql[0] += 1
+            sql[1] += elapsed
+
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            # Statement text only (placeholders intact), never bound values
+            slow_query_logger.warning(
+                "slow query %.1f ms [%s] %s%s",
+                elapsed * 1000,
+                request.endpoint if has_request_context() else "-",
+                " ".join(statement.split()),
+                " [parameters redacted]" if parameters else "",
+            )
+
+    def _handle_error(self, context):
+        # after_cursor_execute never fires for a failed statement
+        if context.connection is not None:
+            starts = context.connection.info.get("_metrics_query_start")
+            if starts:
+                starts.pop()
+
+    # -- export ----------------------------------------------------------
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: (list(s.buckets), s.latency_sum, s.requests, dict(s.statuses), s.sql_queries, s.sql_seconds)
+                for key, s in self._endpoints.items()
+            }
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus(metrics, extra=()):
+    # extra: iterable of (name, type, help, value) single-sample metrics
+    lines = []
+    snapshot = metrics.snapshot()
+
+    lines.append("# HELP http_request_duration_seconds Request latency by endpoint.")
+    lines.append("# TYPE http_request_duration_seconds histogram")
+    for (blueprint, endpoint, method), (buckets, total, count, _, _, _) in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += n
+            lines.append("http_request_duration_seconds_bucket" + _labels(
+                blueprint=blueprint, endpoint=endpoint, method=method, le=bound) + f" {cumulative}")
+        base = _labels(blueprint=blueprint, endpoint=endpoint, method=method)
+        lines.append(f"http_request_duration_seconds_sum{base} {total:.6f}")
+        lines.append(f"http_request_duration_seconds_count{base} {count}")
+
+    lines.append("# HELP http_requests_total Requests by endpoint and status code.")
+    lines.append("# TYPE http_requests_total counter")
+    for (blueprint, endpoint, method), (_, _, _, statuses, _, _) in sorted(snapshot.items()):
+        for status, n in sorted(statuses.items()):
+            lines.append("http_requests_total" + _labels(
+                blueprint=blueprint, endpoint=endpoint, method=method, status=status) + f" {n}")
+
+    lines.append("# HELP db_queries_total SQL statements executed while serving requests.")
+    lines.append("# TYPE db_queries_total counter")
+    for (blueprint, endpoint, method), (_, _, _, _, queries, _) in sorted(snapshot.items()):
+        lines.append("db_queries_total" + _labels(
+            blueprint=blueprint, endpoint=endpoint, method=method) + f" {queries}")
+
+    lines.append("# HELP db_query_seconds_total Time spent in SQL while serving requests.")
+    lines.append("# TYPE db_query_seconds_total counter")
+    for (blueprint, endpoint, method), (_, _, _, _, _, seconds) in sorted(snapshot.items()):
+        lines.append("db_query_seconds_total" + _labels(
+            blueprint=blueprint, endpoint=endpoint, method=method) + f" {seconds:.6f}")
+
+    for name, kind, help_text, value in extra:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
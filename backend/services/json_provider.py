@@ -0,0 +1,61 @@
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # optional, see JSON_PROVIDER in config.py
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Drop-in for Flask's provider: same sorted keys, compact output (2-space
+    # indent in debug) and trailing newline, but encoded by orjson straight
+    # to bytes. datetime/date/UUID/dataclasses are encoded natively (ISO
+    # 8601); anything orjson cannot handle (Decimal, huge ints, custom
+    # arguments) goes through the stdlib provider.
+
+    def _dumpb(self, obj, **kwargs):
+        # Output is always compact (or indented), whatever separators say
+        kwargs.pop("separators", None)
+        indent = kwargs.get("indent")
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if indent not in (None, 2) or set(kwargs) - {"indent", "sort_keys"}:
+            return self._stdlib(obj, kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            return self._stdlib(obj, kwargs)
+
+    def _stdlib(self, obj, kwargs):
+        if not kwargs.get("indent"):
+            kwargs["separators"] = (",", ":")
+        return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self._dumpb(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if self.compact is False or (self.compact is None and self._app.debug) else None
+        return self._app.response_class(self._dumpb(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    if app.config.get("JSON_PROVIDER") != "orjson":
+        return
+    if orjson is None:
+        logger.warning("JSON_PROVIDER=orjson but orjson is not installed; using the stdlib provider")
+        return
+    app.json = OrjsonProvider(app)
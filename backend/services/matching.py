@@ -0,0 +1,408 @@
+import time
+from datetime import date, datetime
+
+import numpy as np
+from sqlalchemy import Integer, bindparam, case, column, insert, text, update
+
+from models import db, FoodItem, Request, Transaction, User
+from services.geo import EARTH_RADIUS_KM
+from services.events import make_event, record
+from services.stats import StatsDelta
+
+# Matching only pairs items and requests of the same (normalised) food type
+# that are within MAX_DISTANCE_KM of each other. Every request keeps its
+# TOP_CANDIDATES best-scoring items; allocation then walks all kept pairs from
+# best to worst score, for up to MAX_ROUNDS rounds over what is left.
+MAX_DISTANCE_KM = 15.0
+TOP_CANDIDATES = 8
+REQUEST_CHUNK = 2048
+MAX_ROUNDS = 3
+NEIGHBOURHOOD_TARGET = 512
+MIN_CELL_KM = 0.5
+
+# Allocations are written WRITE_CHUNK rows per statement
+WRITE_CHUNK = 5000
+
+URGENCY_SCORES = {"high": 1.0, "medium": 0.5, "low": 0.0}
+
+WEIGHT_DISTANCE = 0.4
+WEIGHT_URGENCY = 0.3
+WEIGHT_DEADLINE = 0.2
+WEIGHT_EXPIRY = 0.1
+
+
+def _type_key(value):
+    return (value or "").strip().lower()
+
+
+def _load_foods(today, lock=False):
+    query = (
+        db.session.query(
+            FoodItem.food_id,
+            FoodItem.donor_id,
+            FoodItem.name,
+            FoodItem.quantity,
+            FoodItem.expiry_date,
+            User.location_lat,
+            User.location_long,
+        )
+        .join(User, User.user_id == FoodItem.donor_id)
+        .filter(
+            FoodItem.status == "available",
+            FoodItem.quantity > 0,
+            FoodItem.expiry_date >= today,
+            User.location_lat.isnot(None),
+            User.location_long.isnot(None),
+        )
+    )
+    if lock:
+        # Rows another claim or batch run is writing are left for next time
+        query = query.with_for_update(of=FoodItem, skip_locked=True)
+    return query.all()
+
+
+def _load_requests(now, lock=False):
+    query = (
+        db.session.query(
+            Request.request_id,
+            Request.receiver_id,
+            Request.food_type,
+            Request.quantity,
+            Request.urgency_level,
+            Request.deadline,
+            User.location_lat,
+            User.location_long,
+        )
+        .join(User, User.user_id == Request.receiver_id)
+        .filter(
+            Request.status == "pending",
+            Request.quantity > 0,
+            (Request.deadline.is_(None)) | (Request.deadline >= now),
+            User.location_lat.isnot(None),
+            User.location_long.isnot(None),
+        )
+    )
+    if lock:
+        query = query.with_for_update(of=Request, skip_locked=True)
+    return query.all()
+
+
+def _cell_keys(type_codes, lat, lon, lat_cell, lon_cell):
+    return list(zip(
+        type_codes.tolist(),
+        np.floor(lat / lat_cell).astype(np.int64).tolist(),
+        np.floor(lon / lon_cell).astype(np.int64).tolist(),
+    ))
+
+
+def _group_indices(keyed_indices):
+    groups = {}
+    for key, index in keyed_indices:
+        groups.setdefault(key, []).append(index)
+    return {key: np.asarray(indices, dtype=np.int64) for key, indices in groups.items()}
+
+
+def _distance_matrix(y1, x1, y2, x2):
+    # Planar distances in km between points already projected around the
+    # same reference latitude; accurate to well under 1% at matching ranges.
+    dy = y2[None, :] - y1[:, None]
+    dx = x2[None, :] - x1[:, None]
+    return np.sqrt(dy * dy + dx * dx)
+
+
+class CandidateScorer:
+    # Holds the column arrays for one matching run. Candidates are pruned
+    # twice: by food type plus a grid (only the 3x3 neighbourhood of a
+    # request's cell is scored), then to the top_k scores per request.
+
+    def __init__(self, foods, requests, now, max_distance_km=MAX_DISTANCE_KM):
+        self.max_distance_km = max_distance_km
+
+        type_codes = {}
+        f_type = np.array([type_codes.setdefault(_type_key(f.name), len(type_codes)) for f in foods])
+        r_type = np.array([type_codes.get(_type_key(r.food_type), -1) for r in requests])
+
+        f_lat = np.array([f.location_lat for f in foods], dtype=float)
+        f_lon = np.array([f.location_long for f in foods], dtype=float)
+        r_lat = np.array([r.location_lat for r in requests], dtype=float)
+        r_lon = np.array([r.location_long for r in requests], dtype=float)
+
+        today = now.date()
+        f_expiry_days = np.array([(f.expiry_date - today).days for f in foods], dtype=float)
+        r_deadline_days = np.array(
+            [(r.deadline - now).total_seconds() / 86400 if r.deadline else np.inf for r in requests]
+        )
+        r_urgency = np.array([URGENCY_SCORES.get(_type_key(r.urgency_level), 0.0) for r in requests])
+
+        # Per-request and per-item parts of the score don't depend on the pair
+        self.r_base = (
+            WEIGHT_URGENCY * r_urgency + WEIGHT_DEADLINE / (1.0 + np.maximum(r_deadline_days, 0.0))
+        ).astype(np.float32)
+        self.f_base = (WEIGHT_EXPIRY / (1.0 + np.maximum(f_expiry_days, 0.0))).astype(np.float32)
+
+        # Grid cells are max_distance_km wide, shrunk per food type where
+        # items are dense so a 3x3 neighbourhood holds ~NEIGHBOURHOOD_TARGET
+        # items; top_k never needs more than the nearest few hundred.
+        lat_span = max(f_lat.max(), r_lat.max()) - min(f_lat.min(), r_lat.min())
+        lon_span = max(f_lon.max(), r_lon.max()) - min(f_lon.min(), r_lon.min())
+        mid_lat = np.radians((max(f_lat.max(), r_lat.max()) + min(f_lat.min(), r_lat.min())) / 2)
+        area_km2 = max(1.0, np.radians(lat_span) * EARTH_RADIUS_KM * np.radians(lon_span) * EARTH_RADIUS_KM * np.cos(mid_lat))
+        per_type = np.bincount(f_type, minlength=len(type_codes)).astype(float)
+        cell_km = np.sqrt(NEIGHBOURHOOD_TARGET * area_km2 / (9 * np.maximum(per_type, 1.0)))
+        cell_km = np.clip(cell_km, MIN_CELL_KM, max_distance_km)
+
+        self.lat_cell = np.degrees(cell_km / EARTH_RADIUS_KM)
+        max_abs_lat = min(89.0, float(max(np.abs(f_lat).max(), np.abs(r_lat).max())))
+        lon_cell = self.lat_cell / max(np.cos(np.radians(max_abs_lat)), 0.01)
+
+        self.food_keys = _cell_keys(f_type, f_lat, f_lon, self.lat_cell[f_type], lon_cell[f_type])
+        r_known = np.maximum(r_type, 0)
+        self.request_keys = _cell_keys(r_type, r_lat, r_lon, self.lat_cell[r_known], lon_cell[r_known])
+
+        self.km_per_degree = np.float32(np.radians(1.0) * EARTH_RADIUS_KM)
+        self.f_y = (f_lat * self.km_per_degree).astype(np.float32)
+        self.r_y = (r_lat * self.km_per_degree).astype(np.float32)
+        self.f_lon = f_lon.astype(np.float32)
+        self.r_lon = r_lon.astype(np.float32)
+
+    def score(self, food_active, request_active, top_k=TOP_CANDIDATES):
+        # Returns (request_idx, food_idx, score) arrays for the kept pairs,
+        # considering only rows flagged in the two boolean masks.
+        food_groups = _group_indices(
+            (key, i) for i, key in enumerate(self.food_keys) if food_active[i]
+        )
+        request_groups = _group_indices(
+            (key, i) for i, key in enumerate(self.request_keys) if request_active[i] and key[0] >= 0
+        )
+
+        out_r, out_f, out_s = [], [], []
+        for (code, ci, cj), r_idx in request_groups.items():
+            neighbours = [
+                food_groups[key]
+                for key in ((code, ci + di, cj + dj) for di in (-1, 0, 1) for dj in (-1, 0, 1))
+                if key in food_groups
+            ]
+            if not neighbours:
+                continue
+            f_idx = np.concatenate(neighbours)
+
+            # Project the neighbourhood around this cell's latitude
+            x_scale = self.km_per_degree * np.float32(np.cos(np.radians((ci + 0.5) * self.lat_cell[code])))
+            f_x = self.f_lon[f_idx] * x_scale
+
+            for start in range(0, len(r_idx), REQUEST_CHUNK):
+                rows = r_idx[start:start + REQUEST_CHUNK]
+                dist = _distance_matrix(self.r_y[rows], self.r_lon[rows] * x_scale, self.f_y[f_idx], f_x)
+                score = np.float32(WEIGHT_DISTANCE) * (1 - dist / np.float32(self.max_distance_km))
+                score += self.r_base[rows][:, None]
+                score += self.f_base[f_idx][None, :]
+                score[dist > self.max_distance_km] = -np.inf
+
+                k = min(top_k, len(f_idx))
+                if k < len(f_idx):
+                    best = np.argpartition(-score, k - 1, axis=1)[:, :k]
+                else:
+                    best = np.broadcast_to(np.arange(len(f_idx)), (len(rows), k))
+                best_scores = np.take_along_axis(score, best, axis=1)
+
+                keep = np.isfinite(best_scores)
+                out_r.append(np.repeat(rows, k).reshape(len(rows), k)[keep])
+                out_f.append(f_idx[best][keep])
+                out_s.append(best_scores[keep])
+
+        if not out_r:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+        return np.concatenate(out_r), np.concatenate(out_f), np.concatenate(out_s)
+
+
+def allocate(r_idx, f_idx, scores, food_left, request_left):
+    # Greedy allocation over candidate pairs, best score first. Quantities can
+    # be split: an item may serve several requests and a request may be
+    # filled from several items. food_left/request_left are updated in place.
+    order = np.argsort(-scores, kind="stable")
+    food_qty = food_left.tolist()
+    request_qty = request_left.tolist()
+
+    assignments = []
+    for r, f in zip(r_idx[order].tolist(), f_idx[order].tolist()):
+        qty = min(food_qty[f], request_qty[r])
+        if qty <= 0:
+            continue
+        food_qty[f] -= qty
+        request_qty[r] -= qty
+        assignments.append((r, f, qty))
+
+    food_left[:] = food_qty
+    request_left[:] = request_qty
+    return assignments
+
+
+def match(foods, requests, now, max_distance_km=MAX_DISTANCE_KM, rounds=MAX_ROUNDS):
+    # Requests whose top candidates were taken by better-scoring pairs get
+    # another chance in the next round, against whatever is left.
+    food_left = np.array([f.quantity for f in foods], dtype=np.int64)
+    request_left = np.array([r.quantity for r in requests], dtype=np.int64)
+    if not foods or not requests:
+        return [], food_left, request_left
+
+    scorer = CandidateScorer(foods, requests, now, max_distance_km=max_distance_km)
+    assignments = []
+    for _ in range(rounds):
+        r_idx, f_idx, scores = scorer.score(food_left > 0, request_left > 0)
+        new = allocate(r_idx, f_idx, scores, food_left, request_left)
+        if not new:
+            break
+        assignments.extend(new)
+
+    return assignments, food_left, request_left
+
+
+def run_batch_match(max_distance_km=MAX_DISTANCE_KM, dry_run=False):
+    started = time.perf_counter()
+    now = datetime.now()
+
+    # A real run locks its candidates until the commit; claims on those
+    # rows wait for it and concurrent runs skip them
+    foods = _load_foods(date.today(), lock=not dry_run)
+    requests = _load_requests(now, lock=not dry_run)
+
+    assignments, food_left, request_left = match(foods, requests, now, max_distance_km=max_distance_km)
+
+    if assignments and not dry_run:
+        assignments, food_left, request_left = _write_allocations(foods, requests, assignments)
+        if assignments:
+            txn_ids = db.session.scalars(
+                insert(Transaction).returning(Transaction.txn_id, sort_by_parameter_order=True),
+                [
+                    {
+                        "donor_id": foods[f].donor_id,
+                        "receiver_id": requests[r].receiver_id,
+                        "food_id": foods[f].food_id,
+                        "request_id": requests[r].request_id,
+                        "quantity": qty,
+                        "status": "initiated",
+                        "created_at": now,
+                    }
+                    for r, f, qty in assignments
+                ],
+            ).all()
+
+            touched_foods = sorted(food_left)
+            stats = StatsDelta()
+            for f in touched_foods:
+                if food_left[f] == 0:
+                    stats.listing_moved(foods[f].donor_id, "available", "pending")
+            stats.apply()
+
+            record(*_match_events(foods, requests, assignments, txn_ids, touched_foods, food_left,
+                                  sorted(request_left), request_left))
+        db.session.commit()
+
+    return {
+        "foods_considered": len(foods),
+        "requests_considered": len(requests),
+        "assignments": len(assignments),
+        "quantity_allocated": sum(qty for _, _, qty in assignments),
+        "requests_fully_served": sum(1 for r in {r for r, _, _ in assignments} if request_left[r] == 0),
+        "committed": bool(assignments) and not dry_run,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _allocate(model, id_column, totals, open_status, closed_status):
+    # quantity tracks what is still unallocated: takes totals[id] off each
+    # row with a relative, guarded UPDATE (still open_status, at least that
+    # much left), so a claim or edit that got in since the load is never
+    # overwritten. Fully allocated rows move to closed_status. Returns
+    # {id: quantity left} for the rows that matched.
+    left_by_id = {}
+    items = sorted(totals.items())
+    for start in range(0, len(items), WRITE_CHUNK):
+        alloc = _id_quantity_rows(items[start:start + WRITE_CHUNK]).cte("alloc")
+        left = model.quantity - alloc.c.qty
+        left_by_id.update(db.session.execute(
+            update(model)
+            .where(id_column == alloc.c.row_id, model.status == open_status, model.quantity >= alloc.c.qty)
+            .values(quantity=left, status=case((left > 0, open_status), else_=closed_status))
+            .returning(id_column, model.quantity)
+            .execution_options(synchronize_session=False)
+        ).all())
+    return left_by_id
+
+
+def _id_quantity_rows(items):
+    # (row_id, qty) pairs as an inline VALUES list. Both are integers we
+    # format ourselves; binding them through values() costs ~10x as much
+    # per row in SQLAlchemy as the UPDATE itself
+    rows = ",".join("(%d, %d)" % (int(row_id), int(qty)) for row_id, qty in items)
+    return text(f"SELECT column1 AS row_id, column2 AS qty FROM (VALUES {rows}) AS alloc_rows") \
+        .columns(column("row_id", Integer), column("qty", Integer))
+
+
+def _totals(assignments, side, rows, id_name):
+    totals = {}
+    for assignment in assignments:
+        row_id = getattr(rows[assignment[side]], id_name)
+        totals[row_id] = totals.get(row_id, 0) + assignment[2]
+    return totals
+
+
+def _write_allocations(foods, requests, assignments):
+    # Draws the assignments down from the items, then from the requests,
+    # dropping any whose row no longer matches. Units taken from an item for
+    # a request that dropped out go back on the item. Returns the surviving
+    # assignments and {index: quantity left} per touched item and request.
+    food_index = {foods[f].food_id: f for _, f, _ in assignments}
+    request_index = {requests[r].request_id: r for r, _, _ in assignments}
+
+    food_left = _allocate(FoodItem, FoodItem.food_id, _totals(assignments, 1, foods, "food_id"),
+                          "available", "pending")
+    assignments = [a for a in assignments if foods[a[1]].food_id in food_left]
+
+    request_left = _allocate(Request, Request.request_id, _totals(assignments, 0, requests, "request_id"),
+                             "pending", "accepted")
+    dropped = [a for a in assignments if requests[a[0]].request_id not in request_left]
+    if dropped:
+        assignments = [a for a in assignments if requests[a[0]].request_id in request_left]
+        returned = _totals(dropped, 1, foods, "food_id")
+        table = FoodItem.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.food_id == bindparam("b_food_id"))
+            .values(quantity=table.c.quantity + bindparam("b_quantity"), status="available"),
+            [{"b_food_id": food_id, "b_quantity": qty} for food_id, qty in returned.items()],
+        )
+        for food_id, qty in returned.items():
+            food_left[food_id] += qty
+
+    return (
+        assignments,
+        {food_index[food_id]: left for food_id, left in food_left.items()},
+        {request_index[request_id]: left for request_id, left in request_left.items()},
+    )
+
+
+def _match_events(foods, requests, assignments, txn_ids, touched_foods, food_left, touched_requests, request_left):
+    # The bulk statements above bypass ORM flush events, so the feed is told
+    # about the new transactions and the rows they drew down explicitly
+    events = [
+        make_event("transaction", "created", txn_id, status="initiated", user_id=foods[f].donor_id,
+                   food_type=foods[f].name, quantity=qty, food_id=foods[f].food_id,
+                   request_id=requests[r].request_id, receiver_id=requests[r].receiver_id,
+                   lat=foods[f].location_lat, long=foods[f].location_long)
+        for txn_id, (r, f, qty) in zip(txn_ids, assignments)
+    ]
+    events.extend(
+        make_event("food", "updated", foods[f].food_id, status="available" if food_left[f] > 0 else "pending",
+                   user_id=foods[f].donor_id, food_type=foods[f].name, quantity=int(food_left[f]),
+                   lat=foods[f].location_lat, long=foods[f].location_long)
+        for f in touched_foods
+    )
+    events.extend(
+        make_event("request", "updated", requests[r].request_id,
+                   status="pending" if request_left[r] > 0 else "accepted",
+                   user_id=requests[r].receiver_id, food_type=requests[r].food_type, quantity=int(request_left[r]),
+                   lat=requests[r].location_lat, long=requests[r].location_long)
+        for r in touched_requests
+    )
+    return events
@@ -0,0 +1,285 @@
+import json
+import logging
+import random
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event as sa_event, false, func, insert, select, true, update
+
+from models import db, FoodItem, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Delivery lags kept for the worker's percentiles
+LAG_SAMPLES = 10000
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ------------------------------------------------------------
+# Writing: outbox rows in the same database transaction
+# ------------------------------------------------------------
+def messages_for(events, now):
+    # Outbox rows for the captured transaction events that notify someone:
+    # new transactions and status changes, one row per donor/receiver
+    rows = []
+    for event in events:
+        kind, action = event["type"].split(".", 1)
+        if kind != "transaction":
+            continue
+        if action != "created" and not (action == "updated" and event.get("previous_status")):
+            continue
+        payload = {
+            "event": event["type"],
+            "txn_id": event["id"],
+            "status": event["status"],
+            "previous_status": event.get("previous_status"),
+            "food_id": event.get("food_id"),
+            "food_type": event["food_type"],
+            "quantity": event["quantity"],
+            "at": now.isoformat(),
+        }
+        for role, recipient_id in (("donor", event["user_id"]), ("receiver", event.get("receiver_id"))):
+            if recipient_id is not None:
+                rows.append({
+                    "recipient_id": recipient_id,
+                    "txn_id": event["id"],
+                    "kind": event["type"],
+                    "payload": {**payload, "role": role},
+                    "available_at": now,
+                    "created_at": now,
+                })
+    return rows
+
+
+class NotificationOutbox:
+    # Turns the transaction events captured for the live feed (ORM flushes
+    # and record() calls) into outbox rows just before the commit, so the
+    # notification commits or rolls back with the change itself and the
+    # request never waits on a delivery
+
+    def __init__(self):
+        self.enabled = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get("OUTBOX_ENABLED", True)
+        if self.enabled:
+            sa_event.listen(db.session, "before_commit", self._before_commit)
+        app.extensions["notification_outbox"] = self
+
+    def _before_commit(self, session):
+        if session.new or session.dirty or session.deleted:
+            # ORM changes are captured on flush; flush now rather than in
+            # the commit so their events are in by the time we look
+            session.flush()
+        events = session.info.get("pending_events")
+        if not events:
+            return
+        rows = messages_for(events, _utcnow())
+        if rows:
+            session.execute(insert(OutboxMessage), rows)
+
+
+notification_outbox = NotificationOutbox()
+
+
+# ------------------------------------------------------------
+# Sinks: where one recipient's batch of notifications goes
+# ------------------------------------------------------------
+class LogSink:
+    name = "log"
+
+    def deliver(self, recipient_id, notifications):
+        logger.info("notify user %s: %s", recipient_id, json.dumps(notifications, default=str))
+
+
+class WebhookSink:
+    # POSTs {"recipient_id", "notifications": [...]} as JSON; anything but
+    # a 2xx answer (or no answer within timeout) is retried later
+    name = "webhook"
+
+    def __init__(self, url, timeout=5.0):
+        if not url:
+            raise ValueError("NOTIFY_SINK=webhook needs NOTIFY_WEBHOOK_URL")
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, recipient_id, notifications):
+        body = json.dumps({"recipient_id": recipient_id, "notifications": notifications}, default=str).encode()
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            if not 200 <= response.status < 300:
+                raise RuntimeError(f"webhook answered {response.status}")
+
+
+class MemorySink:
+    # Local fake for tests and benchmarks: keeps every delivered batch, and
+    # fails deliveries to the recipients in fail_for
+    name = "memory"
+
+    def __init__(self):
+        self.deliveries = []
+        self.fail_for = set()
+
+    def deliver(self, recipient_id, notifications):
+        if recipient_id in self.fail_for:
+            raise RuntimeError(f"recipient {recipient_id} unavailable")
+        self.deliveries.append((recipient_id, notifications))
+
+
+def make_sink(name, config):
+    if name == "log":
+        return LogSink()
+    if name == "webhook":
+        return WebhookSink(config.get("NOTIFY_WEBHOOK_URL"), config.get("NOTIFY_WEBHOOK_TIMEOUT_SECONDS", 5.0))
+    if name == "memory":
+        return MemorySink()
+    raise ValueError(f"unknown notification sink {name!r}; use log, webhook or memory")
+
+
+# ------------------------------------------------------------
+# Draining: the worker behind `flask drain-outbox`
+# ------------------------------------------------------------
+def outbox_backlog(now=None):
+    # Pending/dead row counts and the age of the oldest pending row
+    now = now or _utcnow()
+    pending, oldest = db.session.execute(
+        select(func.count(), func.min(OutboxMessage.created_at)).where(OutboxMessage.dead == false())
+    ).one()
+    dead = db.session.scalar(select(func.count()).where(OutboxMessage.dead == true()))
+    return {
+        "pending": pending,
+        "dead": dead,
+        "oldest_pending_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
+
+
+class OutboxWorker:
+    # Claims up to batch_size due rows with FOR UPDATE SKIP LOCKED (so any
+    # number of workers can drain side by side), delivers them one batch per
+    # recipient and deletes what went through in the same transaction.
+    # Failed batches are rescheduled with backoff and parked as dead after
+    # max_attempts.
+
+    def __init__(self, sink, batch_size=500, max_attempts=8, backoff_seconds=5.0, backoff_max_seconds=3600.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.passes = 0
+        self.started = time.monotonic()
+        self.lags = deque(maxlen=LAG_SAMPLES)  # seconds from commit to delivery
+
+    def backoff(self, attempt):
+        # Doubles per attempt up to the cap, minus up to 50% jitter so
+        # recipients that failed together don't all come back together
+        delay = min(self.backoff_seconds * 2 ** (attempt - 1), self.backoff_max_seconds)
+        return delay * (0.5 + random.random() / 2)
+
+    def drain_once(self, now=None):
+        # One batch; returns how many rows it handled
+        now = now or _utcnow()
+        rows = db.session.execute(
+            select(OutboxMessage.id, OutboxMessage.recipient_id, OutboxMessage.payload,
+                   OutboxMessage.attempts, OutboxMessage.created_at)
+            .where(OutboxMessage.dead == false(), OutboxMessage.available_at <= now)
+            .order_by(OutboxMessage.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            db.session.commit()
+            return 0
+
+        _fill_food_types(rows)
+        by_recipient = {}
+        for row in rows:
+            by_recipient.setdefault(row.recipient_id, []).append(row)
+
+        delivered, failed = [], []
+        for recipient_id, messages in by_recipient.items():
+            try:
+                self.sink.deliver(recipient_id, [row.payload for row in messages])
+            except Exception as exc:
+                logger.warning("delivery to user %s failed: %s", recipient_id, exc)
+                failed.extend((row, repr(exc)) for row in messages)
+                continue
+            delivered.extend(messages)
+
+        if delivered:
+            db.session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_([row.id for row in delivered])))
+            delivered_at = _utcnow()
+            self.lags.extend((delivered_at - row.created_at).total_seconds() for row in delivered)
+        if failed:
+            retries = []
+            for row, error in failed:
+                attempts = row.attempts + 1
+                dead = attempts >= self.max_attempts
+                self.dead += dead
+                self.retried += not dead
+                retries.append({
+                    "id": row.id,
+                    "attempts": attempts,
+                    "available_at": now + timedelta(seconds=self.backoff(attempts)),
+                    "last_error": error[:1000],
+                    "dead": dead,
+                })
+            db.session.execute(update(OutboxMessage), retries)
+        db.session.commit()
+
+        self.delivered += len(delivered)
+        self.passes += 1
+        return len(rows)
+
+    def run(self, loop=False, interval=1.0, report_every=10.0, report=None):
+        # Drains until nothing is due (then, with loop, sleeps `interval`
+        # and starts over), calling report(stats()) every report_every s
+        last_report = time.monotonic()
+        while True:
+            while self.drain_once() == self.batch_size:
+                pass
+            if report and (not loop or time.monotonic() - last_report >= report_every):
+                report(self.stats())
+                last_report = time.monotonic()
+            if not loop:
+                return
+            db.session.remove()
+            time.sleep(interval)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        lags = sorted(self.lags)
+        return {
+            "delivered_total": self.delivered,
+            "retried_total": self.retried,
+            "dead_total": self.dead,
+            "passes": self.passes,
+            "throughput_per_second": round(self.delivered / elapsed, 1) if elapsed else 0.0,
+            "lag_p50_seconds": round(lags[len(lags) // 2], 3) if lags else None,
+            "lag_p95_seconds": round(lags[int(len(lags) * 0.95)], 3) if lags else None,
+            "lag_max_seconds": round(lags[-1], 3) if lags else None,
+            **outbox_backlog(),
+        }
+
+
+def _fill_food_types(rows):
+    # ORM-captured events don't know the food name yet; one IN query for
+    # the batch instead of a lookup per write
+    missing = {row.payload.get("food_id") for row in rows if row.payload.get("food_type") is None}
+    missing.discard(None)
+    if not missing:
+        return
+    names = dict(db.session.execute(
+        select(FoodItem.food_id, FoodItem.name).where(FoodItem.food_id.in_(missing))
+    ).all())
+    for row in rows:
+        if row.payload.get("food_type") is None:
+            row.payload["food_type"] = names.get(row.payload.get("food_id"))
@@ -0,0 +1,93 @@
+from urllib.parse import urlencode
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+STREAM_MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def _stream_rows(query, serialize, fmt):
+    dumps = current_app.json.dumps
+    rows = query.yield_per(STREAM_BATCH_SIZE)
+
+    if fmt == "ndjson":
+        for row in rows:
+            yield dumps(serialize(row)) + "\n"
+        return
+
+    # Chunked JSON array
+    yield "["
+    first = True
+    for row in rows:
+        yield ("" if first else ",") + dumps(serialize(row))
+        first = False
+    yield "]"
+
+
+def parse_page_args(args):
+    # Returns (cursor, limit, stream, error message)
+    try:
+        cursor = int(args["cursor"]) if args.get("cursor") else None
+        limit = int(args.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return None, None, None, "cursor and limit must be integers"
+    stream = args.get("stream")
+
+    if limit <= 0 or limit > MAX_PAGE_SIZE:
+        return None, None, None, f"limit must be between 1 and {MAX_PAGE_SIZE}"
+    if stream is not None and stream not in STREAM_MIMETYPES:
+        return None, None, None, "stream must be 'ndjson' or 'json'"
+    return cursor, limit, stream, None
+
+
+def apply_keyset(query, key_column, cursor):
+    # Works for both legacy Query objects and select() statements
+    if cursor is not None:
+        query = query.filter(key_column > cursor)
+    return query.order_by(key_column)
+
+
+def next_page_headers(base_url, args, rows, key_column, limit):
+    # rows is the limit + 1 fetch; returns (page rows, extra headers)
+    if len(rows) <= limit:
+        return rows, {}
+
+    rows = rows[:limit]
+    next_cursor = getattr(rows[-1], key_column.key)
+    args = dict(args, cursor=next_cursor, limit=limit)
+    return rows, {
+        "X-Next-Cursor": str(next_cursor),
+        "Link": f'<{base_url}?{urlencode(args)}>; rel="next"',
+    }
+
+
+def paginate(query, key_column, serialize):
+    # Keyset pagination on key_column (a primary key) driven by the ?cursor=
+    # and ?limit= query args. The body stays a plain JSON list; the cursor
+    # for the next page comes back in X-Next-Cursor and a Link header.
+    #
+    # ?stream=ndjson|json instead streams every row after the cursor,
+    # fetched yield_per rows at a time, so full exports never hold the
+    # whole result set in memory.
+    cursor, limit, stream, error = parse_page_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    query = apply_keyset(query, key_column, cursor)
+
+    if stream:
+        body = stream_with_context(_stream_rows(query, serialize, stream))
+        return Response(body, mimetype=STREAM_MIMETYPES[stream])
+
+    rows, headers = next_page_headers(
+        request.base_url, request.args.to_dict(), query.limit(limit + 1).all(), key_column, limit
+    )
+    response = jsonify([serialize(row) for row in rows])
+    response.headers.update(headers)
+    return response, 200
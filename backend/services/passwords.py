@@ -0,0 +1,146 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "pbkdf2:sha256"
+SCRYPT_DEFAULTS = (2 ** 15, 8, 1)
+
+
+class HasherBusy(Exception):
+    # Every worker is busy and the queue is full (or the result timed out);
+    # routes answer 503 so clients back off instead of piling on
+    pass
+
+
+def normalize_method(method):
+    # Fill in werkzeug's defaults so the method can be compared with the
+    # prefix of a stored hash ("pbkdf2:sha256" -> "pbkdf2:sha256:600000")
+    parts = method.split(":")
+    if parts[0] == "pbkdf2":
+        hash_name = parts[1] if len(parts) > 1 else "sha256"
+        iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{int(iterations)}"
+    if parts[0] == "scrypt":
+        n, r, p = (int(v) for v in parts[1:] + [str(d) for d in SCRYPT_DEFAULTS[len(parts) - 1:]])
+        return f"scrypt:{n}:{r}:{p}"
+    return method
+
+
+def needs_rehash(stored_hash, method):
+    return stored_hash.split("$", 1)[0] != normalize_method(method)
+
+
+# Run inside the pool, so module level and free of app imports
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method):
+    # Returns (ok, new hash when the stored one uses old cost parameters)
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    # Password hashing off the request thread: a bounded process pool, so a
+    # login storm uses at most PASSWORD_HASH_WORKERS cores and never holds
+    # the GIL other requests need. Set up like the other extensions
+    # (password_hasher.init_app(app)); PASSWORD_HASH_WORKERS=0 hashes inline.
+
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = 0
+        self.timeout = None
+        self.rejected = 0
+        self.rehashed = 0
+        self.max_pending = 0
+        self._pending = 0
+        self._pool = None
+        self._lock = threading.Lock()  # pool start/stop
+        self._pending_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", 0)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT_SECONDS") or None
+        # Jobs running plus jobs waiting for a worker
+        self.max_pending = app.config.get("PASSWORD_HASH_MAX_PENDING") or self.workers * 4
+        app.extensions["password_hasher"] = self
+
+    def _executor(self):
+        # Started on first use, with spawn so children never inherit the
+        # server's threads or open database connections
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def busy(self):
+        # Cheap check so routes can refuse before doing any other work
+        return bool(self.workers) and self._pending >= self.max_pending
+
+    def _release(self, _future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy()
+            self._pending += 1
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.rejected += 1
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        # (ok, new_hash); new_hash is set when the caller should store an
+        # upgraded hash because the configured cost parameters changed
+        ok, new_hash = self._run(_verify, stored_hash, password, self.method)
+        if new_hash:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self):
+        return {
+            "method": normalize_method(self.method),
+            "workers": self.workers,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher()
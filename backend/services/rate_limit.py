@@ -0,0 +1,224 @@
+import math
+import threading
+import time
+
+from flask import jsonify, request
+
+# Local buckets are spread over SHARDS dicts, each with its own lock, so
+# concurrent requests rarely wait on each other (must be a power of two)
+SHARDS = 64
+
+# Token bucket in Redis: refills at ARGV rate per second up to burst and
+# takes one token per key in order, stopping at the first empty bucket.
+# Returns {index of that key, milliseconds until it has a token} or {0, 0}.
+# Time comes from the Redis server so every worker sees the same clock.
+REDIS_TAKE = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 't', 's')
+    local tokens = burst
+    if state[1] then
+        tokens = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+    end
+    local ttl = math.ceil(burst / rate * 1000) + 1000
+    if tokens < 1 then
+        redis.call('HSET', key, 't', tokens, 's', now)
+        redis.call('PEXPIRE', key, ttl)
+        return {i, math.ceil((1 - tokens) / rate * 1000)}
+    end
+    redis.call('HSET', key, 't', tokens - 1, 's', now)
+    redis.call('PEXPIRE', key, ttl)
+end
+return {0, 0}
+"""
+
+
+def parse_limit(value):
+    # "rate/burst" in requests per second, e.g. "20/40"; "" or "0" = no limit
+    if not value or value.strip() in ("0", "off"):
+        return None
+    rate, _, burst = value.partition("/")
+    rate = float(rate)
+    burst = float(burst) if burst else max(rate, 1.0)
+    if rate <= 0 or burst < 1:
+        raise ValueError(f"bad rate limit {value!r}; use rate/burst with rate > 0 and burst >= 1")
+    return rate, burst
+
+
+def parse_endpoint_limits(value):
+    # "endpoint=rate/burst,..." -> {endpoint: (rate, burst) or None}
+    limits = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        endpoint, _, limit = item.partition("=")
+        limits[endpoint.strip()] = parse_limit(limit)
+    return limits
+
+
+class LocalBucketStore:
+    # In-process token buckets; each worker process limits on its own. A
+    # bucket is [tokens, last refill, time it is full again] and is refilled
+    # lazily when a request touches it. Full buckets are the first to go
+    # once a shard holds more than its share of max_keys.
+
+    def __init__(self, max_keys=100000):
+        self.max_per_shard = max(1, max_keys // SHARDS)
+        self._shards = [({}, threading.Lock()) for _ in range(SHARDS)]
+
+    def take(self, buckets, now=None):
+        # buckets: [(key, rate, burst), ...]; returns (None, 0.0) when every
+        # bucket had a token, else (index of the empty one, seconds to wait)
+        if now is None:
+            now = time.monotonic()
+        for index, (key, rate, burst) in enumerate(buckets):
+            data, lock = self._shards[hash(key) & (SHARDS - 1)]
+            with lock:
+                state = data.get(key)
+                if state is None:
+                    if len(data) >= self.max_per_shard:
+                        _evict(data, now, self.max_per_shard)
+                    tokens = burst - 1.0
+                    data[key] = [tokens, now, now + 1.0 / rate]
+                    continue
+                tokens = state[0] + (now - state[1]) * rate
+                if tokens > burst:
+                    tokens = burst
+                state[1] = now
+                if tokens < 1.0:
+                    state[0] = tokens
+                    return index, (1.0 - tokens) / rate
+                tokens -= 1.0
+                state[0] = tokens
+                state[2] = now + (burst - tokens) / rate
+        return None, 0.0
+
+    def clear(self):
+        for data, lock in self._shards:
+            with lock:
+                data.clear()
+
+    def __len__(self):
+        return sum(len(data) for data, _ in self._shards)
+
+
+def _evict(data, now, limit):
+    # Full buckets carry no state worth keeping; if that is not enough (a
+    # flood of new keys), drop the quarter closest to full
+    for key in [key for key, state in data.items() if state[2] <= now]:
+        del data[key]
+    if len(data) >= limit:
+        by_full_at = sorted(data, key=lambda key: data[key][2])
+        for key in by_full_at[:max(1, len(by_full_at) // 4)]:
+            del data[key]
+
+
+class RedisBucketStore:
+    # Shared buckets for every worker, one script call (one round trip) per
+    # request; any client with redis-py's register_script works
+    def __init__(self, client, prefix="frns:rl:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(REDIS_TAKE)
+
+    def take(self, buckets, now=None):
+        keys = [self.prefix + ":".join(map(str, key)) for key, _, _ in buckets]
+        args = [value for _, rate, burst in buckets for value in (rate, burst)]
+        index, wait_ms = self._script(keys=keys, args=args)
+        if not index:
+            return None, 0.0
+        return int(index) - 1, int(wait_ms) / 1000
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    # Token buckets checked before every request, set up like the other
+    # extensions (rate_limiter.init_app(app)): one per client IP, one per
+    # client IP on each endpoint with its own limit, and one per caller
+    # (X-User-Id or ?user_id=) from each IP on top. A request takes a token from each;
+    # the first empty bucket answers 429 with Retry-After. The async entry point calls
+    # check() itself for the routes it serves without Flask.
+
+    def __init__(self):
+        self.enabled = False
+        self.store = LocalBucketStore()
+        self.user_limit = None
+        self.ip_limit = None
+        self.endpoint_limits = {}
+        self.exempt = frozenset()
+        self._rules = {}
+        self.limited = {"ip": 0, "endpoint": 0, "user": 0}
+
+    def init_app(self, app, store=None):
+        self.enabled = app.config.get("RATE_LIMIT_ENABLED", True)
+        self.user_limit = parse_limit(app.config.get("RATE_LIMIT_USER", ""))
+        self.ip_limit = parse_limit(app.config.get("RATE_LIMIT_IP", ""))
+        self.endpoint_limits = parse_endpoint_limits(app.config.get("RATE_LIMIT_ENDPOINTS", ""))
+        self.exempt = frozenset(filter(None, (name.strip() for name in
+                                              app.config.get("RATE_LIMIT_EXEMPT", "").split(","))))
+        self._rules = {}
+
+        if store is None and app.config.get("RATE_LIMIT_BACKEND") == "redis":
+            import redis  # optional, only needed for the shared backend
+            store = RedisBucketStore(redis.Redis.from_url(app.config["RATE_LIMIT_REDIS_URL"]))
+        if store is None:
+            store = LocalBucketStore(app.config.get("RATE_LIMIT_MAX_KEYS", 100000))
+        self.store = store
+
+        if self.enabled:
+            app.before_request(self._before_request)
+        app.extensions["rate_limiter"] = self
+
+    def _rule(self, endpoint):
+        # (exempt, endpoint limit), worked out once per endpoint
+        rule = self._rules.get(endpoint)
+        if rule is None:
+            exempt = endpoint in self.exempt or (endpoint or "").partition(".")[0] in self.exempt
+            rule = self._rules[endpoint] = (exempt, self.endpoint_limits.get(endpoint))
+        return rule
+
+    def check(self, endpoint, user_id, ip):
+        # None if the request may go ahead, else the Retry-After seconds
+        exempt, endpoint_limit = self._rule(endpoint)
+        if exempt:
+            return None
+        # The client address comes first: the user id is whatever the
+        # client sends, so changing it per call must not buy more requests,
+        # and its bucket is per address so nobody can drain someone else's
+        scopes, buckets = [], []
+        if ip and self.ip_limit:
+            scopes.append("ip")
+            buckets.append((("i", ip),) + self.ip_limit)
+        if endpoint_limit:
+            scopes.append("endpoint")
+            buckets.append((("e", endpoint, ip),) + endpoint_limit)
+        if user_id and self.user_limit:
+            scopes.append("user")
+            buckets.append((("u", ip, user_id),) + self.user_limit)
+        if not buckets:
+            return None
+        index, wait = self.store.take(buckets)
+        if index is None:
+            return None
+        self.limited[scopes[index]] += 1
+        return max(1, math.ceil(wait))
+
+    def _before_request(self):
+        if request.method == "OPTIONS":
+            return None  # CORS preflight
+        user_id = request.headers.get("X-User-Id") or request.args.get("user_id")
+        retry_after = self.check(request.endpoint, user_id, request.remote_addr)
+        if retry_after is None:
+            return None
+        return jsonify({"error": "Rate limit exceeded"}), 429, {"Retry-After": str(retry_after)}
+
+    def stats(self):
+        local = isinstance(self.store, LocalBucketStore)
+        return {**self.limited, "limited": sum(self.limited.values()), "buckets": len(self.store) if local else None}
+
+
+rate_limiter = RateLimiter()
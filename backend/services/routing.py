@@ -0,0 +1,375 @@
+import math
+import time
+from datetime import datetime, time as day_time, timedelta
+
+import numpy as np
+from sqlalchemy import func, update
+from sqlalchemy.orm import aliased
+
+from models import db, FoodItem, Transaction, User
+from services.geo import EARTH_RADIUS_KM
+from services.events import make_event, record
+
+# Every initiated transaction is a job: pick the food up at the donor, drop
+# it at the receiver. A route makes all of its pickups, then all of its
+# drops, so every pickup precedes its drop and the peak load is the route's
+# total quantity. Routes are built by Clarke-Wright savings over each job's
+# NEIGHBOURS nearest jobs, then each half is shortened by 2-opt. Food has to
+# be dropped before the end of its expiry date and a route has to fit in
+# one MAX_ROUTE_HOURS shift.
+VEHICLE_CAPACITY = 100
+MAX_STOPS = 30
+MAX_ROUTE_HOURS = 4.0
+SPEED_KMH = 25.0
+STOP_MINUTES = 5.0
+NEIGHBOURS = 30
+MATRIX_CHUNK = 1024
+MAX_TWO_OPT_PASSES = 20
+
+
+class RoutingOptions:
+    def __init__(self, capacity=VEHICLE_CAPACITY, max_stops=MAX_STOPS, max_route_hours=MAX_ROUTE_HOURS,
+                 speed_kmh=SPEED_KMH, stop_minutes=STOP_MINUTES, drivers=None, depot=None):
+        self.capacity = capacity
+        self.max_stops = max_stops
+        self.max_seconds = max_route_hours * 3600
+        self.seconds_per_km = 3600 / speed_kmh
+        self.service_seconds = stop_minutes * 60
+        self.drivers = drivers  # None: as many routes as it takes
+        self.depot = depot  # (lat, long) all routes start from; None: start at the first pickup
+
+
+def _load_jobs(txn_ids=None):
+    donor = aliased(User)
+    receiver = aliased(User)
+    query = (
+        db.session.query(
+            Transaction.txn_id,
+            Transaction.food_id,
+            Transaction.donor_id,
+            Transaction.receiver_id,
+            func.coalesce(Transaction.quantity, FoodItem.quantity).label("quantity"),
+            FoodItem.name,
+            FoodItem.expiry_date,
+            donor.location_lat.label("donor_lat"),
+            donor.location_long.label("donor_long"),
+            receiver.location_lat.label("receiver_lat"),
+            receiver.location_long.label("receiver_long"),
+        )
+        .join(FoodItem, FoodItem.food_id == Transaction.food_id)
+        .join(donor, donor.user_id == Transaction.donor_id)
+        .join(receiver, receiver.user_id == Transaction.receiver_id)
+        .filter(Transaction.status == "initiated")
+    )
+    if txn_ids is not None:
+        query = query.filter(Transaction.txn_id.in_(txn_ids))
+    return query.order_by(Transaction.txn_id).all()
+
+
+def _haversine_matrix(lat1, lon1, lat2, lon2):
+    # km between every point of set 1 and every point of set 2, in radians
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _haversine_pairs(lat1, lon1, lat2, lon2):
+    # km between point i of set 1 and point i of set 2, in radians
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class RoutePlanner:
+    # Column arrays for one planning run. Job i has pickup point i and drop
+    # point n + i; times are seconds from `start`.
+
+    def __init__(self, jobs, start, options):
+        self.jobs = jobs
+        self.options = options
+        n = len(jobs)
+        self.n = n
+        self.load = np.array([job.quantity for job in jobs], dtype=np.int64)
+        self.deadline = np.array([
+            (datetime.combine(job.expiry_date, day_time.max) - start).total_seconds() for job in jobs
+        ])
+        self.lat = np.radians([job.donor_lat for job in jobs] + [job.receiver_lat for job in jobs])
+        self.lon = np.radians([job.donor_long for job in jobs] + [job.receiver_long for job in jobs])
+
+        # Savings are measured against the depot, or the centre of all stops
+        # for open routes (it only ranks merges, no route goes there)
+        if options.depot is not None:
+            hub_lat, hub_lon = np.radians(options.depot[0]), np.radians(options.depot[1])
+        else:
+            hub_lat, hub_lon = self.lat.mean(), self.lon.mean()
+        self.to_hub = _haversine_pairs(self.lat, self.lon, np.full(2 * n, hub_lat), np.full(2 * n, hub_lon))
+        self.lead = self.to_hub[:n] if options.depot is not None else np.zeros(n)
+        # Plain lists for the scalar lookups in the merge and 2-opt loops
+        self._lat = self.lat.tolist()
+        self._lon = self.lon.tolist()
+        self._cos = np.cos(self.lat).tolist()
+
+    def distance(self, a, b):
+        h = (math.sin((self._lat[b] - self._lat[a]) / 2) ** 2
+             + self._cos[a] * self._cos[b] * math.sin((self._lon[b] - self._lon[a]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+    # -- savings ---------------------------------------------------------------
+
+    def savings(self, neighbours=NEIGHBOURS):
+        # Candidate merges (saving, i, j) of job i's route followed by job
+        # j's route, for each job's nearest jobs by pickup plus drop distance.
+        # Computed a chunk of rows at a time so memory stays O(chunk * n).
+        n = self.n
+        k = min(neighbours, n - 1)
+        if k <= 0:
+            return []
+        p_lat, p_lon, d_lat, d_lon = self.lat[:n], self.lon[:n], self.lat[n:], self.lon[n:]
+        pairs = []
+        for lo in range(0, n, MATRIX_CHUNK):
+            hi = min(lo + MATRIX_CHUNK, n)
+            pickups = _haversine_matrix(p_lat[lo:hi], p_lon[lo:hi], p_lat, p_lon)
+            drops = _haversine_matrix(d_lat[lo:hi], d_lon[lo:hi], d_lat, d_lon)
+            combined = pickups + drops
+            combined[np.arange(hi - lo), np.arange(lo, hi)] = np.inf
+            nearest = np.argpartition(combined, k - 1, axis=1)[:, :k]
+            rows = np.repeat(np.arange(lo, hi), k)
+            cols = nearest.ravel()
+            local = rows - lo
+            saving = (
+                self.to_hub[rows] + self.to_hub[cols] - pickups[local, cols]
+                + self.to_hub[n + rows] + self.to_hub[n + cols] - drops[local, cols]
+            )
+            keep = saving > 0
+            first, second = np.minimum(rows, cols)[keep], np.maximum(rows, cols)[keep]
+            pairs.append(np.stack([saving[keep], first, second], axis=1))
+        # A pair shows up twice when each job is among the other's nearest
+        merged = np.unique(np.concatenate(pairs), axis=0)
+        order = np.argsort(-merged[:, 0], kind="stable")
+        return [(float(s), int(i), int(j)) for s, i, j in merged[order]]
+
+    def build_routes(self):
+        # Clarke-Wright: start with one route per job and walk the savings
+        # from best to worst, joining two routes end to start when the
+        # result still fits. Pickup and drop halves keep the same job order
+        # here, so a route is its job list plus these aggregates:
+        # [first job, last job, jobs, load, pickup km, drop km, time to the
+        #  first drop, smallest expiry slack over its drops]
+        options = self.options
+        per_km, service = options.seconds_per_km, options.service_seconds
+        n = self.n
+        routes = {}
+        route_of = list(range(n))
+        direct = _haversine_pairs(self.lat[:n], self.lon[:n], self.lat[n:], self.lon[n:])
+        for i in range(n):
+            first_drop = (self.lead[i] + direct[i]) * per_km + service
+            routes[i] = [[i], i, i, 1, int(self.load[i]), 0.0, 0.0, first_drop, self.deadline[i] - first_drop]
+
+        for _, i, j in self.savings():
+            for a_job, b_job in ((i, j), (j, i)):
+                a_id, b_id = route_of[a_job], route_of[b_job]
+                if a_id == b_id:
+                    break
+                a, b = routes[a_id], routes[b_id]
+                if a[2] != a_job or b[1] != b_job:
+                    continue
+                merged = self._merge(a, b, per_km, service)
+                if merged is None:
+                    continue
+                for job in b[0]:
+                    route_of[job] = a_id
+                routes[a_id] = merged
+                del routes[b_id]
+                break
+        return [route[0] for route in routes.values()]
+
+    def _merge(self, a, b, per_km, service):
+        # a followed by b, or None when capacity, stops, shift length or an
+        # expiry date would be broken
+        options = self.options
+        n = self.n
+        jobs = a[3] + b[3]
+        load = a[4] + b[4]
+        if load > options.capacity or 2 * jobs > options.max_stops:
+            return None
+        p_km = a[5] + self.distance(a[2], b[1]) + b[5]
+        d_km = a[6] + self.distance(n + a[2], n + b[1]) + b[6]
+        first_drop = (self.lead[a[1]] + p_km + self.distance(b[2], n + a[1])) * per_km + jobs * service
+        b_first_drop = first_drop + (a[6] + self.distance(n + a[2], n + b[1])) * per_km + a[3] * service
+        slack = min(a[8] - (first_drop - a[7]), b[8] - (b_first_drop - b[7]))
+        if slack < 0 or first_drop + d_km * per_km + jobs * service > options.max_seconds:
+            return None
+        return [a[0] + b[0], a[1], b[2], jobs, load, p_km, d_km, first_drop, slack]
+
+    # -- 2-opt -----------------------------------------------------------------
+
+    def stops(self, route):
+        return [job for job in route] + [self.n + job for job in route]
+
+    def schedule(self, stops):
+        # Arrival time at each stop in seconds from the start
+        options = self.options
+        arrivals = []
+        clock = self.lead[stops[0]] * options.seconds_per_km if options.depot is not None else 0.0
+        for position, stop in enumerate(stops):
+            if position:
+                clock += options.service_seconds + self.distance(stops[position - 1], stop) * options.seconds_per_km
+            arrivals.append(clock)
+        return arrivals
+
+    def feasible(self, stops):
+        arrivals = self.schedule(stops)
+        if arrivals[-1] + self.options.service_seconds > self.options.max_seconds:
+            return False
+        n = self.n
+        return all(arrival <= self.deadline[stop - n] for stop, arrival in zip(stops, arrivals) if stop >= n)
+
+    def two_opt(self, stops):
+        # Reverses segments inside the pickup half or inside the drop half
+        # (never across, so pickups stay ahead of their drops) while that
+        # shortens the route and every drop still makes its expiry date
+        m = len(stops)
+        half = m // 2
+        if half < 2:
+            return stops
+        points = np.array(stops)
+        matrix = _haversine_matrix(self.lat[points], self.lon[points], self.lat[points], self.lon[points]).tolist()
+        start = (self.lead[points[:half]].tolist() + [0.0] * half) if self.options.depot is not None \
+            else [0.0] * m
+        order = list(range(m))
+
+        for _ in range(MAX_TWO_OPT_PASSES):
+            improved = False
+            for lo, hi in ((0, half), (half, m)):
+                for i in range(lo, hi - 1):
+                    for k in range(i + 1, hi):
+                        b, c = order[i], order[k]
+                        before = matrix[order[i - 1]][b] if i else start[b]
+                        after = matrix[order[i - 1]][c] if i else start[c]
+                        if k + 1 < m:
+                            d = order[k + 1]
+                            before += matrix[c][d]
+                            after += matrix[b][d]
+                        if after < before - 1e-9:
+                            candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                            if self.feasible([stops[x] for x in candidate]):
+                                order = candidate
+                                improved = True
+            if not improved:
+                break
+        return [stops[x] for x in order]
+
+    def route_km(self, stops):
+        km = self.lead[stops[0]] if self.options.depot is not None else 0.0
+        return km + sum(self.distance(a, b) for a, b in zip(stops, stops[1:]))
+
+
+def plan(jobs, start, options):
+    # Returns (routes as stop lists, {job index: reason} for jobs left out)
+    skipped = {}
+    routable = []
+    for index, job in enumerate(jobs):
+        if None in (job.donor_lat, job.donor_long, job.receiver_lat, job.receiver_long):
+            skipped[index] = "missing location"
+        elif job.quantity is None or job.quantity > options.capacity:
+            skipped[index] = "exceeds vehicle capacity"
+        else:
+            routable.append(index)
+    if not routable:
+        return None, routable, [], skipped
+
+    subset = [jobs[i] for i in routable]
+    planner = RoutePlanner(subset, start, options)
+    routes = []
+    for route in planner.build_routes():
+        stops = planner.stops(route)
+        if not planner.feasible(stops):
+            # Only single-job routes get here, merges are checked
+            skipped[routable[route[0]]] = "cannot be dropped before expiry within one shift"
+            continue
+        routes.append(planner.two_opt(stops))
+
+    # Longest routes go to the available drivers first
+    routes.sort(key=len, reverse=True)
+    if options.drivers is not None:
+        for route in routes[options.drivers:]:
+            for stop in route[:len(route) // 2]:
+                skipped[routable[stop]] = "no driver available"
+        routes = routes[:options.drivers]
+    return planner, routable, routes, skipped
+
+
+def run_route_plan(options=None, txn_ids=None, dry_run=False):
+    started = time.perf_counter()
+    options = options or RoutingOptions()
+    now = datetime.now()
+
+    jobs = _load_jobs(txn_ids)
+    planner, routable, routes, skipped = plan(jobs, now, options)
+
+    planned_ids = [jobs[routable[stop]].txn_id for route in routes for stop in route[:len(route) // 2]]
+    moved = set()
+    if planned_ids and not dry_run:
+        # Only rows still initiated move; anything claimed or cancelled in the
+        # meantime is reported back instead of silently rerouted
+        moved_rows = db.session.execute(
+            update(Transaction)
+            .where(Transaction.txn_id.in_(planned_ids), Transaction.status == "initiated")
+            .values(status="in_progress")
+            .returning(Transaction.txn_id, Transaction.donor_id, Transaction.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+        moved = {row.txn_id for row in moved_rows}
+        by_id = {job.txn_id: job for job in jobs}
+        record(*(
+            make_event("transaction", "updated", row.txn_id, status="in_progress", user_id=row.donor_id,
+                       food_type=by_id[row.txn_id].name, quantity=row.quantity, previous_status="initiated",
+                       food_id=by_id[row.txn_id].food_id, receiver_id=by_id[row.txn_id].receiver_id)
+            for row in moved_rows
+        ))
+        db.session.commit()
+
+    plans = [_describe(planner, jobs, routable, number, route, now) for number, route in enumerate(routes, 1)]
+    return {
+        "transactions_considered": len(jobs),
+        "routes": plans,
+        "routed": len(planned_ids),
+        "unrouted": [{"txn_id": jobs[i].txn_id, "reason": reason} for i, reason in sorted(skipped.items())],
+        "changed_meanwhile": sorted(set(planned_ids) - moved) if planned_ids and not dry_run else [],
+        "distance_km": round(sum(plan["distance_km"] for plan in plans), 2),
+        "committed": bool(moved),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _describe(planner, jobs, routable, number, route, start):
+    n = planner.n
+    arrivals = planner.schedule(route)
+    load = 0
+    stops = []
+    for stop, arrival in zip(route, arrivals):
+        job = jobs[routable[stop % n]]
+        pickup = stop < n
+        load += job.quantity if pickup else -job.quantity
+        stops.append({
+            "type": "pickup" if pickup else "drop",
+            "txn_id": job.txn_id,
+            "food_id": job.food_id,
+            "food_name": job.name,
+            "user_id": job.donor_id if pickup else job.receiver_id,
+            "lat": job.donor_lat if pickup else job.receiver_lat,
+            "long": job.donor_long if pickup else job.receiver_long,
+            "quantity": job.quantity,
+            "load_after": load,
+            "eta": (start + timedelta(seconds=arrival)).isoformat(timespec="minutes"),
+        })
+    return {
+        "driver": number,
+        "transactions": [stop["txn_id"] for stop in stops if stop["type"] == "pickup"],
+        "stops": stops,
+        "load": sum(stop["quantity"] for stop in stops if stop["type"] == "pickup"),
+        "distance_km": round(planner.route_km(route), 2),
+        "duration_min": round((arrivals[-1] + planner.options.service_seconds) / 60, 1),
+    }
@@ -0,0 +1,224 @@
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import extract, func, literal_column, or_
+
+from models import db, FoodItem, Request
+from services.serializers import AVAILABLE_FOOD, REQUEST
+
+# score = relevance * (1 - FRESHNESS_WEIGHT + FRESHNESS_WEIGHT * freshness),
+# where freshness halves every FRESHNESS_HALF_LIFE_DAYS since the row was
+# created: a fresh listing outranks an equally relevant stale one, but never
+# a much better match.
+FRESHNESS_WEIGHT = 0.3
+FRESHNESS_HALF_LIFE_DAYS = 7.0
+# Share of the query's trigrams a text must contain (pg_trgm's default
+# word_similarity_threshold)
+MIN_SIMILARITY = 0.6
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# The in-memory index is rebuilt after this long, to pick up writes made
+# by other processes (`flask sweep-expired`)
+FALLBACK_MAX_AGE_SECONDS = 60
+
+# Text search configuration; a literal so the query matches the expression
+# indexes (a bound parameter would not)
+TS_CONFIG = literal_column("'english'")
+
+
+class SearchTarget:
+    def __init__(self, name, kind, pk, text, active, schema):
+        self.name = name
+        self.kind = kind  # event kind, see services/events.py
+        self.pk = pk
+        self.text = text
+        self.active = active  # (column, value) rows must have to be listed
+        self.created_at = pk.class_.created_at
+        self.schema = schema
+
+    def is_active(self, status):
+        return status == self.active[1]
+
+
+TARGETS = {
+    "requests": SearchTarget("requests", "request", Request.request_id, Request.food_type,
+                             (Request.status, "pending"), REQUEST),
+    "foods": SearchTarget("foods", "food", FoodItem.food_id, FoodItem.name,
+                          (FoodItem.status, "available"), AVAILABLE_FOOD),
+}
+
+
+def trigrams(text):
+    # pg_trgm's trigrams: lower-cased alphanumeric words, padded with two
+    # spaces in front and one behind
+    grams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def freshness(created_at, now):
+    if created_at is None:
+        return 0.0
+    age_days = max((now - created_at).total_seconds(), 0.0) / 86400
+    return 0.5 ** (age_days / FRESHNESS_HALF_LIFE_DAYS)
+
+
+def combined_score(relevance, fresh):
+    return relevance * (1 - FRESHNESS_WEIGHT + FRESHNESS_WEIGHT * fresh)
+
+
+class TrigramIndex:
+    # Inverted index trigram -> ids over one target's active rows. Relevance
+    # is the share of the query's trigrams found in the text, close to
+    # pg_trgm's word_similarity(query, text).
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {}  # id -> (text, created_at)
+
+    def add(self, doc_id, text, created_at):
+        self.remove(doc_id)
+        self.docs[doc_id] = (text, created_at)
+        for gram in trigrams(text):
+            self.postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for gram in trigrams(doc[0]):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, query, limit, now):
+        grams = trigrams(query)
+        if not grams:
+            return []
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.postings.get(gram, ()))
+        needed = MIN_SIMILARITY * len(grams)
+        scored = []
+        for doc_id, count in hits.items():
+            if count >= needed:
+                fresh = freshness(self.docs[doc_id][1], now)
+                scored.append((combined_score(count / len(grams), fresh), doc_id))
+        return heapq.nlargest(limit, scored)
+
+
+class FallbackIndexes:
+    # One TrigramIndex per target for databases without pg_trgm (SQLite test
+    # runs). Built from the database on first use and kept current from the
+    # captured change events; a target whose change can't be applied from
+    # the event alone is rebuilt on its next search.
+
+    def __init__(self):
+        self.indexes = {}
+        self.built_at = {}
+        self._lock = threading.Lock()
+
+    def apply(self, events):
+        with self._lock:
+            for event in events:
+                kind, action = event["type"].split(".", 1)
+                target = next((t for t in TARGETS.values() if t.kind == kind), None)
+                index = self.indexes.get(target.name) if target else None
+                if index is None:
+                    continue
+                if action == "deleted" or not target.is_active(event["status"]):
+                    index.remove(event["id"])
+                elif event["food_type"] is not None:
+                    created_at = index.docs.get(event["id"], (None, _utcnow()))[1]
+                    index.add(event["id"], event["food_type"], created_at)
+                elif event["id"] not in index.docs:
+                    self.built_at.pop(target.name, None)
+
+    def get(self, target):
+        with self._lock:
+            built_at = self.built_at.get(target.name)
+            if built_at is not None and time.monotonic() - built_at < FALLBACK_MAX_AGE_SECONDS:
+                return self.indexes[target.name]
+
+        index = TrigramIndex()
+        column, value = target.active
+        rows = db.session.query(target.pk, target.text, target.created_at).filter(column == value)
+        for doc_id, text, created_at in rows:
+            index.add(doc_id, text, created_at)
+        with self._lock:
+            self.indexes[target.name] = index
+            self.built_at[target.name] = time.monotonic()
+        return index
+
+    def reset(self):
+        with self._lock:
+            self.indexes.clear()
+            self.built_at.clear()
+
+
+fallback_indexes = FallbackIndexes()
+
+
+def init_search(app):
+    from services.events import event_publisher
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    app.extensions["search"] = dialect
+    fallback_indexes.reset()
+    if dialect != "postgresql":
+        event_publisher.on_commit(fallback_indexes.apply)
+
+
+def _utcnow():
+    # created_at columns hold naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _search_postgres(target, query, limit):
+    # Matches on full text (stemmed words) or trigram word similarity, both
+    # served by the partial GIN indexes; ranked by the better of the two,
+    # weighted by freshness
+    column, value = target.active
+    document = func.to_tsvector(TS_CONFIG, target.text)
+    ts_query = func.plainto_tsquery(TS_CONFIG, query)
+    relevance = func.greatest(func.ts_rank(document, ts_query), func.word_similarity(query, target.text))
+    age_days = extract("epoch", func.timezone("utc", func.now()) - target.created_at) / 86400
+    fresh = func.coalesce(func.power(0.5, func.greatest(age_days, 0) / FRESHNESS_HALF_LIFE_DAYS), 0)
+    score = (relevance * (1 - FRESHNESS_WEIGHT + FRESHNESS_WEIGHT * fresh)).label("score")
+
+    rows = (
+        db.session.query(*target.schema.columns, score)
+        .filter(column == value)
+        .filter(or_(document.op("@@")(ts_query), target.text.op("%>")(query)))
+        .order_by(score.desc(), target.pk.desc())
+        .limit(limit)
+    )
+    return [{**target.schema.dump(row[:-1]), "score": round(row[-1], 4)} for row in rows]
+
+
+def _search_fallback(target, query, limit):
+    hits = fallback_indexes.get(target).search(query, limit, _utcnow())
+    if not hits:
+        return []
+    rows = target.schema.query().filter(target.pk.in_([doc_id for _, doc_id in hits]))
+    by_id = {row[0]: row for row in rows}
+    return [
+        {**target.schema.dump(by_id[doc_id]), "score": round(score, 4)}
+        for score, doc_id in hits if doc_id in by_id
+    ]
+
+
+def search(query, types, limit=DEFAULT_LIMIT):
+    # {target name: ranked results} for each of `types`
+    run = _search_postgres if current_app.extensions.get("search") == "postgresql" else _search_fallback
+    return {name: run(TARGETS[name], query, limit) for name in types}
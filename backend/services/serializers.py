@@ -0,0 +1,106 @@
+from operator import attrgetter
+
+from sqlalchemy import select
+
+from models import db, FoodItem, Request, Transaction, User
+
+
+# Formatters keep the wire formats the API has always used; isoformat is
+# several times cheaper per value than strftime
+def datetime_str(value):
+    return value.isoformat(" ", "seconds")[:19]
+
+
+def date_str(value):
+    return value.isoformat()
+
+
+class Schema:
+    # Declared output shape: (key, column[, formatter]) per field. Queries
+    # select exactly these columns and rows are serialized straight from the
+    # result tuples, so no ORM instances are built for list endpoints.
+    # Formatters are skipped for None.
+
+    def __init__(self, *fields):
+        self.keys = tuple(f[0] for f in fields)
+        self.columns = [f[1] for f in fields]
+        self._attrs = attrgetter(*(column.key for column in self.columns))
+        self._formatted = tuple((f[0], f[2]) for f in fields if len(f) > 2)
+
+    def query(self):
+        # Legacy Query over the schema's columns (Flask routes)
+        return db.session.query(*self.columns)
+
+    def select(self):
+        return select(*self.columns)
+
+    def dump(self, row):
+        data = dict(zip(self.keys, row))
+        for key, fmt in self._formatted:
+            value = data[key]
+            if value is not None:
+                data[key] = fmt(value)
+        return data
+
+    def dump_many(self, rows):
+        return [self.dump(row) for row in rows]
+
+    def dump_object(self, obj):
+        # For the few places that still hold an ORM instance
+        return self.dump(self._attrs(obj))
+
+
+USER = Schema(
+    ("user_id", User.user_id),
+    ("name", User.name),
+    ("email", User.email),
+    ("phone", User.phone),
+    ("location_lat", User.location_lat),
+    ("location_long", User.location_long),
+)
+
+# /requests/available
+AVAILABLE_FOOD = Schema(
+    ("food_id", FoodItem.food_id),
+    ("name", FoodItem.name),
+    ("quantity", FoodItem.quantity),
+    ("expiry_date", FoodItem.expiry_date, date_str),
+)
+
+# /food/my/<donor_id>
+DONOR_FOOD = Schema(
+    ("food_id", FoodItem.food_id),
+    ("food_name", FoodItem.name),
+    ("quantity", FoodItem.quantity),
+    ("expiry_date", FoodItem.expiry_date, date_str),
+)
+
+REQUEST = Schema(
+    ("request_id", Request.request_id),
+    ("receiver_id", Request.receiver_id),
+    ("food_type", Request.food_type),
+    ("quantity", Request.quantity),
+    ("urgency_level", Request.urgency_level),
+    ("deadline", Request.deadline, datetime_str),
+    ("created_at", Request.created_at, datetime_str),
+)
+
+# Joined with the food name: select from Transaction, outer join FoodItem
+TRANSACTION = Schema(
+    ("txn_id", Transaction.txn_id),
+    ("donor_id", Transaction.donor_id),
+    ("receiver_id", Transaction.receiver_id),
+    ("food_id", Transaction.food_id),
+    ("food_name", FoodItem.name),
+    ("date", Transaction.created_at, datetime_str),
+    ("status", Transaction.status),
+)
+
+# /food/transactions/donor/<donor_id>
+DONOR_TRANSACTION = Schema(
+    ("transaction_id", Transaction.txn_id),
+    ("receiver_id", Transaction.receiver_id),
+    ("food_id", Transaction.food_id),
+    ("request_id", Transaction.request_id),
+    ("timestamp", Transaction.created_at, datetime_str),
+)
@@ -0,0 +1,168 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import case, delete, func, insert, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, FoodItem, GlobalStats, Transaction, TransactionArchive, UserStats
+
+COUNTERS = (
+    "listings_total",
+    "active_listings",
+    "expired_listings",
+    "donations_completed",
+    "quantity_donated",
+    "receipts_completed",
+    "quantity_received",
+)
+
+# Listing statuses that have their own counter
+LISTING_COUNTERS = {"available": "active_listings", "expired": "expired_listings"}
+
+GLOBAL_SHARDS = 16
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class StatsDelta:
+    # Collects counter changes for one unit of work; apply() writes them in
+    # the caller's transaction so the stats commit (or roll back) together
+    # with the change they describe.
+
+    def __init__(self):
+        self.users = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    def __bool__(self):
+        return any(any(c.values()) for c in self.users.values())
+
+    def _bump(self, user_id, counter, amount):
+        if counter and amount:
+            self.users[user_id][counter] += amount
+
+    def listing_added(self, donor_id, status="available"):
+        self._bump(donor_id, "listings_total", 1)
+        self._bump(donor_id, LISTING_COUNTERS.get(status), 1)
+
+    def listing_removed(self, donor_id, status):
+        self._bump(donor_id, "listings_total", -1)
+        self._bump(donor_id, LISTING_COUNTERS.get(status), -1)
+
+    def listing_moved(self, donor_id, old_status, new_status, count=1):
+        if old_status != new_status:
+            self._bump(donor_id, LISTING_COUNTERS.get(old_status), -count)
+            self._bump(donor_id, LISTING_COUNTERS.get(new_status), count)
+
+    def transaction_moved(self, donor_id, receiver_id, quantity, old_status, new_status):
+        # Only entering or leaving "completed" changes the counters
+        sign = (new_status == "completed") - (old_status == "completed")
+        self._bump(donor_id, "donations_completed", sign)
+        self._bump(donor_id, "quantity_donated", sign * (quantity or 0))
+        self._bump(receiver_id, "receipts_completed", sign)
+        self._bump(receiver_id, "quantity_received", sign * (quantity or 0))
+
+    def apply(self):
+        if not self:
+            return
+        now = datetime.now(timezone.utc)
+        totals = dict.fromkeys(COUNTERS, 0)
+        rows = []
+        # Sorted so concurrent writers lock rows in the same order
+        for user_id in sorted(self.users):
+            counters = self.users[user_id]
+            rows.append({"user_id": user_id, **counters, "updated_at": now})
+            for name, amount in counters.items():
+                totals[name] += amount
+
+        _increment(UserStats, "user_id", rows)
+        _increment(GlobalStats, "shard", [{"shard": random.randrange(GLOBAL_SHARDS), **totals, "updated_at": now}])
+        self.users.clear()
+
+
+def _increment(model, key, rows):
+    # INSERT ... ON CONFLICT DO UPDATE SET counter = counter + excluded.counter
+    table = model.__table__
+    upsert = _UPSERT_DIALECTS[db.session.get_bind().dialect.name]
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in COUNTERS},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.session.execute(stmt, rows)
+
+
+def _counters(row):
+    return {name: int(getattr(row, name) or 0) for name in COUNTERS}
+
+
+def get_dashboard(user_id=None):
+    # Two primary-key bounded reads, however many transactions exist
+    totals = db.session.execute(
+        select(*(func.coalesce(func.sum(getattr(GlobalStats, name)), 0).label(name) for name in COUNTERS),
+               func.max(GlobalStats.updated_at).label("updated_at"))
+    ).one()
+    result = {"global": _counters(totals), "updated_at": totals.updated_at}
+
+    if user_id is not None:
+        row = db.session.get(UserStats, user_id)
+        result["user"] = _counters(row) if row else dict.fromkeys(COUNTERS, 0)
+        result["user_id"] = user_id
+    return result
+
+
+def _completed_by(key):
+    # key is "donor_id" or "receiver_id". Archived transactions still count
+    # (services/archival.py); quantity None means the whole food item.
+    completed = union_all(*(
+        select(table.c[key].label("user_id"), table.c.quantity, table.c.food_id).where(table.c.status == "completed")
+        for table in (Transaction.__table__, TransactionArchive.__table__)
+    )).subquery()
+    quantity = func.coalesce(completed.c.quantity, FoodItem.quantity)
+    return db.session.execute(
+        select(completed.c.user_id, func.count(), func.coalesce(func.sum(quantity), 0))
+        .select_from(completed)
+        .outerjoin(FoodItem, FoodItem.food_id == completed.c.food_id)
+        .group_by(completed.c.user_id)
+    )
+
+
+def rebuild_stats():
+    # Recomputes every counter from the source tables; repairs drift after
+    # manual SQL or restores. One transaction, so readers never see it half
+    # done.
+    now = datetime.now(timezone.utc)
+    users = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    listings = db.session.execute(
+        select(
+            FoodItem.donor_id,
+            func.count(),
+            func.sum(case((FoodItem.status == "available", 1), else_=0)),
+            func.sum(case((FoodItem.status == "expired", 1), else_=0)),
+        ).group_by(FoodItem.donor_id)
+    )
+    for donor_id, total, active, expired in listings:
+        users[donor_id].update(listings_total=total, active_listings=active or 0, expired_listings=expired or 0)
+
+    for user_id, count, qty in _completed_by("donor_id"):
+        users[user_id].update(donations_completed=count, quantity_donated=int(qty))
+    for user_id, count, qty in _completed_by("receiver_id"):
+        users[user_id].update(receipts_completed=count, quantity_received=int(qty))
+
+    totals = dict.fromkeys(COUNTERS, 0)
+    for counters in users.values():
+        for name, amount in counters.items():
+            totals[name] += amount
+
+    db.session.execute(delete(UserStats))
+    db.session.execute(delete(GlobalStats))
+    if users:
+        db.session.execute(insert(UserStats), [
+            {"user_id": user_id, **counters, "updated_at": now} for user_id, counters in sorted(users.items())
+        ])
+    db.session.execute(insert(GlobalStats), [{"shard": 0, **totals, "updated_at": now}])
+    db.session.commit()
+    return {"users": len(users), **totals}
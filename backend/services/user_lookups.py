@@ -0,0 +1,64 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from models import db, Role, User
+from services.cache import cache
+from services.serializers import USER
+
+ROLE_TTL_SECONDS = 3600
+
+
+def _profile_key(user_id):
+    return f"user:{user_id}:profile"
+
+
+def role_ids_by_name(names):
+    # The roles table is effectively static, so the whole name -> id map is
+    # cached as one entry. Unknown names force a single reload in case a
+    # role was added since; names still unknown after that map to None.
+    def load():
+        return {r.role_name: r.role_id for r in Role.query.all()}
+
+    roles = cache.get_or_load("roles:by_name", load, ttl=ROLE_TTL_SECONDS)
+    if any(name not in roles for name in names):
+        cache.invalidate("roles:by_name")
+        roles = cache.get_or_load("roles:by_name", load, ttl=ROLE_TTL_SECONDS)
+
+    return {name: roles.get(name) for name in names}
+
+
+def _profile_statement(user_id):
+    return select(User).options(joinedload(User.roles)).where(User.user_id == user_id)
+
+
+def _profile_to_dict(user):
+    if not user:
+        return None
+    profile = USER.dump_object(user)
+    profile["roles"] = [r.role_name for r in user.roles]
+    return profile
+
+
+def get_user_profile(user_id):
+    def load():
+        user = db.session.execute(_profile_statement(user_id)).unique().scalar_one_or_none()
+        return _profile_to_dict(user)
+
+    if not cache.cache_profiles:
+        return load()
+    return cache.get_or_load(_profile_key(user_id), load)
+
+
+async def get_user_profile_async(session, user_id):
+    # Same cache entry as get_user_profile, loaded through an AsyncSession
+    async def load():
+        result = await session.execute(_profile_statement(user_id))
+        return _profile_to_dict(result.unique().scalar_one_or_none())
+
+    if not cache.cache_profiles:
+        return await load()
+    return await cache.get_or_load_async(_profile_key(user_id), load)
+
+
+def invalidate_user_profile(user_id):
+    cache.invalidate(_profile_key(user_id))
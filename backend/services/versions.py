@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import Response, current_app, request
+from werkzeug.http import http_date, parse_date
+
+logger = logging.getLogger(__name__)
+
+
+def scopes_for_event(event):
+    # Which list versions a captured change invalidates
+    kind = event["type"].split(".", 1)[0]
+    if kind == "food":
+        return ("foods", f"foods:donor:{event['user_id']}")
+    if kind == "request":
+        return ("requests",)
+    return ("transactions",)
+
+
+def _new_version(now):
+    # "<unix time>:<random>"; random so a reset store can never hand out a
+    # version an older ETag was built from
+    return f"{now:.6f}:{uuid.uuid4().hex[:12]}"
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class ChangeVersions:
+    # Version token per list scope ("requests", "foods", "foods:donor:<id>"),
+    # replaced after every commit that changes rows in it. ETag and
+    # Last-Modified are derived from the tokens alone, so an unchanged list
+    # is answered with 304 without touching the database.
+    #
+    # Tokens live in Redis (CACHE_BACKEND=redis) so every worker and CLI
+    # process shares them. Process-local tokens would let a worker that
+    # never saw a write keep answering 304, so they are only used when
+    # CHANGE_VERSIONS_LOCAL says one process does every write; otherwise
+    # check() never matches and no validators are sent.
+
+    def __init__(self):
+        self.redis = None
+        self.enabled = True
+        self.prefix = "frns:version:"
+        self.not_modified = 0
+        self._local = {}
+        self._default = _new_version(time.time())
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from services.cache import RedisCacheBackend
+        from services.events import event_publisher
+
+        backend = app.extensions["cache"].backend
+        self.redis = backend.client if isinstance(backend, RedisCacheBackend) else None
+        self.enabled = self.redis is not None or app.config.get("CHANGE_VERSIONS_LOCAL", False)
+        event_publisher.on_commit(self.bump_for)
+        app.extensions["change_versions"] = self
+
+    def bump(self, scopes):
+        version = _new_version(time.time())
+        if self.redis is not None:
+            self.redis.mset({self.prefix + scope: version for scope in scopes})
+            return
+        with self._lock:
+            for scope in scopes:
+                self._local[scope] = version
+
+    def bump_for(self, events):
+        scopes = {scope for event in events for scope in scopes_for_event(event)}
+        try:
+            self.bump(scopes)
+        except Exception:
+            logger.exception("failed to bump change versions for %s", sorted(scopes))
+
+    def get(self, scopes):
+        if self.redis is None:
+            return [self._local.get(scope, self._default) for scope in scopes]
+
+        keys = [self.prefix + scope for scope in scopes]
+        versions = [_text(v) for v in self.redis.mget(keys)]
+        missing = {key: _new_version(time.time()) for key, v in zip(keys, versions) if v is None}
+        if missing:
+            # First reader seeds the scope; NX keeps a concurrent writer's bump
+            for key, version in missing.items():
+                self.redis.set(key, version, nx=True)
+            versions = [_text(v) for v in self.redis.mget(keys)]
+        return versions
+
+    def check(self, scopes, args, headers):
+        # Returns (not_modified, validator headers) for a GET whose body
+        # depends only on `scopes` and its query string
+        if not self.enabled:
+            return False, {}
+        versions = self.get(scopes)
+        query = sorted(f"{k}={v}" for k, v in args.items(multi=True))
+        etag = '"%s"' % hashlib.sha1("|".join([*scopes, *versions, *query]).encode()).hexdigest()[:20]
+        modified_at = int(max(float(v.split(":", 1)[0]) for v in versions))
+        validators = {"ETag": etag, "Last-Modified": http_date(modified_at), "Cache-Control": "no-cache"}
+
+        if_none_match = headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+            matched = etag in tags or "*" in tags
+        else:
+            # Second resolution, so a change within the same second as the
+            # client's copy is missed; clients should prefer If-None-Match
+            since = parse_date(headers.get("If-Modified-Since"))
+            matched = since is not None and modified_at <= since.timestamp()
+        if matched:
+            self.not_modified += 1
+        return matched, validators
+
+
+change_versions = ChangeVersions()
+
+
+def conditional_get(scopes_for):
+    # View decorator: scopes_for(args, **view_kwargs) names the scopes the
+    # response depends on. Answers 304 before the view runs when the
+    # client's copy is current; adds ETag/Last-Modified to 200 responses.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            not_modified, validators = change_versions.check(
+                scopes_for(request.args, **kwargs), request.args, request.headers
+            )
+            if not_modified:
+                return Response(status=304, headers=validators)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.headers.update(validators)
+            return response
+        return wrapper
+    return decorator